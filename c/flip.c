@@ -1,35 +1,106 @@
 // Flipping a coin.
 // ** @author: fsaad@mit.edu
 
-#include <stdlib.h>
-
 #include "flip.h"
 
-unsigned long NUM_RNG_CALLS = 0;
+// SplitMix64, used to expand seeds (https://prng.di.unimi.it/splitmix64.c).
+uint64_t splitmix64_next(uint64_t *state) {
+    uint64_t z = (state[0] += 0x9e3779b97f4a7c15ULL);
+    z = (z ^ (z >> 30)) * 0xbf58476d1ce4e5b9ULL;
+    z = (z ^ (z >> 27)) * 0x94d049bb133111ebULL;
+    return z ^ (z >> 31);
+}
+
+static inline uint64_t rotl(const uint64_t x, int k) {
+    return (x << k) | (x >> (64 - k));
+}
+
+// xoshiro256** (https://prng.di.unimi.it/xoshiro256starstar.c).
+uint64_t xoshiro256ss_next(uint64_t *s) {
+    const uint64_t result = rotl(s[1] * 5, 7) * 9;
+    const uint64_t t = s[1] << 17;
+    s[2] ^= s[0];
+    s[3] ^= s[1];
+    s[1] ^= s[2];
+    s[0] ^= s[3];
+    s[2] ^= t;
+    s[3] = rotl(s[3], 45);
+    return result;
+}
+
+void flip_init_generator(struct flip_s *f, flip_next_t next, uint64_t seed) {
+    uint64_t sm = seed;
+    for (int i = 0; i < 4; i++) {
+        f->state[i] = splitmix64_next(&sm);
+    }
+    f->next = next;
+    f->word = 0;
+    f->spare = 0;
+    f->pos = 0;
+    f->has_spare = 0;
+    f->num_rng_calls = 0;
+}
+
+void flip_init(struct flip_s *f, uint64_t seed) {
+    flip_init_generator(f, xoshiro256ss_next, seed);
+}
+
+static inline uint64_t next_word(struct flip_s *f) {
+    if (f->has_spare) {
+        f->has_spare = 0;
+        return f->spare;
+    }
+    f->num_rng_calls++;
+    return f->next(f->state);
+}
 
-// RAND_MAX is 2**31-1, so bits are 0,...30
-static int k = 31;
-static int flip_word = 0;
-static int flip_pos = 0;
+int flip(struct flip_s *f) {
+    if (f->pos == 0) {
+        f->word = next_word(f);
+        f->pos = 64;
+    }
+    --f->pos;
+    return (f->word >> f->pos) & 1;
+}
 
-int flip(void){
-    if (flip_pos == 0) {
-        NUM_RNG_CALLS++;
-        flip_word = rand();
-        flip_pos = k;
+// Return the next w <= 31 bits without consuming them.
+int flip_peek(struct flip_s *f, int w) {
+    if (w <= f->pos) {
+        return (f->word >> (f->pos - w)) & ((1ULL << w) - 1);
+    }
+    if (!f->has_spare) {
+        f->num_rng_calls++;
+        f->spare = f->next(f->state);
+        f->has_spare = 1;
     }
-    --flip_pos;
-    return (flip_word >> flip_pos) & 1;
+    int rest = w - f->pos;
+    uint64_t head = f->word & ((1ULL << f->pos) - 1);
+    return (head << rest) | (f->spare >> (64 - rest));
 }
 
-int randint(int k) {
+// Consume j bits that were examined using flip_peek.
+void flip_skip(struct flip_s *f, int j) {
+    if (j <= f->pos) {
+        f->pos -= j;
+    } else {
+        f->word = next_word(f);
+        f->pos = 64 - (j - f->pos);
+    }
+}
+
+int randint(struct flip_s *f, int k) {
     int n = 0;
 
     for (int i = 0; i < k; i++) {
-        int b = flip();
+        int b = flip(f);
         n <<= 1;
         n += b;
     }
 
     return n;
 }
+
+// Return number of bits consumed from the stream.
+unsigned long flip_num_bits(struct flip_s *f) {
+    return 64 * (f->num_rng_calls - f->has_spare) - f->pos;
+}
@@ -4,9 +4,32 @@
 #ifndef FLIP_H
 #define FLIP_H
 
-extern unsigned long NUM_RNG_CALLS;
+#include <stdint.h>
 
-int flip(void);
-int randint(int k);
+// A generator maps its state to the next uniform 64-bit word.
+typedef uint64_t (*flip_next_t)(uint64_t *state);
+
+// Stream of random bits, read most significant bit first from the words
+// of a generator. Each sampler thread needs its own instance.
+struct flip_s {
+    flip_next_t next;
+    uint64_t state[4];
+    uint64_t word;              // buffered word
+    uint64_t spare;             // next word, fetched by flip_peek
+    int pos;                    // unread bits in word (the low pos bits)
+    int has_spare;
+    unsigned long num_rng_calls;
+};
+
+uint64_t splitmix64_next(uint64_t *state);
+uint64_t xoshiro256ss_next(uint64_t *state);
+
+void flip_init(struct flip_s *f, uint64_t seed);
+void flip_init_generator(struct flip_s *f, flip_next_t next, uint64_t seed);
+int flip(struct flip_s *f);
+int flip_peek(struct flip_s *f, int w);
+void flip_skip(struct flip_s *f, int j);
+int randint(struct flip_s *f, int k);
+unsigned long flip_num_bits(struct flip_s *f);
 
 #endif
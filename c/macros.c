@@ -1,6 +1,27 @@
-// Macro for reading, sampling, and timing.
+// Macros for reading, sampling, and timing.
 // ** @author: fsaad@mit.edu
 
+// Define worker_<func_sample>, which draws the steps of one worker. The bit
+// stream is copied to the stack of the thread while sampling, so that
+// threads do not write to shared cache lines of the workers array.
+#define DEFINE_WORKER(struct_name, func_sample) \
+    static void *worker_##func_sample(void *arg) { \
+        struct worker_s *w = (struct worker_s *) arg; \
+        struct struct_name *s = (struct struct_name *) w->sampler; \
+        struct flip_s f = w->f; \
+        struct timespec t0, t1; \
+        long x = 0; \
+        clock_gettime(CLOCK_MONOTONIC, &t0); \
+        for (int i = 0; i < w->steps; i++) { \
+            x += func_sample(s, &f); \
+        } \
+        clock_gettime(CLOCK_MONOTONIC, &t1); \
+        w->f = f; \
+        w->x = x; \
+        w->time = (t1.tv_sec - t0.tv_sec) + (t1.tv_nsec - t0.tv_nsec) / 1e9; \
+        return NULL; \
+    }
+
 #define READ_SAMPLE_TIME(key, \
         var_sampler, \
         struct_name, \
@@ -8,15 +29,12 @@
         func_sample, \
         func_free, \
         var_path, \
-        var_steps, \
-        var_t, \
-        var_x) \
+        var_workers, \
+        var_threads, \
+        var_t) \
     if(strcmp(var_sampler, key) == 0) { \
         struct struct_name s = func_read(var_path); \
-        var_t = clock(); \
-        for (int i = 0; i < var_steps; i++) { \
-            var_x += func_sample(&s); \
-        } \
-        var_t = clock() - var_t; \
+        var_t = run_workers(worker_##func_sample, &s, \
+            var_workers, var_threads); \
         func_free(s); \
     }
@@ -2,6 +2,7 @@
 // ** @author: fsaad@mit.edu
 
 #include <assert.h>
+#include <pthread.h>
 #include <stdbool.h>
 #include <stdio.h>
 #include <stdlib.h>
@@ -13,52 +14,125 @@
 #include "sample.h"
 #include "sstructs.h"
 
+// Worker thread, drawing steps samples from a shared read-only sampler
+// using its own random bit stream.
+struct worker_s {
+    void *sampler;
+    struct flip_s f;
+    int steps;
+    long x;
+    double time;
+};
+
 #include "macros.c"
 
+DEFINE_WORKER(sample_ky_encoding_s, sample_ky_encoding)
+DEFINE_WORKER(sample_ky_jump_s, sample_ky_jump)
+DEFINE_WORKER(sample_ky_matrix_s, sample_ky_matrix)
+DEFINE_WORKER(sample_ky_matrix_cached_s, sample_ky_matrix_cached)
+DEFINE_WORKER(sample_fldr_s, sample_fldr)
+
+// Run the workers in parallel on sampler and return the wall time.
+static double run_workers(void *(*worker)(void *), void *sampler,
+        struct worker_s *workers, int threads) {
+    pthread_t *tids = (pthread_t *) calloc(threads, sizeof(pthread_t));
+    struct timespec t0, t1;
+    clock_gettime(CLOCK_MONOTONIC, &t0);
+    for (int i = 0; i < threads; i++) {
+        workers[i].sampler = sampler;
+        if (pthread_create(&tids[i], NULL, worker, &workers[i]) != 0) {
+            printf("Failed to create thread %d\n", i);
+            exit(1);
+        }
+    }
+    for (int i = 0; i < threads; i++) {
+        pthread_join(tids[i], NULL);
+    }
+    clock_gettime(CLOCK_MONOTONIC, &t1);
+    free(tids);
+    return (t1.tv_sec - t0.tv_sec) + (t1.tv_nsec - t0.tv_nsec) / 1e9;
+}
+
 int main(int argc, char **argv) {
     // Read command line arguments.
-    if (argc != 5) {
-        printf("usage: ./mainc seed steps sampler path\n");
+    if (argc != 5 && argc != 6) {
+        printf("usage: ./mainc seed steps sampler path [threads]\n");
         exit(0);
     }
     int seed = atoi(argv[1]);
     int steps = atoi(argv[2]);
     char *sampler = argv[3];
     char *path = argv[4];
+    int threads = (argc == 6) ? atoi(argv[5]) : 1;
+    assert(0 < threads);
 
-    printf("%d %d %s %s\n", seed, steps, sampler, path);
-    srand(seed);
+    printf("%d %d %s %s %d\n", seed, steps, sampler, path, threads);
 
-    int x = 0;
-    clock_t t;
+    // Split the steps among the threads; thread i is seeded with seed + i.
+    struct worker_s *workers =
+        (struct worker_s *) calloc(threads, sizeof(struct worker_s));
+    for (int i = 0; i < threads; i++) {
+        flip_init(&workers[i].f, seed + i);
+        workers[i].steps = steps / threads + (i < steps % threads);
+    }
+
+    double t;
     READ_SAMPLE_TIME("ky.enc",
         sampler,
         sample_ky_encoding_s,
         read_sample_ky_encoding,
         sample_ky_encoding,
         free_sample_ky_encoding_s,
-        path, steps, t, x)
+        path, workers, threads, t)
+    else READ_SAMPLE_TIME("ky.jmp",
+        sampler,
+        sample_ky_jump_s,
+        read_sample_ky_jump,
+        sample_ky_jump,
+        free_sample_ky_jump_s,
+        path, workers, threads, t)
     else READ_SAMPLE_TIME("ky.mat",
         sampler,
         sample_ky_matrix_s,
         read_sample_ky_matrix,
         sample_ky_matrix,
         free_sample_ky_matrix_s,
-        path, steps, t, x)
+        path, workers, threads, t)
     else READ_SAMPLE_TIME("ky.matc",
         sampler,
         sample_ky_matrix_cached_s,
         read_sample_ky_matrix_cached,
         sample_ky_matrix_cached,
         free_sample_ky_matrix_cached_s,
-        path, steps, t, x)
+        path, workers, threads, t)
+    else READ_SAMPLE_TIME("fldr",
+        sampler,
+        sample_fldr_s,
+        read_sample_fldr,
+        sample_fldr,
+        free_sample_fldr_s,
+        path, workers, threads, t)
     else {
         printf("Unknown sampler: %s\n", sampler);
         exit(1);
     }
 
-    double e = ((double)t) / CLOCKS_PER_SEC;
-    printf("%s %1.5f %ld\n", sampler, e, NUM_RNG_CALLS);
+    // Per thread: index, steps, wall time, RNG calls, and bits consumed.
+    unsigned long num_rng_calls = 0;
+    unsigned long num_bits = 0;
+    for (int i = 0; i < threads; i++) {
+        struct worker_s *w = &workers[i];
+        unsigned long bits = flip_num_bits(&w->f);
+        printf("thread %d %d %1.5f %lu %lu\n",
+            i, w->steps, w->time, w->f.num_rng_calls, bits);
+        num_rng_calls += w->f.num_rng_calls;
+        num_bits += bits;
+    }
+
+    // Total: wall time, RNG calls, bits consumed, and samples per second.
+    printf("%s %1.5f %lu %lu %1.0f\n",
+        sampler, t, num_rng_calls, num_bits, steps / t);
 
+    free(workers);
     return 0;
 }
@@ -0,0 +1,442 @@
+// Python bindings for the C samplers.
+// ** @author: fsaad@mit.edu
+
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <pythread.h>
+
+#include "flip.h"
+#include "sample.h"
+#include "sstructs.h"
+
+// The module draws from one random bit stream, so calls that release the
+// GIL are serialized on this lock.
+static PyThread_type_lock flip_lock = NULL;
+static struct flip_s flip_state;
+
+// Acquire a C-contiguous buffer of ints from obj.
+static int get_int_buffer(PyObject *obj, Py_buffer *view, int writable) {
+    int flags = PyBUF_C_CONTIGUOUS | PyBUF_FORMAT;
+    if (writable) {
+        flags |= PyBUF_WRITABLE;
+    }
+    if (PyObject_GetBuffer(obj, view, flags) < 0) {
+        return -1;
+    }
+    char code = view->format[strlen(view->format) - 1];
+    if (view->itemsize != sizeof(int) || (code != 'i' && code != 'l')) {
+        PyErr_SetString(PyExc_TypeError,
+            "buffer must hold C int (e.g., numpy.int32 or array('i'))");
+        PyBuffer_Release(view);
+        return -1;
+    }
+    return 0;
+}
+
+// Acquire a C-contiguous buffer of bytes from obj.
+static int get_byte_buffer(PyObject *obj, Py_buffer *view) {
+    if (PyObject_GetBuffer(obj, view, PyBUF_C_CONTIGUOUS) < 0) {
+        return -1;
+    }
+    if (view->itemsize != 1) {
+        PyErr_SetString(PyExc_TypeError,
+            "buffer must hold bytes (e.g., numpy.uint8 or bytes)");
+        PyBuffer_Release(view);
+        return -1;
+    }
+    return 0;
+}
+
+// Check that a buffer of length items holds an nrows x ncols matrix.
+static int check_shape(Py_ssize_t length, int nrows, int ncols) {
+    if (nrows <= 0 || ncols <= 0 || length != (Py_ssize_t) nrows * ncols) {
+        PyErr_SetString(PyExc_ValueError, "matrix has wrong shape");
+        return -1;
+    }
+    return 0;
+}
+
+// Check that every walk over a packed encoding of length items stays in
+// range: from the root, each internal node c (with enc[c] >= 0) holds the
+// indexes enc[c] and enc[c+1] of two nodes in the encoding.
+static int check_encoding(int *enc, Py_ssize_t length) {
+    if (length == 0 || (length == 1 && enc[0] != -1)) {
+        PyErr_SetString(PyExc_ValueError, "encoding is empty or invalid");
+        return -1;
+    }
+    if (length == 1) {
+        return 0;
+    }
+    char *seen = (char *) PyMem_Calloc(length, 1);
+    Py_ssize_t *stack = (Py_ssize_t *) PyMem_Calloc(length, sizeof(*stack));
+    if (seen == NULL || stack == NULL) {
+        PyMem_Free(seen);
+        PyMem_Free(stack);
+        PyErr_NoMemory();
+        return -1;
+    }
+    int ok = 1;
+    Py_ssize_t top = 0;
+    stack[top++] = 0;
+    seen[0] = 1;
+    while (ok && 0 < top) {
+        Py_ssize_t c = stack[--top];
+        if (enc[c] < 0) {
+            continue;
+        }
+        if (length <= c + 1) {
+            ok = 0;
+            break;
+        }
+        for (int b = 0; b < 2; b++) {
+            int child = enc[c+b];
+            if (child < 0 || length <= child) {
+                ok = 0;
+                break;
+            }
+            if (!seen[child]) {
+                seen[child] = 1;
+                stack[top++] = child;
+            }
+        }
+    }
+    PyMem_Free(seen);
+    PyMem_Free(stack);
+    if (!ok) {
+        PyErr_SetString(PyExc_ValueError, "encoding index out of range");
+        return -1;
+    }
+    return 0;
+}
+
+// Check that the hamming vector h of a DDG matrix with k columns that
+// loops back to column l describes a tree whose walks all end at a leaf:
+// the number of internal nodes after each column stays in [0, bound], and
+// after column k-1 it equals the number entering column l (or zero, for
+// a tree without a loop, where l is k).
+static int check_ddg(int *h, int k, int l, long long bound) {
+    if (l < 0 || k < l) {
+        PyErr_SetString(PyExc_ValueError, "l must be in [0, k]");
+        return -1;
+    }
+    long long internal = 1;
+    long long internal_l = (l == k) ? 0 : 1;
+    for (int c = 0; c < k; c++) {
+        if (c == l) {
+            internal_l = internal;
+        }
+        internal = 2*internal - h[c];
+        if (internal < 0 || bound < internal) {
+            break;
+        }
+    }
+    if (internal != internal_l) {
+        PyErr_SetString(PyExc_ValueError, "matrix is not a valid DDG tree");
+        return -1;
+    }
+    return 0;
+}
+
+// Check that the labels of a CSR hamming matrix are outcomes 0, ..., n-1.
+static int check_labels(int n, int *labels, Py_ssize_t nlabels) {
+    for (Py_ssize_t i = 0; i < nlabels; i++) {
+        if (labels[i] < 0 || n <= labels[i]) {
+            PyErr_SetString(PyExc_ValueError, "labels must be in [0, n)");
+            return -1;
+        }
+    }
+    return 0;
+}
+
+// Return hamming vector of the 0/1 column-major n x k matrix P, or NULL
+// if an entry is not 0 or 1.
+static int *get_matrix_hamming_vector(uint8_t *P, int n, int k) {
+    int *h = (int *) PyMem_Calloc(k, sizeof(int));
+    if (h == NULL) {
+        PyErr_NoMemory();
+        return NULL;
+    }
+    for (int c = 0; c < k; c++) {
+        for (int r = 0; r < n; r++) {
+            uint8_t x = P[(size_t) c * n + r];
+            if (1 < x) {
+                PyErr_SetString(PyExc_ValueError,
+                    "matrix entries must be 0 or 1");
+                PyMem_Free(h);
+                return NULL;
+            }
+            h[c] += x;
+        }
+    }
+    return h;
+}
+
+// Fill out with samples from func, without holding the GIL.
+#define FILL_SAMPLES(func, x, out)                          \
+    do {                                                    \
+        int *a = (int *) (out).buf;                         \
+        Py_ssize_t n = (out).len / (out).itemsize;          \
+        Py_BEGIN_ALLOW_THREADS                              \
+        PyThread_acquire_lock(flip_lock, WAIT_LOCK);        \
+        for (Py_ssize_t i = 0; i < n; i++) {                \
+            a[i] = func(&(x), &flip_state);                 \
+        }                                                   \
+        PyThread_release_lock(flip_lock);                   \
+        Py_END_ALLOW_THREADS                                \
+    } while (0)
+
+static PyObject *py_seed(PyObject *self, PyObject *args) {
+    unsigned long long seed;
+    if (!PyArg_ParseTuple(args, "K", &seed)) {
+        return NULL;
+    }
+    PyThread_acquire_lock(flip_lock, WAIT_LOCK);
+    flip_init(&flip_state, seed);
+    PyThread_release_lock(flip_lock);
+    Py_RETURN_NONE;
+}
+
+static PyObject *py_sample_ky_encoding(PyObject *self, PyObject *args) {
+    PyObject *enc_obj, *out_obj;
+    Py_buffer enc, out;
+    if (!PyArg_ParseTuple(args, "OO", &enc_obj, &out_obj)) {
+        return NULL;
+    }
+    if (get_int_buffer(enc_obj, &enc, 0) < 0) {
+        return NULL;
+    }
+    if (get_int_buffer(out_obj, &out, 1) < 0) {
+        PyBuffer_Release(&enc);
+        return NULL;
+    }
+    struct sample_ky_encoding_s x;
+    x.encoding.length = enc.len / enc.itemsize;
+    x.encoding.a = (int *) enc.buf;
+    if (check_encoding(x.encoding.a, x.encoding.length) == 0) {
+        FILL_SAMPLES(sample_ky_encoding, x, out);
+    }
+    PyBuffer_Release(&out);
+    PyBuffer_Release(&enc);
+    if (PyErr_Occurred()) {
+        return NULL;
+    }
+    Py_RETURN_NONE;
+}
+
+static PyObject *py_sample_ky_matrix(PyObject *self, PyObject *args) {
+    PyObject *P_obj, *out_obj;
+    Py_buffer P, out;
+    int n, k, l;
+    if (!PyArg_ParseTuple(args, "OiiiO", &P_obj, &n, &k, &l, &out_obj)) {
+        return NULL;
+    }
+    if (get_byte_buffer(P_obj, &P) < 0) {
+        return NULL;
+    }
+    if (get_int_buffer(out_obj, &out, 1) < 0) {
+        PyBuffer_Release(&P);
+        return NULL;
+    }
+    struct sample_ky_matrix_s x;
+    x.k = k;
+    x.l = l;
+    x.P.nrows = n;
+    x.P.ncols = k;
+    x.P.P = (uint8_t *) P.buf;
+    if (check_shape(P.len, n, k) == 0) {
+        int *h = get_matrix_hamming_vector(x.P.P, n, k);
+        if (h != NULL) {
+            if (check_ddg(h, k, l, n) == 0) {
+                FILL_SAMPLES(sample_ky_matrix, x, out);
+            }
+            PyMem_Free(h);
+        }
+    }
+    PyBuffer_Release(&out);
+    PyBuffer_Release(&P);
+    if (PyErr_Occurred()) {
+        return NULL;
+    }
+    Py_RETURN_NONE;
+}
+
+// Return hamming vector of the CSR offsets, or NULL if they are invalid.
+static int *get_hamming_vector(int *offsets, Py_ssize_t length, int k,
+        Py_ssize_t nlabels) {
+    if (k <= 0 || length != k + 1 || offsets[0] != 0
+            || offsets[k] != nlabels) {
+        PyErr_SetString(PyExc_ValueError, "offsets do not match labels");
+        return NULL;
+    }
+    int *h = (int *) PyMem_Calloc(k, sizeof(int));
+    if (h == NULL) {
+        PyErr_NoMemory();
+        return NULL;
+    }
+    for (int c = 0; c < k; c++) {
+        h[c] = offsets[c+1] - offsets[c];
+        if (h[c] < 0) {
+            PyErr_SetString(PyExc_ValueError, "offsets must not decrease");
+            PyMem_Free(h);
+            return NULL;
+        }
+    }
+    return h;
+}
+
+static PyObject *py_sample_ky_matrix_cached(PyObject *self, PyObject *args) {
+    PyObject *offsets_obj, *labels_obj, *out_obj;
+    Py_buffer offsets, labels, out;
+    int n, k, l;
+    if (!PyArg_ParseTuple(args, "iiiOOO",
+            &n, &k, &l, &offsets_obj, &labels_obj, &out_obj)) {
+        return NULL;
+    }
+    if (get_int_buffer(offsets_obj, &offsets, 0) < 0) {
+        return NULL;
+    }
+    if (get_int_buffer(labels_obj, &labels, 0) < 0) {
+        PyBuffer_Release(&offsets);
+        return NULL;
+    }
+    if (get_int_buffer(out_obj, &out, 1) < 0) {
+        PyBuffer_Release(&labels);
+        PyBuffer_Release(&offsets);
+        return NULL;
+    }
+    struct sample_ky_matrix_cached_s x;
+    x.k = k;
+    x.l = l;
+    x.offsets.length = offsets.len / offsets.itemsize;
+    x.offsets.a = (int *) offsets.buf;
+    x.labels.length = labels.len / labels.itemsize;
+    x.labels.a = (int *) labels.buf;
+    x.h.length = k;
+    x.h.a = get_hamming_vector(
+        x.offsets.a, x.offsets.length, k, x.labels.length);
+    if (x.h.a != NULL) {
+        if (check_ddg(x.h.a, k, l, x.labels.length) == 0
+                && check_labels(n, x.labels.a, x.labels.length) == 0) {
+            FILL_SAMPLES(sample_ky_matrix_cached, x, out);
+        }
+        PyMem_Free(x.h.a);
+    }
+    PyBuffer_Release(&out);
+    PyBuffer_Release(&labels);
+    PyBuffer_Release(&offsets);
+    if (PyErr_Occurred()) {
+        return NULL;
+    }
+    Py_RETURN_NONE;
+}
+
+// Check that the FLDR table for n outcomes is a complete tree of depth k
+// whose labels are outcomes 0, ..., n-1 or the reject label n, so that
+// every walk ends at a leaf within k levels.
+static int check_fldr(int n, int *h, int k, int *labels, Py_ssize_t nlabels) {
+    if (n <= 0) {
+        PyErr_SetString(PyExc_ValueError, "n must be positive");
+        return -1;
+    }
+    long long internal = 1;
+    for (int c = 0; c < k; c++) {
+        internal = 2*internal - h[c];
+        if (internal < 0 || nlabels < internal) {
+            break;
+        }
+    }
+    if (internal != 0) {
+        PyErr_SetString(PyExc_ValueError, "table is not a complete tree");
+        return -1;
+    }
+    int accept = 0;
+    for (Py_ssize_t i = 0; i < nlabels; i++) {
+        if (labels[i] < 0 || n < labels[i]) {
+            PyErr_SetString(PyExc_ValueError,
+                "labels must be outcomes or the reject label n");
+            return -1;
+        }
+        accept |= labels[i] < n;
+    }
+    if (!accept) {
+        PyErr_SetString(PyExc_ValueError, "table has no outcome labels");
+        return -1;
+    }
+    return 0;
+}
+
+static PyObject *py_sample_fldr(PyObject *self, PyObject *args) {
+    PyObject *offsets_obj, *labels_obj, *out_obj;
+    Py_buffer offsets, labels, out;
+    int n;
+    if (!PyArg_ParseTuple(args, "iOOO",
+            &n, &offsets_obj, &labels_obj, &out_obj)) {
+        return NULL;
+    }
+    if (get_int_buffer(offsets_obj, &offsets, 0) < 0) {
+        return NULL;
+    }
+    if (get_int_buffer(labels_obj, &labels, 0) < 0) {
+        PyBuffer_Release(&offsets);
+        return NULL;
+    }
+    if (get_int_buffer(out_obj, &out, 1) < 0) {
+        PyBuffer_Release(&labels);
+        PyBuffer_Release(&offsets);
+        return NULL;
+    }
+    struct sample_fldr_s x;
+    x.n = n;
+    x.offsets.length = offsets.len / offsets.itemsize;
+    x.offsets.a = (int *) offsets.buf;
+    x.labels.length = labels.len / labels.itemsize;
+    x.labels.a = (int *) labels.buf;
+    x.k = x.offsets.length - 1;
+    int *h = get_hamming_vector(
+        x.offsets.a, x.offsets.length, x.k, x.labels.length);
+    if (h != NULL) {
+        if (check_fldr(n, h, x.k, x.labels.a, x.labels.length) == 0) {
+            FILL_SAMPLES(sample_fldr, x, out);
+        }
+        PyMem_Free(h);
+    }
+    PyBuffer_Release(&out);
+    PyBuffer_Release(&labels);
+    PyBuffer_Release(&offsets);
+    if (PyErr_Occurred()) {
+        return NULL;
+    }
+    Py_RETURN_NONE;
+}
+
+static PyMethodDef methods[] = {
+    {"seed", py_seed, METH_VARARGS,
+        "seed(s)\n\nSeed the C random bit generator (xoshiro256**)."},
+    {"sample_ky_encoding", py_sample_ky_encoding, METH_VARARGS,
+        "sample_ky_encoding(enc, out)\n\n"
+        "Fill out with samples from the packed encoding enc."},
+    {"sample_ky_matrix", py_sample_ky_matrix, METH_VARARGS,
+        "sample_ky_matrix(P, n, k, l, out)\n\n"
+        "Fill out with samples from the column-major n x k bytes P."},
+    {"sample_ky_matrix_cached", py_sample_ky_matrix_cached, METH_VARARGS,
+        "sample_ky_matrix_cached(n, k, l, offsets, labels, out)\n\n"
+        "Fill out with samples from the CSR hamming matrix (offsets, labels)."},
+    {"sample_fldr", py_sample_fldr, METH_VARARGS,
+        "sample_fldr(n, offsets, labels, out)\n\n"
+        "Fill out with samples from the Fast Loaded Dice Roller."},
+    {NULL, NULL, 0, NULL}
+};
+
+static struct PyModuleDef module = {
+    PyModuleDef_HEAD_INIT, "_sample", "Bindings for the C samplers.", -1,
+    methods
+};
+
+PyMODINIT_FUNC PyInit__sample(void) {
+    flip_init(&flip_state, 1);
+    flip_lock = PyThread_allocate_lock();
+    if (flip_lock == NULL) {
+        return PyErr_NoMemory();
+    }
+    return PyModule_Create(&module);
+}
@@ -1,35 +1,94 @@
 // Loading sampling data structures from disk.
 // ** @author: fsaad@mit.edu
 
+#include <fcntl.h>
+#include <stdint.h>
 #include <stdlib.h>
+#include <string.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
 
 #include "readio.h"
 #include "sstructs.h"
 
-// Load matrix from file.
-struct matrix_s load_matrix(FILE *fp) {
+// Header of the binary format written by optas.writeio (little-endian).
+#define BINARY_MAGIC "OPTASBIN"
+#define BINARY_VERSION 3
+#define BINARY_KIND_KY_ENC 1
+#define BINARY_KIND_KY_MAT 2
+#define BINARY_KIND_KY_MATC 3
+#define BINARY_KIND_FLDR 4
+
+struct binary_header_s {
+    char magic[8];
+    uint32_t version;
+    uint32_t kind;
+    uint32_t width;
+    uint32_t reserved;
+    int64_t n;
+    int64_t k;
+    int64_t l;
+    int64_t length;
+    char pad[8];
+};
+
+// Load 0/1 matrix from file (stored row-major) into column-major order.
+struct bitmatrix_s load_bitmatrix(FILE *fp) {
 
-    struct matrix_s mat;
+    struct bitmatrix_s mat;
     fscanf(fp, "%d %d", &(mat.nrows), &(mat.ncols));
 
-    mat.P = (int **) calloc(mat.nrows, sizeof(int **));
-    for(int r = 0; r < mat.nrows; ++r) {
-        mat.P[r] = (int *) calloc(mat.ncols, sizeof(int));
+    mat.P = (uint8_t *) calloc((size_t) mat.nrows * mat.ncols, 1);
+    for (int r = 0; r < mat.nrows; ++r) {
         for (int c = 0; c < mat.ncols; ++c){
-            fscanf(fp, "%d", &(mat.P[r][c]));
+            int v;
+            fscanf(fp, "%d", &v);
+            mat.P[(size_t) c * mat.nrows + r] = v;
         }
     }
 
     return mat;
 }
 
-void free_matrix_s (struct matrix_s x) {
-    for (int i = 0; i < x.nrows; i++) {
-        free(x.P[i]);
-    }
+void free_bitmatrix_s (struct bitmatrix_s x) {
     free(x.P);
 }
 
+// Return offsets of the columns of a hamming matrix with hamming vector h,
+// whose column c holds h[c] labels.
+struct array_s make_hamming_offsets(struct array_s h) {
+    struct array_s offsets;
+    offsets.length = h.length + 1;
+    offsets.a = (int *) calloc(offsets.length, sizeof(int));
+    for (int c = 0; c < h.length; ++c) {
+        offsets.a[c+1] = offsets.a[c] + h.a[c];
+    }
+    return offsets;
+}
+
+// Load hamming matrix from file (stored row-major), keeping the leading
+// labels of each column in one array indexed by offsets.
+struct array_s load_hamming_labels(FILE *fp, struct array_s offsets) {
+    int nrows, ncols;
+    fscanf(fp, "%d %d", &nrows, &ncols);
+
+    struct array_s labels;
+    labels.length = offsets.a[ncols];
+    labels.a = (int *) calloc(labels.length, sizeof(int));
+    for (int r = 0; r < nrows; ++r) {
+        for (int c = 0; c < ncols; ++c) {
+            int v;
+            fscanf(fp, "%d", &v);
+            if (r < offsets.a[c+1] - offsets.a[c]) {
+                labels.a[offsets.a[c] + r] = v;
+            }
+        }
+    }
+
+    return labels;
+}
+
 // Load matrix from file.
 struct array_s load_array(FILE *fp) {
 
@@ -48,11 +107,155 @@ void free_array_s (struct array_s x) {
     free(x.a);
 }
 
+// Check whether file path holds a sampler in binary format.
+int is_binary_file(char *fname) {
+    char magic[8] = {0};
+    FILE *fp = fopen(fname, "rb");
+    if (fp == NULL) {
+        printf("Failed to open file: %s\n", fname);
+        exit(1);
+    }
+    fread(magic, 1, sizeof(magic), fp);
+    fclose(fp);
+    return memcmp(magic, BINARY_MAGIC, sizeof(magic)) == 0;
+}
+
+// Exit on a binary sampler file that cannot be used.
+static void binary_error(char *fname) {
+    printf("Unsupported binary sampler file: %s\n", fname);
+    exit(1);
+}
+
+// Map binary sampler file into memory and validate its header.
+static struct mmap_s map_binary(char *fname, uint32_t kind, uint32_t width,
+        struct binary_header_s *header) {
+    int fd = open(fname, O_RDONLY);
+    struct stat st;
+    if (fd < 0 || fstat(fd, &st) < 0) {
+        printf("Failed to open file: %s\n", fname);
+        exit(1);
+    }
+    if ((size_t) st.st_size < sizeof(*header)) {
+        binary_error(fname);
+    }
+    struct mmap_s map;
+    map.length = st.st_size;
+    map.addr = mmap(NULL, map.length, PROT_READ, MAP_PRIVATE, fd, 0);
+    close(fd);
+    if (map.addr == MAP_FAILED) {
+        printf("Failed to map file: %s\n", fname);
+        exit(1);
+    }
+    memcpy(header, map.addr, sizeof(*header));
+    // The arrays are used in place, so they must be little-endian and
+    // have the width of the C arrays.
+    uint16_t one = 1;
+    if (*(uint8_t *)&one != 1 || header->version != BINARY_VERSION
+            || header->kind != kind || header->width != width
+            || header->n < 0 || INT32_MAX < header->n
+            || header->k < 0 || INT32_MAX <= header->k
+            || header->length < 0 || INT32_MAX < header->length) {
+        binary_error(fname);
+    }
+    return map;
+}
+
+// Return pointer to the array of count items of width bytes at offset in
+// the mapping, or exit if the file is too short to hold it.
+static void *binary_array(struct mmap_s map, size_t *offset, int64_t count,
+        size_t width, char *fname) {
+    if (count < 0) {
+        binary_error(fname);
+    }
+    size_t nbytes = count * width;
+    if (map.length < *offset || map.length - *offset < nbytes) {
+        binary_error(fname);
+    }
+    void *a = (char *) map.addr + *offset;
+    *offset += nbytes + (8 - nbytes % 8) % 8;
+    return a;
+}
+
+// Check that offsets start at 0, do not decrease, and end at the number
+// of labels, so that each column is within the labels.
+static void check_binary_offsets(struct array_s offsets,
+        struct array_s labels, char *fname) {
+    if (offsets.a[0] != 0 || offsets.a[offsets.length-1] != labels.length) {
+        binary_error(fname);
+    }
+    for (int c = 0; c + 1 < offsets.length; ++c) {
+        if (offsets.a[c+1] < offsets.a[c]) {
+            binary_error(fname);
+        }
+    }
+}
+
+// Load sample_ky_encoding data structure from binary file path.
+struct sample_ky_encoding_s read_sample_ky_encoding_binary(char *fname) {
+    struct binary_header_s header;
+    struct sample_ky_encoding_s x;
+    x.map = map_binary(fname, BINARY_KIND_KY_ENC, sizeof(int), &header);
+    size_t offset = sizeof(header);
+    x.n = header.n;
+    x.k = header.k;
+    x.encoding.length = header.length;
+    x.encoding.a = binary_array(x.map, &offset, header.length, sizeof(int),
+        fname);
+    return x;
+}
+
+// Load sample_ky_matrix data structure from binary file path.
+struct sample_ky_matrix_s read_sample_ky_matrix_binary(char *fname) {
+    struct binary_header_s header;
+    struct sample_ky_matrix_s x;
+    x.map = map_binary(fname, BINARY_KIND_KY_MAT, 1, &header);
+    size_t offset = sizeof(header);
+    x.k = header.k;
+    x.l = header.l;
+    x.P.nrows = header.n;
+    x.P.ncols = header.k;
+    if (header.length != header.n * header.k) {
+        binary_error(fname);
+    }
+    x.P.P = binary_array(x.map, &offset, header.length, 1, fname);
+    return x;
+}
+
+// Load sample_ky_matrix_cached data structure from binary file path. The
+// offsets and labels are used in the mapping, and only h is allocated.
+struct sample_ky_matrix_cached_s read_sample_ky_matrix_cached_binary(
+        char *fname) {
+    struct binary_header_s header;
+    struct sample_ky_matrix_cached_s x;
+    x.map = map_binary(fname, BINARY_KIND_KY_MATC, sizeof(int), &header);
+    size_t offset = sizeof(header);
+    x.k = header.k;
+    x.l = header.l;
+    x.offsets.length = header.k + 1;
+    x.offsets.a = binary_array(x.map, &offset, x.offsets.length,
+        sizeof(int), fname);
+    x.labels.length = header.length - x.offsets.length;
+    x.labels.a = binary_array(x.map, &offset, x.labels.length,
+        sizeof(int), fname);
+    check_binary_offsets(x.offsets, x.labels, fname);
+    x.h.length = header.k;
+    x.h.a = (int *) calloc(x.h.length, sizeof(int));
+    for (int c = 0; c < x.h.length; ++c) {
+        x.h.a[c] = x.offsets.a[c+1] - x.offsets.a[c];
+    }
+    return x;
+}
+
 // Load sample_ky_encoding data structure from file path.
 struct sample_ky_encoding_s read_sample_ky_encoding(char *fname) {
+    if (is_binary_file(fname)) {
+        return read_sample_ky_encoding_binary(fname);
+    }
+
     FILE *fp = fopen(fname, "r");
 
     struct sample_ky_encoding_s x;
+    x.map.addr = NULL;
     fscanf(fp, "%d %d", &(x.n), &(x.k));
     x.encoding = load_array(fp);
 
@@ -61,33 +264,70 @@ struct sample_ky_encoding_s read_sample_ky_encoding(char *fname) {
 }
 
 void free_sample_ky_encoding_s (struct sample_ky_encoding_s x) {
-    free_array_s(x.encoding);
+    if (x.map.addr != NULL) {
+        munmap(x.map.addr, x.map.length);
+    } else {
+        free_array_s(x.encoding);
+    }
+}
+
+// Load sample_ky_jump data structure from file path.
+struct sample_ky_jump_s read_sample_ky_jump(char *fname) {
+    FILE *fp = fopen(fname, "r");
+
+    struct sample_ky_jump_s x;
+    fscanf(fp, "%d %d", &(x.n), &(x.w));
+    x.target = load_array(fp);
+    x.nbits = load_array(fp);
+
+    fclose(fp);
+    return x;
+}
+
+void free_sample_ky_jump_s (struct sample_ky_jump_s x) {
+    free_array_s(x.target);
+    free_array_s(x.nbits);
 }
 
 // Load sample_ky_matrix data structure from file path.
 struct sample_ky_matrix_s read_sample_ky_matrix(char *fname) {
+    if (is_binary_file(fname)) {
+        return read_sample_ky_matrix_binary(fname);
+    }
+
     FILE *fp = fopen(fname, "r");
 
     struct sample_ky_matrix_s x;
+    x.map.addr = NULL;
     fscanf(fp, "%d %d", &(x.k), &(x.l));
-    x.P = load_matrix(fp);
+    x.P = load_bitmatrix(fp);
 
     fclose(fp);
     return x;
 }
 
 void free_sample_ky_matrix_s (struct sample_ky_matrix_s x) {
-    free_matrix_s(x.P);
+    if (x.map.addr != NULL) {
+        munmap(x.map.addr, x.map.length);
+    } else {
+        free_bitmatrix_s(x.P);
+    }
 }
 
 // Load sample_ky_matrix_cached data structure from file path.
 struct sample_ky_matrix_cached_s read_sample_ky_matrix_cached(char *fname) {
+    if (is_binary_file(fname)) {
+        return read_sample_ky_matrix_cached_binary(fname);
+    }
+
     FILE *fp = fopen(fname, "r");
 
     struct sample_ky_matrix_cached_s x;
+    x.map.addr = NULL;
     fscanf(fp, "%d %d", &(x.k), &(x.l));
     x.h = load_array(fp);
-    x.T = load_matrix(fp);
+    x.offsets = make_hamming_offsets(x.h);
+    x.labels = load_hamming_labels(fp, x.offsets);
 
     fclose(fp);
     return x;
@@ -95,5 +335,55 @@ struct sample_ky_matrix_cached_s read_sample_ky_matrix_cached(char *fname) {
 
 void free_sample_ky_matrix_cached_s (struct sample_ky_matrix_cached_s x) {
     free_array_s(x.h);
-    free_matrix_s(x.T);
+    if (x.map.addr != NULL) {
+        munmap(x.map.addr, x.map.length);
+    } else {
+        free_array_s(x.offsets);
+        free_array_s(x.labels);
+    }
+}
+
+// Load sample_fldr data structure from binary file path.
+struct sample_fldr_s read_sample_fldr_binary(char *fname) {
+    struct binary_header_s header;
+    struct sample_fldr_s x;
+    x.map = map_binary(fname, BINARY_KIND_FLDR, sizeof(int), &header);
+    size_t offset = sizeof(header);
+    x.n = header.n;
+    x.k = header.k;
+    x.offsets.length = header.k + 1;
+    x.offsets.a = binary_array(x.map, &offset, x.offsets.length,
+        sizeof(int), fname);
+    x.labels.length = header.length - x.offsets.length;
+    x.labels.a = binary_array(x.map, &offset, x.labels.length,
+        sizeof(int), fname);
+    check_binary_offsets(x.offsets, x.labels, fname);
+    return x;
+}
+
+// Load sample_fldr data structure from file path.
+struct sample_fldr_s read_sample_fldr(char *fname) {
+    if (is_binary_file(fname)) {
+        return read_sample_fldr_binary(fname);
+    }
+
+    FILE *fp = fopen(fname, "r");
+
+    struct sample_fldr_s x;
+    x.map.addr = NULL;
+    fscanf(fp, "%d %d", &(x.n), &(x.k));
+    x.offsets = load_array(fp);
+    x.labels = load_array(fp);
+
+    fclose(fp);
+    return x;
+}
+
+void free_sample_fldr_s (struct sample_fldr_s x) {
+    if (x.map.addr != NULL) {
+        munmap(x.map.addr, x.map.length);
+    } else {
+        free_array_s(x.offsets);
+        free_array_s(x.labels);
+    }
 }
@@ -7,16 +7,28 @@
 #include <stdio.h>
 #include "sstructs.h"
 
-struct matrix_s load_matrix(FILE *fp);
+struct bitmatrix_s load_bitmatrix(FILE *fp);
+struct array_s make_hamming_offsets(struct array_s h);
+struct array_s load_hamming_labels(FILE *fp, struct array_s offsets);
 struct array_s load_array(FILE *fp);
+int is_binary_file(char *fname);
+struct sample_ky_encoding_s read_sample_ky_encoding_binary(char *fname);
+struct sample_ky_matrix_s read_sample_ky_matrix_binary(char *fname);
+struct sample_ky_matrix_cached_s read_sample_ky_matrix_cached_binary(
+        char *fname);
 struct sample_ky_encoding_s read_sample_ky_encoding(char *fname);
+struct sample_ky_jump_s read_sample_ky_jump(char *fname);
 struct sample_ky_matrix_s read_sample_ky_matrix(char *fname);
 struct sample_ky_matrix_cached_s read_sample_ky_matrix_cached(char *fname);
+struct sample_fldr_s read_sample_fldr_binary(char *fname);
+struct sample_fldr_s read_sample_fldr(char *fname);
 
-void free_matrix_s(struct matrix_s x);
+void free_bitmatrix_s(struct bitmatrix_s x);
 void free_array_s(struct array_s x);
 void free_sample_ky_encoding_s(struct sample_ky_encoding_s x);
+void free_sample_ky_jump_s(struct sample_ky_jump_s x);
 void free_sample_ky_matrix_s(struct sample_ky_matrix_s x);
 void free_sample_ky_matrix_cached_s(struct sample_ky_matrix_cached_s x);
+void free_sample_fldr_s(struct sample_fldr_s x);
 
 #endif
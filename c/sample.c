@@ -8,7 +8,7 @@
 #include "sample.h"
 #include "sstructs.h"
 
-int sample_ky_encoding(struct sample_ky_encoding_s *x) {
+int sample_ky_encoding(struct sample_ky_encoding_s *x, struct flip_s *f) {
 
     if (x->encoding.length == 1) {
         return 1;
@@ -17,7 +17,7 @@ int sample_ky_encoding(struct sample_ky_encoding_s *x) {
     int *enc = x->encoding.a;
     int c = 0;
     while (true) {
-        int b = flip();
+        int b = flip(f);
         c = enc[c+b];
         if (enc[c] < 0) {
             return -enc[c];
@@ -25,24 +25,49 @@ int sample_ky_encoding(struct sample_ky_encoding_s *x) {
     }
 }
 
-int sample_ky_matrix(struct sample_ky_matrix_s *x) {
+int sample_ky_jump(struct sample_ky_jump_s *x, struct flip_s *f) {
+    int *target = x->target.a;
+    int *nbits = x->nbits.a;
+    int w = x->w;
+    int r = 0;
+    while (true) {
+        int i = r + flip_peek(f, w);
+        flip_skip(f, nbits[i]);
+        if (target[i] < 0) {
+            return -target[i];
+        }
+        r = target[i];
+    }
+}
+
+int sample_ky_matrix(struct sample_ky_matrix_s *x, struct flip_s *f) {
     if (x->P.nrows == 1) {
         return 1;
     }
 
-    int **P = x->P.P;
+    int nrows = x->P.nrows;
     int c = 0;
     int d = 0;
 
     while (true) {
-        int b = flip();
+        int b = flip(f);
         d = 2 * d + (1-b);
-        for (int r = 0; r < x->P.nrows; r++) {
-            d = d - P[r][c];
-            if (d == - 1) {
-                return r + 1;
+        const uint8_t *col = x->P.P + (size_t) c * nrows;
+        // The contiguous column is summed with vector instructions, and
+        // scanned entry by entry only when it holds the leaf.
+        int h = 0;
+        for (int r = 0; r < nrows; r++) {
+            h += col[r];
+        }
+        if (d < h) {
+            for (int r = 0; r < nrows; r++) {
+                d = d - col[r];
+                if (d == - 1) {
+                    return r + 1;
+                }
             }
         }
+        d = d - h;
         if (c == x->k - 1) {
             c = x->l;
         } else {
@@ -51,22 +76,24 @@ int sample_ky_matrix(struct sample_ky_matrix_s *x) {
     }
 }
 
-int sample_ky_matrix_cached(struct sample_ky_matrix_cached_s *x) {
-    if (x->T.nrows == 1) {
-        return 1;
+int sample_ky_matrix_cached(struct sample_ky_matrix_cached_s *x,
+        struct flip_s *f) {
+    if (x->k == 1 && x->l == 0) {
+        return x->labels.a[0] + 1;
     }
 
-    int **T = x->T.P;
     int *h = x->h.a;
+    int *offsets = x->offsets.a;
+    int *labels = x->labels.a;
 
     int c = 0;
     int d = 0;
 
     while (true) {
-        int b = flip();
+        int b = flip(f);
         d = 2 * d + (1-b);
         if (d < h[c]) {
-            return T[d][c] + 1;
+            return labels[offsets[c] + d] + 1;
         }
         d = d - h[c];
         if (c == x->k - 1) {
@@ -76,3 +103,32 @@ int sample_ky_matrix_cached(struct sample_ky_matrix_cached_s *x) {
         }
     }
 }
+
+int sample_fldr(struct sample_fldr_s *x, struct flip_s *f) {
+    if (x->n == 1) {
+        return 1;
+    }
+
+    int *offsets = x->offsets.a;
+    int *labels = x->labels.a;
+
+    int c = 0;
+    int d = 0;
+
+    while (true) {
+        int b = flip(f);
+        d = 2 * d + (1-b);
+        int h = offsets[c+1] - offsets[c];
+        if (d < h) {
+            int r = labels[offsets[c] + d];
+            if (r < x->n) {
+                return r + 1;
+            }
+            d = 0;
+            c = 0;
+        } else {
+            d = d - h;
+            c = c + 1;
+        }
+    }
+}
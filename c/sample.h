@@ -4,9 +4,13 @@
 #ifndef SAMPLE_H
 #define SAMPLE_H
 
+#include "flip.h"
 #include "sstructs.h"
 
-int sample_ky_encoding(struct sample_ky_encoding_s *x);
-int sample_ky_matrix(struct sample_ky_matrix_s *x);
-int sample_ky_matrix_cached(struct sample_ky_matrix_cached_s *x);
+int sample_ky_encoding(struct sample_ky_encoding_s *x, struct flip_s *f);
+int sample_ky_jump(struct sample_ky_jump_s *x, struct flip_s *f);
+int sample_ky_matrix(struct sample_ky_matrix_s *x, struct flip_s *f);
+int sample_ky_matrix_cached(struct sample_ky_matrix_cached_s *x,
+        struct flip_s *f);
+int sample_fldr(struct sample_fldr_s *x, struct flip_s *f);
 #endif
@@ -4,14 +4,15 @@
 #ifndef SSTRUCTS_H
 #define SSTRUCTS_H
 
+#include <stdint.h>
 #include <stdlib.h>
 #include <stdio.h>
 
-// matrix
-struct matrix_s {
+// 0/1 matrix, stored column-major: entry (r, c) is P[c*nrows + r]
+struct bitmatrix_s {
     int nrows;
     int ncols;
-    int **P;
+    uint8_t *P;
 };
 
 // array
@@ -21,18 +22,34 @@ struct array_s {
 };
 
 
+// memory-mapped file (addr is NULL for samplers read from text)
+struct mmap_s {
+    void *addr;
+    size_t length;
+};
+
 // sample_ky_encoding
 struct sample_ky_encoding_s {
     int n;
     int k;
     struct array_s encoding;
+    struct mmap_s map;
+};
+
+// sample_ky_jump
+struct sample_ky_jump_s {
+    int n;
+    int w;
+    struct array_s target;
+    struct array_s nbits;
 };
 
 // sample_ky_matrix
 struct sample_ky_matrix_s {
     int k;
     int l;
-    struct matrix_s P;
+    struct bitmatrix_s P;
+    struct mmap_s map;
 };
 
 // sample_ky_matrix_cached
@@ -40,7 +57,18 @@ struct sample_ky_matrix_cached_s {
     int k;
     int l;
     struct array_s h;
-    struct matrix_s T;
+    struct array_s offsets;     // column c of T is labels[offsets[c]:...]
+    struct array_s labels;
+    struct mmap_s map;
+};
+
+// sample_fldr (label n in labels is the reject outcome)
+struct sample_fldr_s {
+    int n;
+    int k;
+    struct array_s offsets;
+    struct array_s labels;
+    struct mmap_s map;
 };
 
 #endif
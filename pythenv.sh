@@ -6,19 +6,22 @@ set -Ceu
 root=`cd -- "$(dirname -- "$0")" && pwd`
 platform=$("${PYTHON}" -c 'import distutils.util as u; print(u.get_platform())')
 version=$("${PYTHON}" -c 'import sys; print(sys.version[0:3])')
+tag=$("${PYTHON}" -c 'import sys; print(sys.implementation.cache_tag)')
 
 # The lib directory varies depending on
 #
-# (a) whether there are extension modules (here, no); and
+# (a) whether there are extension modules (here, the optional C samplers,
+# whose directory name may include the interpreter tag); and
 # (b) whether some Debian maintainer decided to patch the local Python
 # to behave as though there were.
 #
 # But there's no obvious way to just ask distutils what the name will
 # be.  There's no harm in naming a pathname that doesn't exist, other
-# than a handful of microseconds of runtime, so we'll add both.
+# than a handful of microseconds of runtime, so we'll add them all.
 libdir="${root}/build/lib"
 plat_libdir="${libdir}.${platform}-${version}"
-export PYTHONPATH="${libdir}:${plat_libdir}${PYTHONPATH:+:${PYTHONPATH}}"
+tag_libdir="${libdir}.${platform}-${tag}"
+export PYTHONPATH="${libdir}:${plat_libdir}:${tag_libdir}${PYTHONPATH:+:${PYTHONPATH}}"
 
 bindir="${root}/build/scripts-${version}"
 export PATH="${bindir}${PATH:+:${PATH}}"
@@ -3,6 +3,7 @@
 
 import os
 import re
+from setuptools import Extension
 from setuptools import setup
 
 # Determine the version (hardcoded).
@@ -42,9 +43,21 @@ setup(
             'orderm2',
             'phi',
             '../c/*.c',
+            '../c/*.h',
         ],
     },
+    # The C samplers are optional; the Python samplers are used if the
+    # extension fails to compile.
+    ext_modules=[
+        Extension(
+            'optas._sample',
+            sources=['c/pysample.c', 'c/sample.c', 'c/flip.c'],
+            include_dirs=['c'],
+            optional=True,
+        ),
+    ],
     extras_require={
+        'numpy': ['numpy'],
         'tests': ['pytest', 'scipy']
     }
 )
@@ -0,0 +1,161 @@
+# Copyright 2019 MIT Probabilistic Computing Project.
+# Released under Apache 2.0; refer to LICENSE.txt
+
+"""Exact cost profile of Knuth-Yao samplers, computed from the DDG matrix.
+
+In the DDG tree of an n x k matrix P with prefix length l, column c of P
+holds the leaves at depth c + 1, so that h[c] = sum(P[r][c]) leaves
+terminate a walk after c + 1 flips, each with probability 2**-(c+1). A
+walk that reaches a back-edge at depth k restarts at depth l, so a leaf at
+depth j > l is also reached after j + m*(k - l) flips, with probability
+2**-j * 2**(m*(l-k)) for each m >= 1.
+"""
+
+from collections import Counter
+from collections import namedtuple
+from fractions import Fraction
+from math import log2
+
+from .matrix import make_hamming_vector
+
+Profile = namedtuple('Profile', [
+    'n',                # number of outcomes
+    'k',                # depth of the tree (before the first back-edge)
+    'l',                # depth at which back-edges restart the walk
+    'probabilities',    # output distribution (Fractions)
+    'entropy',          # Shannon entropy of the output distribution
+    'expected_bits',    # expected number of flips per sample (Fraction)
+    'entropy_gap',      # expected_bits - entropy, which is less than 2
+    'bits_pmf',         # bits_pmf[j-1] = Pr[j flips and no back-edge]
+    'backedge_prob',    # Pr[the walk reaches a back-edge]
+    'restart_ratio',    # Pr[another back-edge, after restarting]
+    'size_enc',         # entries in the packed encoding
+    'size_mat',         # entries in the DDG matrix
+    'size_matc',        # entries in the offsets and labels of the CSR form
+])
+
+def get_encoding_matrix(enc, n, k):
+    """Return DDG matrix P and prefix length l of a packed encoding."""
+    if len(enc) == 1:
+        return [[1]], 0
+    P = [[0] * k for _r in range(n)]
+    l = k
+    depth = {0: 0}
+    level = [0]
+    while level:
+        frontier = []
+        for c in level:
+            for child in (enc[c], enc[c+1]):
+                if child in depth:
+                    l = depth[child]
+                    continue
+                depth[child] = depth[c] + 1
+                if enc[child] < 0:
+                    P[-enc[child]-1][depth[c]] = 1
+                else:
+                    frontier.append(child)
+        level = frontier
+    return P, l
+
+def get_bits_prob(profile, t):
+    """Return Pr[exactly t flips] for the sampler with the given Profile."""
+    k, l = profile.k, profile.l
+    if t <= k:
+        return profile.bits_pmf[t-1] if 0 < t else Fraction(int(k == 0))
+    if l == k:
+        return Fraction(0)
+    m, j = divmod(t - l - 1, k - l)
+    return profile.bits_pmf[l + j] * profile.restart_ratio**m
+
+def get_expected_bits(h, k, l):
+    """Return expected number of flips of the DDG tree with hamming vector h."""
+    bits_pmf = [Fraction(h[c], 2**(c+1)) for c in range(k)]
+    first = sum((j + 1) * p for j, p in enumerate(bits_pmf))
+    if l == k:
+        return first
+    # Flips and probability of termination within a pass after restarting.
+    loop = bits_pmf[l:]
+    mass = sum(loop)
+    flips = sum((l + 1 + j) * p for j, p in enumerate(loop))
+    r = Fraction(1, 2**(k-l))
+    return first + flips * r/(1-r) + (k-l) * mass * r/(1-r)**2
+
+def get_expected_bits_weights(Ms):
+    """Return expected flips (float) of the Knuth-Yao sampler for Ms/sum(Ms).
+
+    Outcome i contributes sum_j j * b_j * 2**-j over the bits b_j of its
+    probability x, which equals sum_{m >= 0} frac(2**m * x) * 2**-m. The
+    series is summed once per distinct weight, without building the DDG
+    tree, until the remaining terms are below 2**-64.
+    """
+    return get_expected_bits_counts(Counter(Ms))
+
+def get_expected_bits_counts(counts):
+    """Return get_expected_bits_weights of weights a, each counts[a] times."""
+    M = sum(a*count for a, count in counts.items())
+    nterms = 64 + sum(counts.values()).bit_length()
+    total = 0.
+    for a, count in counts.items():
+        if not 0 < a < M:
+            continue
+        bits = 0.
+        r = a
+        for m in range(nterms):
+            if r == 0:
+                break
+            bits += (r / M) / 2**m
+            r = (2*r) % M
+        total += count * bits
+    return total
+
+def get_encoding_size(h, k):
+    """Return entries in the packed encoding of the DDG tree."""
+    # Internal nodes at each depth; each holds two entries in the encoding.
+    internal = [1]
+    for c in range(k - 1):
+        internal.append(2*internal[c] - h[c])
+    return 2*sum(internal) + sum(h)
+
+def profile_matrix(P, k, l, size_enc=None):
+    """Return Profile of the Knuth-Yao sampler for DDG matrix P."""
+    n = len(P)
+    if (k, l) == (1, 0) and P == [[1]]:
+        return Profile(1, 0, 0, [Fraction(1)], 0., Fraction(0), 0.,
+            [], Fraction(0), Fraction(0), 1, 1, 3)
+    h = make_hamming_vector(P)
+    bits_pmf = [Fraction(h[c], 2**(c+1)) for c in range(k)]
+    backedge_prob = 1 - sum(bits_pmf)
+    restart_ratio = Fraction(1, 2**(k-l))
+    expected_bits = get_expected_bits(h, k, l)
+    if l < k:
+        r = restart_ratio
+        scale = 1 + r/(1-r)
+    else:
+        scale = 1
+    probabilities = [
+        sum(Fraction(P[i][c], 2**(c+1)) * (scale if l <= c else 1)
+            for c in range(k))
+        for i in range(n)
+    ]
+    entropy = -sum(float(p) * log2(p) for p in probabilities if p > 0)
+    if size_enc is None:
+        size_enc = get_encoding_size(h, k)
+    return Profile(
+        n=n, k=k, l=l,
+        probabilities=probabilities,
+        entropy=entropy,
+        expected_bits=expected_bits,
+        entropy_gap=float(expected_bits) - entropy,
+        bits_pmf=bits_pmf,
+        backedge_prob=backedge_prob,
+        restart_ratio=restart_ratio,
+        size_enc=size_enc,
+        size_mat=n*k,
+        size_matc=(k + 1) + sum(h),
+    )
+
+def profile(sampler):
+    """Return Profile of a Sampler (or any object with enc, n, and k)."""
+    P, l = get_encoding_matrix(sampler.enc, sampler.n, sampler.k)
+    k = len(P[0])
+    return profile_matrix(P, k, l, size_enc=len(sampler.enc))
@@ -0,0 +1,180 @@
+# Copyright 2019 MIT Probabilistic Computing Project.
+# Released under Apache 2.0; refer to LICENSE.txt
+
+"""Sample blocks of m i.i.d. draws from p using a sampler for p^m.
+
+A Knuth-Yao sampler for p uses between H(p) and H(p) + 2 flips per draw,
+so a sampler for the product distribution p^m uses at most H(p) + 2/m
+flips per draw. Outcome x of p^m (in {1, ..., n^m}) encodes the draws
+(x_1, ..., x_m) as the mixed-radix number x - 1 = sum_j (x_j - 1) n^(m-j).
+"""
+
+from collections import Counter
+from fractions import Fraction
+from itertools import combinations_with_replacement
+from itertools import product
+from math import factorial
+from math import log2
+
+from .analysis import get_encoding_size
+from .analysis import get_expected_bits_counts
+from .construct import construct_sample_ky_matrix
+from .divergences import KERNELS
+from .matrix import get_expansion_words
+from .matrix import make_hamming_vector
+from .matrix import popcount
+from .opt import get_optimal_probabilities
+from .packing import make_ddg_encoding
+from .sampler import Sampler
+from .utils import get_Zkl
+from .utils import get_binary_expansion_length
+from .utils import get_common_denominator
+
+# Default cap on the entries of the packed encoding of the block sampler.
+MAXSIZE = 2**20
+
+def get_product_distribution(p_target, m):
+    """Return p^m, with outcomes in mixed-radix order."""
+    p = [Fraction(x) for x in p_target]
+    probabilities = [Fraction(1)]
+    for _j in range(m):
+        probabilities = [a*b for a, b in product(probabilities, p)]
+    return probabilities
+
+def get_product_counts(p_target, m):
+    """Return Counter of the distinct probabilities of p^m.
+
+    Each probability counts the outcomes of p^m that have it, so only the
+    (n + m - 1 choose m) multisets of draws are enumerated.
+    """
+    p = [Fraction(x) for x in p_target]
+    counts = Counter()
+    for draws in combinations_with_replacement(range(len(p)), m):
+        probability = Fraction(1)
+        ways = factorial(m)
+        for i, c in Counter(draws).items():
+            probability *= p[i]**c
+            ways //= factorial(c)
+        counts[probability] += ways
+    return counts
+
+def get_numerator_counts(counts, Z):
+    """Return Counter of the numerators over Z of the probabilities in counts.
+
+    Probabilities that are not multiples of 1/Z are rounded to the nearest.
+    """
+    Ms = Counter()
+    for x, c in counts.items():
+        Ms[round(x*Z)] += c
+    return Ms
+
+def get_counts_size(Ms, Z):
+    """Return entries in the packed encoding of the sampler of Ms / Z.
+
+    The DDG tree has L leaves, one per set bit in the expansion words of
+    the numerators, and B back-edges, one per walk left after the first l
+    levels, so that it has L + B - 1 internal nodes. The size is exact if
+    Z is the least common denominator and sum(Ms) == Z.
+    """
+    k, l = get_binary_expansion_length(Z)
+    Zkl = get_Zkl(k, l)
+    words = get_expansion_words([M * (Zkl // Z) for M in Ms], k, l)
+    leaves = sum(popcount(w)*c for w, c in zip(words, Ms.values()))
+    prefix = sum((w >> (k - l))*c for w, c in zip(words, Ms.values()))
+    backedges = max(0, pow(2, l) - prefix)
+    return 3*leaves + 2*backedges - 2
+
+def decode_block(x, n, m):
+    """Return the m draws in {1, ..., n} encoded by outcome x of p^m."""
+    x = x - 1
+    draws = [0] * m
+    for j in reversed(range(m)):
+        x, draws[j] = divmod(x, n)
+        draws[j] += 1
+    return draws
+
+def get_block_Z(Z, m):
+    """Return Z**m, the precision of a block of m draws of precision Z."""
+    return None if Z is None else Z**m
+
+def make_block(p_target, m, Z=None, kernel='kl'):
+    """Return packed DDG matrix (P, k, l) of p^m.
+
+    The matrix is exact if Z is None, and otherwise that of the optimal
+    Z-type approximation of p^m under the given divergence.
+    """
+    p_block = get_product_distribution(p_target, m)
+    if Z is not None:
+        p_block = get_optimal_probabilities(Z, p_block, KERNELS[kernel])
+    return construct_sample_ky_matrix(p_block, packed=True)
+
+class BlockSampler(object):
+    """Sampler of p that draws m samples at a time from a sampler of p^m."""
+    __slots__ = ('sampler', 'n', 'm')
+
+    def __init__(self, sampler, n, m):
+        assert sampler.n == n**m
+        self.sampler = sampler
+        self.n = n
+        self.m = m
+
+    @classmethod
+    def from_distribution(cls, p_target, m=None, maxsize=MAXSIZE, Z=None,
+            kernel='kl'):
+        """Return BlockSampler for p_target.
+
+        If Z is not None, each block is the optimal Z**m-type approximation
+        of p^m (see make_block), so that every draw keeps the precision of
+        a Z-type approximation of p. If m is None, m = 1, 2, ... are tried
+        until the sampler of p^m exceeds maxsize entries, its expected flips
+        per draw stop decreasing, or they reach H(p). Both are computed from
+        the distinct probabilities of p^m (rounded to multiples of 1/Z**m),
+        so only the chosen block is built.
+        """
+        n = len(p_target)
+        if Z is not None and Z < n:
+            raise ValueError('Z=%d is less than the %d outcomes.' % (Z, n))
+        if m is None and n == 1:
+            m = 1
+        if m is not None:
+            P, k, l = make_block(p_target, m, get_block_Z(Z, m), kernel)
+            return cls(Sampler(make_ddg_encoding(P, k, l), n**m, k), n, m)
+        entropy = -sum(float(p)*log2(p) for p in p_target if 0 < p)
+        npositive = sum(1 for p in p_target if 0 < p)
+        candidates = []
+        m = 1
+        while 3*npositive**m - 2 <= maxsize:
+            counts = get_product_counts(p_target, m)
+            Zm = get_block_Z(Z, m) or get_common_denominator(counts)
+            Ms = get_numerator_counts(counts, Zm)
+            if maxsize < get_counts_size(Ms, Zm):
+                break
+            cost = get_expected_bits_counts(Ms) / m
+            if candidates and candidates[-1][0] <= cost:
+                break
+            candidates.append((cost, m))
+            if cost - entropy < 1e-9:
+                break
+            m += 1
+        # The size of an approximation is known once it is optimized.
+        for _cost, m in sorted(candidates):
+            P, k, l = make_block(p_target, m, get_block_Z(Z, m), kernel)
+            if get_encoding_size(make_hamming_vector(P), k) <= maxsize:
+                return cls(Sampler(make_ddg_encoding(P, k, l), n**m, k), n, m)
+        assert False, 'No block sampler fits in %d.' % (maxsize,)
+
+    def sample_block(self, bitsource=None):
+        """Return list of m samples in {1, ..., n}."""
+        return decode_block(self.sampler.sample(bitsource), self.n, self.m)
+
+    def sample_n(self, size, bitsource=None):
+        """Return list of size samples, drawing whole blocks.
+
+        The unused draws of the last block are discarded.
+        """
+        nblocks = -(-size // self.m)
+        blocks = self.sampler.sample_n(nblocks, bitsource)
+        draws = []
+        for x in blocks:
+            draws.extend(decode_block(int(x), self.n, self.m))
+        return draws[:size]
@@ -0,0 +1,174 @@
+# Copyright 2019 MIT Probabilistic Computing Project.
+# Released under Apache 2.0; refer to LICENSE.txt
+
+"""Content-addressed cache of samplers for optimal approximations, with an
+in-memory LRU tier and an optional on-disk tier."""
+
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+from array import array
+from collections import OrderedDict
+from fractions import Fraction
+
+from . import __version__
+from .divergences import KERNELS
+from .opt import get_optimal_probabilities
+from .readio import read_sample_ky_encoding_binary
+from .sampler import Sampler
+from .utils import get_Zkl
+from .writeio import write_sample_ky_encoding_binary
+
+MEMSIZE = 128
+DISKSIZE = 2**30
+SUFFIX = '.bin'
+TMPSUFFIX = '.tmp'
+TMPAGE = 3600
+
+def get_cache_key(p_target, kernel, Z=None, k=None, l=None):
+    """Return hex digest identifying the approximation of p_target.
+
+    Exactly one of Z or (k, l) must be given; the probabilities are hashed
+    as reduced fractions, so equal values of any numeric type share a key.
+    """
+    assert (Z is None) != (k is None and l is None)
+    assert kernel in KERNELS
+    h = hashlib.sha256()
+    h.update(b'optas %s\n' % (__version__.encode('ascii'),))
+    h.update(b'kernel %s\n' % (kernel.encode('ascii'),))
+    if Z is not None:
+        h.update(b'Z %d\n' % (Z,))
+    else:
+        h.update(b'k %d l %d\n' % (k, l))
+    for p in p_target:
+        r = Fraction(p)
+        h.update(b'%d/%d\n' % (r.numerator, r.denominator))
+    return h.hexdigest()
+
+def read_encoding(path):
+    """Return (enc, n, k) from the binary encoding at path, copied into an
+    array so that the memory map of the file is closed."""
+    view, n, k = read_sample_ky_encoding_binary(path)
+    with view:
+        enc = array(view.format, view.tobytes())
+        buf = view.obj
+    if isinstance(buf, mmap.mmap):
+        buf.close()
+    return enc, n, k
+
+class SamplerCache(object):
+    """Cache of samplers keyed by get_cache_key.
+
+    Up to memsize samplers are kept in memory. If directory is given, each
+    sampler is also written there in the binary encoding format; files are
+    replaced atomically and the least recently used are removed once the
+    directory holds more than disksize bytes. Samplers read from disk are
+    copied into memory, and temporary files left by interrupted writes are
+    removed once they are older than TMPAGE seconds.
+    """
+
+    def __init__(self, directory=None, memsize=MEMSIZE, disksize=DISKSIZE):
+        assert 0 < memsize
+        self.directory = directory
+        self.memsize = memsize
+        self.disksize = disksize
+        self.memory = OrderedDict()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self.evict()
+
+    def get_path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def get(self, key):
+        """Return cached sampler for key, or None."""
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return self.memory[key]
+        if self.directory is None:
+            return None
+        path = self.get_path(key)
+        try:
+            enc, n, k = read_encoding(path)
+        except (OSError, ValueError, TypeError, AssertionError,
+                struct.error):
+            return None
+        # Record the access for eviction.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        sampler = Sampler(enc, n, k)
+        self.put_memory(key, sampler)
+        return sampler
+
+    def put(self, key, sampler):
+        """Add sampler for key to both tiers."""
+        self.put_memory(key, sampler)
+        if self.directory is not None:
+            self.put_disk(key, sampler)
+
+    def put_memory(self, key, sampler):
+        self.memory[key] = sampler
+        self.memory.move_to_end(key)
+        while self.memsize < len(self.memory):
+            self.memory.popitem(last=False)
+
+    def put_disk(self, key, sampler):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=TMPSUFFIX)
+        os.close(fd)
+        try:
+            width = sampler.enc.itemsize
+            write_sample_ky_encoding_binary(
+                sampler.enc, sampler.n, sampler.k, tmp, width=width)
+            os.replace(tmp, self.get_path(key))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used files until within disksize, and stale
+        temporary files."""
+        entries = []
+        now = time.time()
+        for name in os.listdir(self.directory):
+            if not name.endswith((SUFFIX, TMPSUFFIX)):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+                if name.endswith(TMPSUFFIX):
+                    if st.st_mtime < now - TMPAGE:
+                        os.unlink(path)
+                    continue
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+        total = sum(size for _mtime, size, _name in entries)
+        for _mtime, size, name in sorted(entries):
+            if total <= self.disksize:
+                break
+            try:
+                os.unlink(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            total -= size
+
+    def get_sampler(self, p_target, kernel, Z=None, k=None, l=None):
+        """Return sampler for the optimal approximation of p_target.
+
+        Exactly one of Z or (k, l) must be given.
+        """
+        key = get_cache_key(p_target, kernel, Z=Z, k=k, l=l)
+        sampler = self.get(key)
+        if sampler is None:
+            Z = get_Zkl(k, l) if Z is None else Z
+            p_approx = get_optimal_probabilities(Z, p_target, KERNELS[kernel])
+            sampler = Sampler.from_distribution(p_approx)
+            self.put(key, sampler)
+        return sampler
@@ -1,37 +1,159 @@
 # Copyright 2019 MIT Probabilistic Computing Project.
 # Released under Apache 2.0; refer to LICENSE.txt
 
+from collections import namedtuple
+
+from .analysis import get_encoding_size
+from .analysis import get_expected_bits
 from .matrix import make_ddg_matrix
+from .matrix import make_ddg_matrix_packed
+from .matrix import make_hamming_csr
 from .matrix import make_hamming_matrix
 from .matrix import make_hamming_vector
+from .matrix import pack_columns
 
 from .utils import get_Zkl
 from .utils import get_binary_expansion_length
 from .utils import get_common_denominator
 from .utils import get_common_numerators
 
-from .packing import pack_tree
-from .tree import make_ddg_tree
+from .jump import make_jump_table
+from .packing import make_ddg_encoding
 
 def construct_sample_ky_encoding(p_target):
-    P, k, l = construct_sample_ky_matrix(p_target)
-    root = make_ddg_tree(P, k, l)
-    enc = {}
-    pack_tree(enc, root, 0)
+    P, k, l = construct_sample_ky_matrix(p_target, packed=True)
+    encoding = make_ddg_encoding(P, k, l)
     n = len(P)
-    encoding = [enc[i] for i in range(len(enc))]
     return encoding, n, k
 
-def construct_sample_ky_matrix(p_target):
+def construct_sample_ky_jump(p_target, w=8):
+    encoding, n, _k = construct_sample_ky_encoding(p_target)
+    table = make_jump_table(encoding, w)
+    return table, n, w
+
+def construct_sample_ky_matrix(p_target, packed=False):
     Z = get_common_denominator(p_target)
     k, l = get_binary_expansion_length(Z)
     Zkl = get_Zkl(k, l)
     Ms = get_common_numerators(Zkl, p_target)
-    P, kp, lp = make_ddg_matrix(Ms, k, l)
+    make = make_ddg_matrix_packed if packed else make_ddg_matrix
+    P, kp, lp = make(Ms, k, l)
     return P, kp, lp
 
 def construct_sample_ky_matrix_cached(p_target):
-    P, k, l = construct_sample_ky_matrix(p_target)
+    P, k, l = construct_sample_ky_matrix(p_target, packed=True)
     h = make_hamming_vector(P)
     T = make_hamming_matrix(P)
     return k, l, h, T
+
+def construct_sample_ky_matrix_cached_csr(p_target):
+    P, k, l = construct_sample_ky_matrix(p_target, packed=True)
+    offsets, labels = make_hamming_csr(P)
+    return k, l, offsets, labels
+
+def construct_sample_fldr(Ms):
+    """Return Fast Loaded Dice Roller for the distribution Ms / sum(Ms).
+
+    The integer weights Ms (e.g., from opt.optimize_unorm) are padded with
+    the reject weight 2**k - sum(Ms), for the least k with sum(Ms) <= 2**k,
+    and the hamming matrix of the dyadic distribution is stored as in
+    matrix.make_hamming_csr, where label n is the reject outcome.
+    """
+    P, k = make_fldr_matrix(Ms)
+    offsets, labels = make_hamming_csr(P)
+    return len(Ms), k, offsets, labels
+
+def make_fldr_matrix(Ms):
+    """Return packed matrix P and depth k of the dyadic padding of Ms."""
+    assert all(0 <= M for M in Ms)
+    m = sum(Ms)
+    assert 0 < m
+    k = max(1, (m - 1).bit_length())
+    return pack_columns(list(Ms) + [pow(2, k) - m], k), k
+
+# Cost model of construct_sampler. Memory is in stored integers, where a
+# packed column takes one integer per 64 rows, and time is per sample, in
+# units of one flip, one operation, or one lookup into an array that fits
+# in cache. A lookup into a table of s integers misses the cache with
+# probability 1 - CACHE_SIZE/s (for s above CACHE_SIZE), at an extra cost
+# of CACHE_MISS. Per level of the walk, ky.enc reads enc[c + b] and enc[c]
+# (anywhere in the encoding); ky.matc and fldr read offsets[c] and
+# offsets[c+1] (the k + 1 offsets), and labels once at the leaf; ky.mat
+# reads h[c] and checks for the back-edge, and at the leaf scans the words
+# of the packed column and halves the last word. An attempt of fldr is
+# accepted with probability Z / 2**k.
+Estimate = namedtuple('Estimate', ['memory', 'time'])
+
+OBJECTIVES = ('throughput', 'memory')
+
+CACHE_SIZE = 2**13
+CACHE_MISS = 10
+
+def get_lookup_time(size):
+    """Return expected time of a lookup into a table of size integers."""
+    return 1 + CACHE_MISS * max(0., 1 - CACHE_SIZE / size) if size else 1.
+
+def get_estimates(n, k, l, h, Z, h_fldr):
+    """Return Estimate of each engine for the DDG tree with hamming vector h.
+
+    The weights of the distribution sum to Z and h_fldr is the hamming
+    vector of their matrix from make_fldr_matrix.
+    """
+    bits = float(get_expected_bits(h, k, l)) if 1 < n else 0.
+    k_fldr = len(h_fldr)
+    bits_fldr = float(get_expected_bits(h_fldr, k_fldr, k_fldr)) \
+        if 1 < n else 0.
+    words = -(-n // 64)
+    size_enc = get_encoding_size(h, k) if 1 < n else 1
+    size_mat = k*words + k
+    size_matc = (k + 1) + sum(h)
+    size_fldr = (k_fldr + 1) + sum(h_fldr)
+    lookup = get_lookup_time
+    time_enc = bits * (1 + 2*lookup(size_enc))
+    time_mat = bits * (2 + lookup(k)) + lookup(size_mat) + words + 6
+    time_matc = bits * (1 + 2*lookup(k + 1)) + lookup(sum(h))
+    time_fldr = (bits_fldr * (1 + 2*lookup(k_fldr + 1))
+        + lookup(sum(h_fldr)) + 1) * pow(2, k_fldr) / Z
+    if n == 1:
+        time_enc = time_mat = time_matc = time_fldr = 0.
+    return {
+        'ky.enc'    : Estimate(size_enc, time_enc),
+        'ky.mat'    : Estimate(size_mat, time_mat),
+        'ky.matc'   : Estimate(size_matc, time_matc),
+        'fldr'      : Estimate(size_fldr, time_fldr),
+    }
+
+BUILDERS = {
+    'ky.enc'    : lambda P, k, l, Ms:
+        (make_ddg_encoding(P, k, l), len(P), k),
+    'ky.mat'    : lambda P, k, l, Ms: (P, k, l),
+    'ky.matc'   : lambda P, k, l, Ms: (k, l) + make_hamming_csr(P),
+    'fldr'      : lambda P, k, l, Ms: construct_sample_fldr(Ms),
+}
+
+def construct_sampler(p_target, objective='throughput', report=False):
+    """Return (engine, sampler) for p_target, choosing the engine by cost.
+
+    The engine is 'ky.enc', 'ky.mat', 'ky.matc', or 'fldr' and the sampler
+    is the output of construct_sample_ky_encoding, construct_sample_ky_matrix
+    (packed), construct_sample_ky_matrix_cached_csr, or construct_sample_fldr
+    (on the numerators of p_target over their common denominator). The
+    objective 'throughput' minimizes the estimated time per sample and
+    'memory' the estimated size, breaking ties by the other. Only the chosen
+    engine is built. If report is True, also return the dict of Estimate
+    per engine.
+    """
+    assert objective in OBJECTIVES, 'Unknown objective: %s' % (objective,)
+    P, k, l = construct_sample_ky_matrix(p_target, packed=True)
+    Z = get_common_denominator(p_target)
+    Ms = get_common_numerators(Z, p_target)
+    P_fldr, _k_fldr = make_fldr_matrix(Ms)
+    estimates = get_estimates(len(P), k, l, make_hamming_vector(P), Z,
+        make_hamming_vector(P_fldr))
+    if objective == 'throughput':
+        key = lambda engine: (estimates[engine].time, estimates[engine].memory)
+    else:
+        key = lambda engine: (estimates[engine].memory, estimates[engine].time)
+    engine = min(sorted(estimates), key=key)
+    sampler = BUILDERS[engine](P, k, l, Ms)
+    return (engine, sampler, estimates) if report else (engine, sampler)
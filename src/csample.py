@@ -0,0 +1,90 @@
+# Copyright 2019 MIT Probabilistic Computing Project.
+# Released under Apache 2.0; refer to LICENSE.txt
+
+"""Fill buffers with samples, using the compiled C samplers if available.
+
+The compiled extension optas._sample is built from the sources in c/ when
+a compiler is present; otherwise the functions below fall back to the
+Python samplers. Output buffers (e.g., numpy.int32 arrays or array('i'))
+are filled in place, one sample per element.
+"""
+
+from array import array
+
+from .matrix import PackedMatrix
+from .sample import sample_fldr
+from .sample import sample_ky_encoding
+from .sample import sample_ky_matrix
+from .sample import sample_ky_matrix_cached
+from .sample import sample_ky_matrix_cached_csr
+
+try:
+    from . import _sample
+except ImportError:
+    _sample = None
+
+def has_extension():
+    return _sample is not None
+
+def as_int_array(values):
+    """Return values as a flat buffer of C ints (copying only if needed)."""
+    try:
+        view = memoryview(values)
+        if view.itemsize == array('i').itemsize and view.format in 'il':
+            return values
+    except TypeError:
+        pass
+    return array('i', values)
+
+def flatten_columns(matrix):
+    """Return entries of matrix (lists or PackedMatrix) in column order."""
+    if isinstance(matrix, PackedMatrix):
+        n = matrix.nrows
+        return [(x >> r) & 1 for x in matrix.columns for r in range(n)]
+    return [x for column in zip(*matrix) for x in column]
+
+def seed(s):
+    """Seed the C random bit generator."""
+    assert _sample is not None, 'optas._sample is not compiled.'
+    _sample.seed(s)
+
+def sample_ky_encoding_fill(enc, out):
+    if _sample is not None:
+        _sample.sample_ky_encoding(as_int_array(enc), out)
+    else:
+        for i in range(len(out)):
+            out[i] = sample_ky_encoding(enc)
+
+def sample_ky_matrix_fill(P, k, l, out):
+    if _sample is not None:
+        _sample.sample_ky_matrix(bytes(flatten_columns(P)), len(P), k, l, out)
+    else:
+        for i in range(len(out)):
+            out[i] = sample_ky_matrix(P, k, l)
+
+def sample_ky_matrix_cached_fill(k, l, h, T, out):
+    if _sample is not None:
+        offsets = [0]
+        for x in h:
+            offsets.append(offsets[-1] + x)
+        labels = [T[d][c] for c in range(k) for d in range(h[c])]
+        n = max(labels, default=-1) + 1
+        sample_ky_matrix_cached_csr_fill(n, k, l, offsets, labels, out)
+    else:
+        for i in range(len(out)):
+            out[i] = sample_ky_matrix_cached(k, l, h, T)
+
+def sample_ky_matrix_cached_csr_fill(n, k, l, offsets, labels, out):
+    if _sample is not None:
+        _sample.sample_ky_matrix_cached(
+            n, k, l, as_int_array(offsets), as_int_array(labels), out)
+    else:
+        for i in range(len(out)):
+            out[i] = sample_ky_matrix_cached_csr(k, l, offsets, labels)
+
+def sample_fldr_fill(n, k, offsets, labels, out):
+    if _sample is not None:
+        _sample.sample_fldr(n, as_int_array(offsets), as_int_array(labels), out)
+    else:
+        for i in range(len(out)):
+            out[i] = sample_fldr(n, k, offsets, labels)
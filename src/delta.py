@@ -0,0 +1,137 @@
+# Copyright 2019 MIT Probabilistic Computing Project.
+# Released under Apache 2.0; refer to LICENSE.txt
+
+"""Closed-form change in the error of a kernel when a numerator M of the
+approximation M/Z of a target p is incremented or decremented by one."""
+
+from fractions import Fraction
+from math import log
+from math import log1p
+from math import sqrt
+
+from .divergences import kernel_hellinger
+from .divergences import kernel_kl
+from .divergences import kernel_nchi2
+from .divergences import kernel_pchi2
+from .divergences import kernel_td
+from .divergences import kernel_tv
+
+INF = float('inf')
+LN2 = log(2)
+
+def get_target(p):
+    """Return (numerator, denominator, float) of target probability p."""
+    try:
+        n, d = p.as_integer_ratio()
+    except AttributeError:
+        r = Fraction(p)
+        n, d = r.numerator, r.denominator
+    return (n, d, float(p))
+
+def to_float(num, den):
+    """Return num/den, where den == 0 denotes an infinity of the sign of num."""
+    return num / den if den else INF * num
+
+# Exact deltas, as (numerator, denominator) with denominator >= 0. In each,
+# the target is n/d, c = n*Z, and the numerator moves from x to y = x + delta.
+
+def exact_tv(Z, t, M, delta):
+    n, d, _p = t
+    c = n*Z
+    return (abs(c - (M+delta)*d) - abs(c - M*d), 2*Z*d)
+
+def exact_pchi2(Z, t, M, delta):
+    n, d, _p = t
+    return (delta*((2*M + delta)*d - 2*n*Z), Z*Z*n)
+
+def exact_nchi2(Z, t, M, delta):
+    n, d, _p = t
+    c = n*Z
+    x, y = M, M + delta
+    if x == 0:
+        return (-1, 0)
+    if y == 0:
+        return (1, 0)
+    return (delta*(x*y*d*d - c*c), x*y*Z*d*d)
+
+def exact_td(Z, t, M, delta):
+    n, d, _p = t
+    c = n*Z
+    u, w = c + M*d, c + (M+delta)*d
+    return (delta*(u*w - 4*c*c), Z*u*w)
+
+EXACT_DELTAS = {
+    kernel_tv       : exact_tv,
+    kernel_pchi2    : exact_pchi2,
+    kernel_nchi2    : exact_nchi2,
+    kernel_td       : exact_td,
+}
+
+# Floating-point deltas, in forms without cancellation.
+
+def delta_kl(Z, t, M, delta):
+    if M < 0 or M + delta <= 0:
+        return INF
+    if M == 0:
+        return -INF
+    return -t[2] * log1p(delta / M) / LN2
+
+def delta_hellinger(Z, t, M, delta):
+    s = sqrt(M/Z) + sqrt((M+delta)/Z)
+    return (delta/Z) * (1 - 2*sqrt(t[2])/s)
+
+def make_delta(exact):
+    def delta_float(Z, t, M, delta):
+        return to_float(*exact(Z, t, M, delta))
+    return delta_float
+
+DELTAS = {
+    kernel_tv           : make_delta(exact_tv),
+    kernel_pchi2        : make_delta(exact_pchi2),
+    kernel_nchi2        : make_delta(exact_nchi2),
+    kernel_td           : make_delta(exact_td),
+    kernel_kl           : delta_kl,
+    kernel_hellinger    : delta_hellinger,
+}
+
+def make_delta_error(Z, p_target, kernel):
+    """Return functions for the deltas of kernel on the items of p_target.
+
+    The first maps (i, M, delta) to get_delta_error(Z, p_target[i], M,
+    delta, kernel). Kernels without a closed form are evaluated directly,
+    reusing the last two kernel values computed for each i. The second maps
+    (i, Mi, di, j, Mj, dj) to the sign of the sum of two deltas, computed
+    exactly, or to None if the kernel has no exact delta.
+    """
+    targets = [get_target(p) for p in p_target]
+    delta_fast = DELTAS.get(kernel)
+    exact = EXACT_DELTAS.get(kernel)
+    cache = [None] * len(p_target)
+    def delta_error(i, M, delta):
+        if delta == -1 and M == 0:
+            return INF
+        if delta == 1 and M == Z:
+            return INF
+        if delta_fast is not None and 0 < targets[i][0]:
+            return delta_fast(Z, targets[i], M, delta)
+        v0 = v1 = None
+        if cache[i] is not None:
+            (Ma, va, Mb, vb) = cache[i]
+            v0 = va if Ma == M else vb if Mb == M else None
+            v1 = va if Ma == M + delta else vb if Mb == M + delta else None
+        if v0 is None:
+            v0 = kernel(targets[i][2], M/Z)
+        if v1 is None:
+            v1 = kernel(targets[i][2], (M+delta)/Z)
+        cache[i] = (M, v0, M + delta, v1)
+        return v1 - v0
+    def delta_sign(i, Mi, di, j, Mj, dj):
+        if exact is None or targets[i][0] == 0 or targets[j][0] == 0:
+            return None
+        (ni, mi) = exact(Z, targets[i], Mi, di)
+        (nj, mj) = exact(Z, targets[j], Mj, dj)
+        if mi == 0 or mj == 0:
+            return None
+        s = ni*mj + nj*mi
+        return (s > 0) - (s < 0)
+    return delta_error, delta_sign
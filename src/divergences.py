@@ -1,11 +1,17 @@
 # Copyright 2019 MIT Probabilistic Computing Project.
 # Released under Apache 2.0; refer to LICENSE.txt
 
+from math import log
 from math import log2
 from math import sqrt
 
 from collections import OrderedDict
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 try:
     import mpmath
     mpf = mpmath.mpf
@@ -174,6 +180,98 @@ GENERATORS_STABLE = OrderedDict([
     ('x2'           , make_stable(sg_x2)),
 ])
 
+# Kernels and generators over float64 numpy arrays, which recompute the
+# elements that overflow, underflow, or are undefined in floating point
+# using the scalar versions above. Array generators map (p, q) to the terms
+# p * g(q/p) of the divergence.
+
+LN2 = log(2)
+
+def make_array_kernel(f, f_scalar):
+    def f_array(a, b):
+        with numpy.errstate(all='ignore'):
+            r = f(a, b)
+        redo = ~numpy.isfinite(r) | ((r == 0) & (a != b))
+        for i in numpy.flatnonzero(redo):
+            r[i] = f_scalar(float(a[i]), float(b[i]))
+        return r
+    return f_array
+
+def make_array_generator(g, g_scalar):
+    def g_array(a, b):
+        with numpy.errstate(all='ignore'):
+            r = a * g(b / a)
+        for i in numpy.flatnonzero(~numpy.isfinite(r)):
+            r[i] = g_scalar(float(a[i]), float(b[i]))
+        return r
+    return g_array
+
+def make_stable_term(g, sg):
+    def term(p, q):
+        if q == 0:
+            return p * g(0)
+        px = mpf(p)
+        qx = mpf(q)
+        return float(px * sg(qx/px))
+    return term
+
+def ak_not_implemented(a, b):
+    raise NotImplementedError()
+
+ak_tv         = lambda a, b: .5 * numpy.abs(a-b)
+ak_hellinger  = lambda a, b: (a-b)**2 / (numpy.sqrt(a) + numpy.sqrt(b))**2
+ak_pchi2      = lambda a, b: (a-b)**2 / a
+ak_nchi2      = lambda a, b: ak_pchi2(b, a)
+ak_td         = lambda a, b: (a-b)**2 / (a+b)
+ak_kl         = lambda a, b: a * numpy.log1p((a-b)/b) / LN2
+ak_reverse_kl = lambda a, b: ak_kl(b, a)
+ak_js         = lambda a, b: ak_kl(a, (a+b)/2) + ak_kl(b, (a+b)/2)
+
+KERNELS_ARRAY = OrderedDict([
+    ('tv'         , make_array_kernel(ak_tv, kernel_tv)),
+    ('hellinger'  , make_array_kernel(ak_hellinger, kernel_hellinger)),
+    ('pchi2'      , make_array_kernel(ak_pchi2, kernel_pchi2)),
+    ('nchi2'      , make_array_kernel(ak_nchi2, kernel_nchi2)),
+    ('td'         , make_array_kernel(ak_td, kernel_td)),
+    ('kl'         , make_array_kernel(ak_kl, kernel_kl)),
+    ('reverse_kl' , make_array_kernel(ak_reverse_kl, kernel_reverse_kl)),
+    ('js'         , make_array_kernel(ak_js, kernel_js)),
+    ('jf'         , ak_not_implemented),
+    ('alpha'      , ak_not_implemented),
+    ('x2'         , ak_not_implemented),
+])
+
+ag_tv         = lambda t: .5 * numpy.abs(t-1)
+ag_hellinger  = lambda t: (t-1)**2 / (numpy.sqrt(t)+1)**2
+ag_pchi2      = lambda t: (t-1)**2
+ag_nchi2      = lambda t: (1-t)**2 / t
+ag_td         = lambda t: (t-1)**2 / (t+1)
+ag_kl         = lambda t: -numpy.log1p(t-1) / LN2
+ag_reverse_kl = lambda t: t * numpy.log1p(t-1) / LN2
+ag_js         = lambda t: ag_reverse_kl(t) - (1+t)*numpy.log1p((t-1)/2) / LN2
+ag_jf         = lambda t: ag_kl(t) + ag_reverse_kl(t)
+ag_mt         = lambda t: (t-1)**2 * (t < 1)
+ag_alpha      = lambda t: 4/(1-.3**2) * (1 - t**((1+.3)/2))
+ag_x2         = lambda t: t**2 - 1
+
+GENERATORS_ARRAY = OrderedDict([
+    (name, make_array_generator(ag, make_stable_term(g, sg)))
+    for name, ag, g, sg in [
+        ('tv'           , ag_tv,         g_tv,         sg_tv),
+        ('hellinger'    , ag_hellinger,  g_hellinger,  sg_hellinger),
+        ('pchi2'        , ag_pchi2,      g_pchi2,      sg_pchi2),
+        ('nchi2'        , ag_nchi2,      g_nchi2,      sg_nchi2),
+        ('td'           , ag_td,         g_td,         sg_td),
+        ('kl'           , ag_kl,         g_kl,         sg_kl),
+        ('reverse_kl'   , ag_reverse_kl, g_reverse_kl, sg_reverse_kl),
+        ('js'           , ag_js,         g_js,         sg_js),
+        ('jf'           , ag_jf,         g_jf,         sg_jf),
+        ('mt'           , ag_mt,         g_mt,         sg_mt),
+        ('alpha'        , ag_alpha,      g_alpha,      sg_alpha),
+        ('x2'           , ag_x2,         g_x2,         sg_x2),
+    ]
+])
+
 def compute_divergence_kernel(p, q, kernel):
     # assert allclose(float(sum(p)), 1)
     # assert allclose(float(sum(q)), 1)
@@ -189,3 +287,20 @@ def compute_divergence_generator(p, q, g):
     ratios = [b/a if a > 0 else float('inf') for a, b in zip(p, q)]
     terms = [a*g(t) for (a, t) in zip(p, ratios) if a > 0]
     return sum(terms)
+
+def compute_divergence_kernel_array(p, q, kernel):
+    """Return divergence of q from p using a kernel from KERNELS_ARRAY."""
+    assert numpy is not None, 'compute_divergence_kernel_array requires numpy.'
+    a = numpy.asarray(p, dtype=numpy.float64)
+    b = numpy.asarray(q, dtype=numpy.float64)
+    support = a > 0
+    return float(numpy.sum(kernel(a[support], b[support])))
+
+def compute_divergence_generator_array(p, q, g):
+    """Return divergence of q from p using a generator from GENERATORS_ARRAY."""
+    assert numpy is not None, \
+        'compute_divergence_generator_array requires numpy.'
+    a = numpy.asarray(p, dtype=numpy.float64)
+    b = numpy.asarray(q, dtype=numpy.float64)
+    support = a > 0
+    return float(numpy.sum(g(a[support], b[support])))
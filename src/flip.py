@@ -10,15 +10,145 @@
 
 import random
 
-k = 32
-word = 0
-pos = 0
+from array import array
+
+# Number of bits drawn from the backend on each refill.
+BUFSIZE = 4096
+
+# Tables for converting between '0'/'1' characters and 0/1 bytes.
+TO_BITS = bytes.maketrans(b'01', b'\x00\x01')
+TO_ASCII = bytes.maketrans(b'\x00\x01', b'01')
+
+def make_getrandbits(rng):
+    """Return function mapping k to a uniform k-bit integer from rng.
+
+    The rng may be None (the global generator in the random module), any
+    object with a getrandbits method (e.g., random.Random), any object with
+    a bytes method (e.g., numpy.random.Generator), or a function mapping
+    n to n random bytes (e.g., os.urandom).
+    """
+    if rng is None:
+        return make_getrandbits_words(random.getrandbits)
+    if hasattr(rng, 'getrandbits'):
+        return make_getrandbits_words(rng.getrandbits)
+    if hasattr(rng, 'bytes'):
+        return make_getrandbits_bytes(rng.bytes)
+    if callable(rng):
+        return make_getrandbits_bytes(rng)
+    raise TypeError('Unknown random bit backend: %r' % (rng,))
+
+def make_getrandbits_words(getrandbits):
+    # Arrange the 32-bit words of getrandbits(k) in the order they were
+    # generated, so the stream read most significant bit first agrees with
+    # successive calls to getrandbits(32), whatever the buffer size.
+    def getrandbits_words(k):
+        if k % 32:
+            return getrandbits(k)
+        words = array('I', getrandbits(k).to_bytes(k // 8, 'little'))
+        words.byteswap()
+        return int.from_bytes(words.tobytes(), 'big')
+    assert array('I').itemsize == 4
+    return getrandbits_words
+
+def make_getrandbits_bytes(randbytes):
+    def getrandbits(k):
+        nbytes = (k + 7) // 8
+        word = int.from_bytes(randbytes(nbytes), 'big')
+        return word >> (8*nbytes - k)
+    return getrandbits
+
+def unpack_bits(word, k):
+    """Return bytes with the k-bit binary expansion of word, one per bit."""
+    return format(word, '0%db' % (k,)).encode('ascii').translate(TO_BITS)
+
+class BitSource(object):
+    """Buffered stream of random bits that counts the bits it consumes."""
+    __slots__ = ('getrandbits', 'size', 'buf', 'pos', 'end', 'ndrawn')
+
+    def __init__(self, rng=None, bufsize=BUFSIZE):
+        assert 0 < bufsize
+        self.getrandbits = make_getrandbits(rng)
+        self.size = bufsize
+        self.buf = b''
+        self.pos = 0
+        self.end = 0
+        self.ndrawn = 0
+
+    def refill(self):
+        # Append fresh bits to those not yet consumed.
+        fresh = unpack_bits(self.getrandbits(self.size), self.size)
+        self.buf = self.buf[self.pos:self.end] + fresh
+        self.pos = 0
+        self.end = len(self.buf)
+        self.ndrawn += self.size
+
+    def flip(self):
+        """Return the next random bit."""
+        pos = self.pos
+        if pos == self.end:
+            self.refill()
+            pos = 0
+        self.pos = pos + 1
+        return self.buf[pos]
+
+    def bits(self, k):
+        """Return bytes with the next k random bits, one per byte."""
+        pos = self.pos
+        if k <= self.end - pos:
+            self.pos = pos + k
+            return self.buf[pos:pos+k]
+        chunks = [self.buf[pos:self.end]]
+        k -= self.end - pos
+        while self.size < k:
+            chunks.append(unpack_bits(self.getrandbits(self.size), self.size))
+            self.ndrawn += self.size
+            k -= self.size
+        self.pos = self.end
+        self.refill()
+        self.pos = k
+        chunks.append(self.buf[:k])
+        return b''.join(chunks)
+
+    def randbits(self, k):
+        """Return the next k random bits as an integer."""
+        return int(b'0' + self.bits(k).translate(TO_ASCII), 2)
+
+    def peekbits(self, k):
+        """Return the next k random bits as an integer, without consuming."""
+        while self.end - self.pos < k:
+            self.refill()
+        pos = self.pos
+        return int(b'0' + self.buf[pos:pos+k].translate(TO_ASCII), 2)
+
+    def reset(self):
+        """Discard the buffered bits that have not been consumed."""
+        self.ndrawn -= self.end - self.pos
+        self.buf = b''
+        self.pos = 0
+        self.end = 0
+
+    def advance(self, k):
+        """Consume k bits that were previously examined using peekbits."""
+        assert self.pos + k <= self.end
+        self.pos += k
+
+    @property
+    def consumed(self):
+        """Total number of random bits consumed so far."""
+        return self.ndrawn - (self.end - self.pos)
+
+# Shared stream used by samplers that are not given a BitSource. It draws
+# from the random module and is emptied at the start of each call, so that
+# random.seed(s) followed by sampling is reproducible; a short buffer keeps
+# the bits discarded by each reset few.
+SHARED_BUFSIZE = 64
+BITSOURCE = BitSource(bufsize=SHARED_BUFSIZE)
+
+def get_bitsource(bitsource):
+    if bitsource is None:
+        BITSOURCE.reset()
+        return BITSOURCE
+    return bitsource
 
 def flip():
-    global pos
-    global word
-    if pos == 0:
-        word = random.getrandbits(k)
-        pos = k
-    pos -= 1
-    return (word & (1 << pos)) >> pos
+    return get_bitsource(None).flip()
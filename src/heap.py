@@ -0,0 +1,89 @@
+# Copyright 2019 MIT Probabilistic Computing Project.
+# Released under Apache 2.0; refer to LICENSE.txt
+
+"""Indexed binary min-heap over a fixed list of keys."""
+
+class IndexedHeap(object):
+    """Min-heap over the items 0, ..., n-1 of a list of keys.
+
+    The key of any item can be changed in O(log n) using update. Ties are
+    broken in favor of the larger item, matching utils.argmin2.
+    """
+    __slots__ = ('keys', 'heap', 'where')
+
+    def __init__(self, keys):
+        self.keys = list(keys)
+        self.heap = list(range(len(self.keys)))
+        self.where = list(range(len(self.keys)))
+        for i in reversed(range(len(self.heap) // 2)):
+            self._sift_down(i)
+
+    def __len__(self):
+        return len(self.heap)
+
+    def _less(self, a, b):
+        ka, kb = self.keys[a], self.keys[b]
+        return ka < kb or (ka == kb and a > b)
+
+    def _sift_up(self, i):
+        keys, heap, where = self.keys, self.heap, self.where
+        item = heap[i]
+        key = keys[item]
+        while 0 < i:
+            parent = (i - 1) // 2
+            other = heap[parent]
+            ko = keys[other]
+            if not (key < ko or (key == ko and item > other)):
+                break
+            heap[i] = other
+            where[other] = i
+            i = parent
+        heap[i] = item
+        where[item] = i
+
+    def _sift_down(self, i):
+        keys, heap, where = self.keys, self.heap, self.where
+        n = len(heap)
+        item = heap[i]
+        key = keys[item]
+        while True:
+            child = 2*i + 1
+            if n <= child:
+                break
+            other = heap[child]
+            ko = keys[other]
+            if child + 1 < n:
+                right = heap[child + 1]
+                kr = keys[right]
+                if kr < ko or (kr == ko and right > other):
+                    child, other, ko = child + 1, right, kr
+            if not (ko < key or (ko == key and other > item)):
+                break
+            heap[i] = other
+            where[other] = i
+            i = child
+        heap[i] = item
+        where[item] = i
+
+    def top(self):
+        """Return the item with the smallest key."""
+        return self.heap[0]
+
+    def top2(self):
+        """Return the items with the smallest two keys (-1 if missing)."""
+        heap = self.heap
+        n = len(heap)
+        if n < 2:
+            return (heap[0] if n else -1, -1)
+        if n == 2 or self._less(heap[1], heap[2]):
+            return (heap[0], heap[1])
+        return (heap[0], heap[2])
+
+    def update(self, item, key):
+        """Set the key of item and restore the heap order."""
+        old = self.keys[item]
+        self.keys[item] = key
+        if key < old:
+            self._sift_up(self.where[item])
+        else:
+            self._sift_down(self.where[item])
@@ -0,0 +1,47 @@
+# Copyright 2019 MIT Probabilistic Computing Project.
+# Released under Apache 2.0; refer to LICENSE.txt
+
+"""Compile a packed encoding into a table that consumes w bits per step."""
+
+def make_jump_table(enc, w):
+    """Return jump table for encoding enc that resolves w levels per lookup.
+
+    The table is a list of (target, nbits) pairs. Row r occupies entries
+    [r * 2**w, (r+1) * 2**w), one for each w-bit chunk read most significant
+    bit first. If the walk from the node of row r hits a leaf after nbits
+    <= w bits then target is minus the label of the leaf; otherwise nbits
+    is w and target is the offset of the row for the node reached.
+    """
+    assert 0 < w
+    W = 1 << w
+    if len(enc) == 1:
+        assert enc[0] == -1
+        return [(-1, 0)] * W
+    # Map from location in enc of each start node to the offset of its row.
+    offsets = {0: 0}
+    starts = [0]
+    table = []
+    i = 0
+    while i < len(starts):
+        entries = [None] * W
+        stack = [(starts[i], 0, 0)]
+        while stack:
+            c, depth, prefix = stack.pop()
+            for b in (0, 1):
+                x = enc[c + b]
+                d = depth + 1
+                p = 2*prefix + b
+                if enc[x] < 0:
+                    # Leaf reached; the remaining bits of the chunk are free.
+                    span = 1 << (w - d)
+                    entries[p*span:(p+1)*span] = [(enc[x], d)] * span
+                elif d == w:
+                    if x not in offsets:
+                        offsets[x] = W * len(starts)
+                        starts.append(x)
+                    entries[p] = (offsets[x], w)
+                else:
+                    stack.append((x, d, p))
+        table.extend(entries)
+        i += 1
+    return table
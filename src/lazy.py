@@ -0,0 +1,108 @@
+# Copyright 2019 MIT Probabilistic Computing Project.
+# Released under Apache 2.0; refer to LICENSE.txt
+
+"""Knuth-Yao sampler that expands the DDG tree of a_1/Z, ..., a_n/Z lazily.
+
+Level c of the DDG tree holds a leaf for each r such that digit c + 1 of
+the binary expansion of a_r/Z is one. The digits are computed by long
+division as walks first reach each level, so a target whose common
+denominator Z has thousands of digits costs only the levels that walks
+actually visit; most walks end within a few levels.
+"""
+
+from .flip import get_bitsource
+from .utils import get_common_denominator
+from .utils import get_common_numerators
+
+# Entries (leaf labels, plus one per level) kept in the cache of levels.
+BUDGET = 2**20
+
+def expand_level(remainders, Z):
+    """Advance the long division of each remainder/Z by one binary digit.
+
+    Return the rows whose digit is one, updating remainders in place.
+    """
+    rows = []
+    for r, x in enumerate(remainders):
+        x = 2*x
+        if Z <= x:
+            x -= Z
+            rows.append(r)
+        remainders[r] = x
+    return rows
+
+class LazySampler(object):
+    """Knuth-Yao sampler over numerators/Z with a bounded cache of levels.
+
+    The first levels reached are cached, in order, until they hold budget
+    entries. A walk that goes past the cached levels continues the long
+    division from a private copy of the remainders, which is discarded
+    once the walk returns.
+    """
+    __slots__ = ('numerators', 'Z', 'budget', 'levels', 'remainders',
+        'size', 'full', 'single')
+
+    def __init__(self, numerators, Z, budget=BUDGET):
+        assert all(0 <= a for a in numerators)
+        assert sum(numerators) == Z
+        self.numerators = list(numerators)
+        self.Z = Z
+        self.budget = budget
+        self.levels = []
+        self.remainders = list(numerators)
+        self.size = 0
+        self.full = False
+        nonzero = [r for r, a in enumerate(numerators) if a]
+        self.single = nonzero[0] + 1 if len(nonzero) == 1 else None
+
+    @classmethod
+    def from_distribution(cls, p_target, budget=BUDGET):
+        """Return sampler for p_target, a list of rational probabilities."""
+        Z = get_common_denominator(p_target)
+        numerators = get_common_numerators(Z, p_target)
+        return cls(numerators, Z, budget=budget)
+
+    def extend(self):
+        """Cache the next level and return its rows, or None if over budget."""
+        if self.full:
+            return None
+        remainders = list(self.remainders)
+        rows = expand_level(remainders, self.Z)
+        if self.budget < self.size + len(rows) + 1:
+            self.full = True
+            return None
+        self.levels.append(rows)
+        self.remainders = remainders
+        self.size += len(rows) + 1
+        return rows
+
+    def sample(self, bitsource=None):
+        """Return a single sample in {1, ..., n}."""
+        if self.single is not None:
+            return self.single
+        flip = get_bitsource(bitsource).flip
+        levels = self.levels
+        remainders = None
+        d = 0
+        c = 0
+        while True:
+            b = flip()
+            d = 2*d + (1 - b)
+            if c < len(levels):
+                rows = levels[c]
+            elif remainders is None:
+                rows = self.extend()
+                if rows is None:
+                    remainders = list(self.remainders)
+                    rows = expand_level(remainders, self.Z)
+            else:
+                rows = expand_level(remainders, self.Z)
+            if d < len(rows):
+                return rows[d] + 1
+            d = d - len(rows)
+            c = c + 1
+
+    def sample_n(self, size, bitsource=None):
+        """Return list of size samples."""
+        bitsource = get_bitsource(bitsource)
+        return [self.sample(bitsource) for _i in range(size)]
@@ -1,32 +1,184 @@
 # Copyright 2019 MIT Probabilistic Computing Project.
 # Released under Apache 2.0; refer to LICENSE.txt
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 from .utils import frac_to_bits
 from .utils import get_Zkl
 from .utils import reduce_fractions
 
+class PackedMatrix(object):
+    """DDG matrix stored as one bitset per column.
+
+    Bit r of the Python int columns[c] is entry P[r][c], so an n x k matrix
+    takes about k*n/8 bytes instead of k*n boxed entries. The hamming
+    vector (the popcount of each column) is computed once and kept.
+    """
+    __slots__ = ('columns', 'nrows', 'hamming')
+
+    def __init__(self, columns, nrows):
+        assert 0 < len(columns)
+        assert all(0 <= x < (1 << nrows) for x in columns)
+        self.columns = list(columns)
+        self.nrows = nrows
+        self.hamming = [popcount(x) for x in self.columns]
+
+    @classmethod
+    def from_lists(cls, P):
+        nrows = len(P)
+        columns = [
+            sum(P[r][c] << r for r in range(nrows))
+            for c in range(len(P[0]))
+        ]
+        return cls(columns, nrows)
+
+    def __len__(self):
+        return self.nrows
+
+    def __eq__(self, other):
+        return isinstance(other, PackedMatrix) \
+            and (self.columns, self.nrows) == (other.columns, other.nrows)
+
+    def get(self, r, c):
+        return (self.columns[c] >> r) & 1
+
+    def to_lists(self):
+        return [
+            [(x >> r) & 1 for x in self.columns]
+            for r in range(self.nrows)
+        ]
+
+def popcount(x):
+    return bin(x).count('1')
+
+def get_bits(x):
+    """Return positions of the set bits of x, in increasing order."""
+    bits = []
+    while x:
+        low = x & -x
+        bits.append(low.bit_length() - 1)
+        x ^= low
+    return bits
+
+def select_bit(x, d):
+    """Return the position of set bit d (from 0) of x, in increasing order.
+
+    The search halves the width of x at each step, so that it costs one
+    pass over the words of x rather than one per set bit.
+    """
+    base = 0
+    width = x.bit_length()
+    while 64 < width:
+        half = width // 2
+        low = x & ((1 << half) - 1)
+        h = popcount(low)
+        if d < h:
+            x = low
+        else:
+            x >>= half
+            d -= h
+            base += half
+        width = x.bit_length()
+    return base + get_bits(x)[d]
+
+def get_column_rows(P, c):
+    """Return rows r with P[r][c] == 1, in increasing order."""
+    if isinstance(P, PackedMatrix):
+        return get_bits(P.columns[c])
+    return [r for r in range(len(P)) if P[r][c] == 1]
+
+def get_ncols(P):
+    return len(P.columns) if isinstance(P, PackedMatrix) else len(P[0])
+
 # Algorithm 3.
 
 def make_matrix(Ms, k, l):
     assert sum(Ms) == get_Zkl(k, l)
     return [frac_to_bits(M, k, l) for M in Ms]
 
+def get_expansion_words(Ms, k, l):
+    """Return integers whose k-bit binary forms expand each M / Zkl."""
+    if l == k:
+        return list(Ms)
+    Zb = pow(2, k-l) - 1
+    return [((M // Zb) << (k-l)) | (M % Zb) for M in Ms]
+
+def make_packed_matrix(Ms, k, l):
+    """Return PackedMatrix equal to make_matrix(Ms, k, l).
+
+    Column c holds bit k-1-c of each word from get_expansion_words.
+    """
+    assert sum(Ms) == get_Zkl(k, l)
+    assert all(0 <= M < get_Zkl(k, l) for M in Ms)
+    words = get_expansion_words(Ms, k, l)
+    return pack_columns(words, k)
+
+def pack_columns(words, k):
+    """Return PackedMatrix whose row r is the k-bit binary form of words[r].
+
+    When numpy is available and the words fit in 64 bits, each column is
+    gathered at once with numpy.packbits; otherwise each set bit of each
+    word is written into a byte buffer of its column.
+    """
+    n = len(words)
+    if numpy is not None and k <= 64:
+        a = numpy.array(words, dtype=numpy.uint64)
+        columns = []
+        for c in range(k):
+            bits = ((a >> numpy.uint64(k-1-c)) & numpy.uint64(1))
+            packed = numpy.packbits(bits.astype(numpy.uint8),
+                bitorder='little')
+            columns.append(int.from_bytes(packed.tobytes(), 'little'))
+    else:
+        # Set bit r of column c, for each set bit k-1-c of words[r].
+        buffers = [bytearray((n + 7) // 8) for _c in range(k)]
+        for r, w in enumerate(words):
+            i, bit = r >> 3, 1 << (r & 7)
+            while w:
+                low = w & -w
+                buffers[k - low.bit_length()][i] |= bit
+                w ^= low
+        columns = [int.from_bytes(buf, 'little') for buf in buffers]
+    return PackedMatrix(columns, n)
+
 def make_ddg_matrix(Ms, k, l):
     Ms_prime, kp, lp = reduce_fractions(Ms, k, l)
     P = make_matrix(Ms_prime, kp, lp) if (kp, lp) != (1, 0) else [[1]]
     return P, kp, lp
 
+def make_ddg_matrix_packed(Ms, k, l):
+    """Return make_ddg_matrix(Ms, k, l) with the matrix as a PackedMatrix."""
+    Ms_prime, kp, lp = reduce_fractions(Ms, k, l)
+    if (kp, lp) == (1, 0):
+        return PackedMatrix([1], 1), kp, lp
+    return make_packed_matrix(Ms_prime, kp, lp), kp, lp
+
 def make_hamming_vector(P):
+    if isinstance(P, PackedMatrix):
+        return list(P.hamming)
     N, k = len(P), len(P[0])
     return [sum(P[r][c] for r in range(N)) for c in range(k)]
 
 def make_hamming_matrix(P):
-    N, k = len(P), len(P[0])
+    N, k = len(P), get_ncols(P)
     T = [[-1 for c in range(k)] for r in range(N)]
     for c in range(k):
-        d = 0
-        for r in range(N):
-            if P[r][c] == 1:
-                T[d][c] = r
-                d += 1
+        for d, r in enumerate(get_column_rows(P, c)):
+            T[d][c] = r
     return T
+
+def make_hamming_csr(P):
+    """Return the columns of make_hamming_matrix(P), without padding.
+
+    Column c holds h[c] = offsets[c+1] - offsets[c] labels, stored in
+    labels[offsets[c]:offsets[c+1]].
+    """
+    offsets = [0]
+    labels = []
+    for c in range(get_ncols(P)):
+        labels.extend(get_column_rows(P, c))
+        offsets.append(len(labels))
+    return offsets, labels
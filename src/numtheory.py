@@ -0,0 +1,131 @@
+# Copyright 2019 MIT Probabilistic Computing Project.
+# Released under Apache 2.0; refer to LICENSE.txt
+
+"""In-process computation of multiplicative orders, using Miller-Rabin
+primality testing and Pollard-Brent rho factorization."""
+
+import random
+
+from functools import lru_cache
+from math import gcd
+
+# Bases for which Miller-Rabin is deterministic for all n < 3.3 * 10**24.
+MR_BASES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+MR_LIMIT = 3317044064679887385961981
+MR_ROUNDS = 16
+
+SMALL_PRIMES = (
+    2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47,
+    53, 59, 61, 67, 71, 73, 79, 83, 89, 97,
+)
+
+RHO_MAXTRIES = 64
+ORDER_CACHE_SIZE = 4096
+
+def is_prime(n):
+    """Return True if n is prime (Miller-Rabin)."""
+    if n < 2:
+        return False
+    for p in SMALL_PRIMES:
+        if n % p == 0:
+            return n == p
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d >>= 1
+        s += 1
+    if n < MR_LIMIT:
+        bases = MR_BASES
+    else:
+        prng = random.Random(n)
+        extra = [prng.randrange(2, n - 1) for _i in range(MR_ROUNDS)]
+        bases = MR_BASES + tuple(extra)
+    for a in bases:
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _r in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+def pollard_rho(n):
+    """Return a nontrivial factor of composite odd n (Pollard-Brent)."""
+    assert n % 2 == 1 and not is_prime(n)
+    prng = random.Random(n)
+    for _i in range(RHO_MAXTRIES):
+        y = prng.randrange(1, n)
+        c = prng.randrange(1, n)
+        m = 128
+        g, r, q = 1, 1, 1
+        while g == 1:
+            x = y
+            for _j in range(r):
+                y = (y * y + c) % n
+            k = 0
+            while k < r and g == 1:
+                ys = y
+                for _j in range(min(m, r - k)):
+                    y = (y * y + c) % n
+                    q = q * abs(x - y) % n
+                g = gcd(q, n)
+                k += m
+            r *= 2
+        if g == n:
+            # Backtrack one step at a time from the last checkpoint.
+            g = 1
+            while g == 1:
+                ys = (ys * ys + c) % n
+                g = gcd(abs(x - ys), n)
+        if g != n:
+            return g
+    raise ArithmeticError('Failed to factor %d.' % (n,))
+
+def factorize(n):
+    """Return dictionary mapping each prime factor of n to its exponent."""
+    assert 1 <= n
+    factors = {}
+    for p in SMALL_PRIMES:
+        while n % p == 0:
+            factors[p] = factors.get(p, 0) + 1
+            n //= p
+    stack = [n] if n > 1 else []
+    while stack:
+        m = stack.pop()
+        if is_prime(m):
+            factors[m] = factors.get(m, 0) + 1
+        else:
+            d = pollard_rho(m)
+            stack.extend([d, m // d])
+    return factors
+
+def totient_factors(factors):
+    """Return factorization of phi(M), given the factorization of M."""
+    result = {}
+    for p, e in factors.items():
+        if 1 < e:
+            result[p] = result.get(p, 0) + e - 1
+        for q, f in factorize(p - 1).items():
+            result[q] = result.get(q, 0) + f
+    return result
+
+@lru_cache(maxsize=ORDER_CACHE_SIZE)
+def multiplicative_order(a, M):
+    """Return the least e > 0 such that a**e == 1 modulo M."""
+    assert 1 <= M
+    if M == 1:
+        return 1
+    assert gcd(a, M) == 1
+    phi_factors = totient_factors(factorize(M))
+    order = 1
+    for q, f in phi_factors.items():
+        order *= q**f
+    # Strip each prime from phi(M) while the power still equals 1.
+    for q, f in phi_factors.items():
+        for _i in range(f):
+            if pow(a, order // q, M) != 1:
+                break
+            order //= q
+    return order
@@ -1,10 +1,17 @@
 # Copyright 2019 MIT Probabilistic Computing Project.
 # Released under Apache 2.0; refer to LICENSE.txt
 
-from .utils import argmin
+from math import isinf
+from math import isnan
+
+from .delta import make_delta_error
+from .heap import IndexedHeap
 from .utils import argmin2
 from .utils import normalize_vector
 
+# Costs of moves within this relative tolerance of zero are resolved exactly.
+COST_RTOL = 1e-9
+
 def get_delta_error(Z, p, M, delta, kernel):
     assert delta in [-1, 1]
     if delta == -1 and M == 0:
@@ -15,18 +22,25 @@ def get_delta_error(Z, p, M, delta, kernel):
     v0 = kernel(p, M/Z)
     return v1 - v0
 
-def get_initial_Ms(Z, p_target, kernel):
+def get_initial_Ms(Z, p_target, kernel, deltas=None):
+    delta_error, _delta_sign = deltas or make_delta_error(Z, p_target, kernel)
     Ms = [0] * len(p_target)
     for i, p in enumerate(p_target):
         Ms[i] = int(Z*p)
-        if get_delta_error(Z, p, Ms[i], +1, kernel) < 0:
+        if delta_error(i, Ms[i], +1) < 0:
             Ms[i] += 1
     return tuple(Ms)
 
 def find_optimal_indexes(errs_dec, errs_inc):
     # Find the indexes of the lowest cost decrements and increments.
-    j_min_dec0, j_min_dec1 = argmin2(errs_dec)
-    j_min_inc0, j_min_inc1 = argmin2(errs_inc)
+    j_min_dec = argmin2(errs_dec)
+    j_min_inc = argmin2(errs_inc)
+    return choose_optimal_indexes(errs_dec, errs_inc, j_min_dec, j_min_inc)
+
+def choose_optimal_indexes(errs_dec, errs_inc, j_min_dec, j_min_inc):
+    # Given the smallest two decrements and increments.
+    j_min_dec0, j_min_dec1 = j_min_dec
+    j_min_inc0, j_min_inc1 = j_min_inc
     # Ensure optimal indexes are distinct (optimally).
     if j_min_dec0 != j_min_inc0:
         j_min_dec = j_min_dec0
@@ -43,33 +57,48 @@ def find_optimal_indexes(errs_dec, errs_inc):
     assert j_min_inc != j_min_dec
     return j_min_dec, j_min_inc
 
-def prune_initial_Ms(Z, p_target, Ms, kernel):
+def is_improvement(err_dec, err_inc, sign):
+    # Return True if the move with the given costs reduces the error.
+    cost = err_dec + err_inc
+    if isnan(cost):
+        return False
+    if isinf(cost) or COST_RTOL * (abs(err_dec) + abs(err_inc)) < abs(cost):
+        return cost < 0
+    # Resolve a cost that is zero up to rounding exactly, if possible;
+    # otherwise reject the move so rounding errors cannot cause cycles.
+    return sign() == -1
+
+def prune_initial_Ms(Z, p_target, Ms, kernel, deltas=None, maxiter=None):
+    delta_error, delta_sign = deltas or make_delta_error(Z, p_target, kernel)
     Ms = list(Ms)
+    if len(Ms) < 2:
+        return tuple(Ms)
     # Compute cost of decrements and increments.
-    errs_dec = [
-        get_delta_error(Z, p, M, -1, kernel)
-        for M, p in zip(Ms, p_target)
-    ]
-    errs_inc = [
-        get_delta_error(Z, p, M, +1, kernel)
-        for M, p in zip(Ms, p_target)
-    ]
+    heap_dec = IndexedHeap(
+        delta_error(i, M, -1) for i, M in enumerate(Ms))
+    heap_inc = IndexedHeap(
+        delta_error(i, M, +1) for i, M in enumerate(Ms))
+    errs_dec = heap_dec.keys
+    errs_inc = heap_inc.keys
     # Find optimal indexes.
-    j_min_dec, j_min_inc = find_optimal_indexes(errs_dec, errs_inc)
+    j_min_dec, j_min_inc = choose_optimal_indexes(
+        errs_dec, errs_inc, heap_dec.top2(), heap_inc.top2())
     # Begin the loop.
-    MAXITER = len(p_target) + 1
+    MAXITER = len(p_target) + 1 if maxiter is None else maxiter
     iters = 0
-    while errs_dec[j_min_dec] + errs_inc[j_min_inc] < 0:
+    while is_improvement(errs_dec[j_min_dec], errs_inc[j_min_inc],
+            lambda: delta_sign(j_min_dec, Ms[j_min_dec], -1,
+                j_min_inc, Ms[j_min_inc], +1)):
         # Apply the optimal move.
         Ms[j_min_dec] -= 1
         Ms[j_min_inc] += 1
         # Update the costs.
-        errs_dec[j_min_dec] = get_delta_error(
-            Z, p_target[j_min_dec], Ms[j_min_dec], -1, kernel)
-        errs_inc[j_min_inc] = get_delta_error(
-            Z, p_target[j_min_inc], Ms[j_min_inc], +1, kernel)
+        for j in [j_min_dec, j_min_inc]:
+            heap_dec.update(j, delta_error(j, Ms[j], -1))
+            heap_inc.update(j, delta_error(j, Ms[j], +1))
         # Update the optimal indexes.
-        j_min_dec, j_min_inc = find_optimal_indexes(errs_dec, errs_inc)
+        j_min_dec, j_min_inc = choose_optimal_indexes(
+            errs_dec, errs_inc, heap_dec.top2(), heap_inc.top2())
         # Update the iteration counter.
         iters += 1
         # Fail if exceeded theoretical number of iterations.
@@ -78,31 +107,34 @@ def prune_initial_Ms(Z, p_target, Ms, kernel):
             assert False, 'Fatal error: pruning exceeding MAXITER.'
     return tuple(Ms)
 
-def fix_shortfall(Z, p_target, Ms, kernel):
+def fix_shortfall(Z, p_target, Ms, kernel, deltas=None):
+    delta_error, _delta_sign = deltas or make_delta_error(Z, p_target, kernel)
     Ms = list(Ms)
     shortfall = sum(Ms) - Z
     delta = 1 if shortfall < 0 else -1
-    errs_delta = [
-        get_delta_error(Z, p, M, delta, kernel)
-        for M, p in zip(Ms, p_target)
-    ]
+    heap_delta = IndexedHeap(
+        delta_error(i, M, delta) for i, M in enumerate(Ms))
     while shortfall != 0:
-        j_min = argmin(errs_delta)
+        j_min = heap_delta.top()
+        if heap_delta.keys[j_min] == float('inf'):
+            raise ValueError('No Z-type approximation with finite error: '
+                'Z=%d.' % (Z,))
         Ms[j_min] += delta
-        errs_delta[j_min] = get_delta_error(
-            Z, p_target[j_min], Ms[j_min], delta, kernel)
+        heap_delta.update(j_min, delta_error(j_min, Ms[j_min], delta))
         shortfall += delta
     assert sum(Ms) == Z
+    assert all(0 <= M for M in Ms)
     return tuple(Ms)
 
 def optimize_unorm_strict(Z, p_target, kernel):
     """Run the optimization algorithm (requires p_target > 0 element-wise)."""
+    deltas = make_delta_error(Z, p_target, kernel)
     # STEP 1: Initial guess.
-    Ms_initial = get_initial_Ms(Z, p_target, kernel)
+    Ms_initial = get_initial_Ms(Z, p_target, kernel, deltas)
     # STEP 2: Pruning.
-    Ms_prune = prune_initial_Ms(Z, p_target, Ms_initial, kernel)
+    Ms_prune = prune_initial_Ms(Z, p_target, Ms_initial, kernel, deltas)
     # STEP 3: Making up shortfall
-    Ms_opt = fix_shortfall(Z, p_target, Ms_prune, kernel)
+    Ms_opt = fix_shortfall(Z, p_target, Ms_prune, kernel, deltas)
     # Return the result.
     return Ms_opt
 
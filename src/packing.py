@@ -1,6 +1,8 @@
 # Copyright 2019 MIT Probabilistic Computing Project.
 # Released under Apache 2.0; refer to LICENSE.txt
 
+from .matrix import get_column_rows
+
 def pack_tree(enc, node, offset):
     assert node.loc is None
     node.loc = offset
@@ -23,3 +25,48 @@ def pack_tree(enc, node, offset):
         w = pack_tree(enc, node.right, w)
     # Return the next offset.
     return w
+
+def make_ddg_encoding(P, k, l):
+    """Return the encoding of the DDG tree of P, without building the tree.
+
+    The result equals pack_tree applied to make_ddg_tree(P, k, l). Since the
+    leaves at each level of a DDG tree are its rightmost nodes, a node is
+    identified by its level and position and the tree is implicit in the
+    number of internal nodes at each level; back-edges at level k lead to
+    the internal node at level l in the same position.
+    """
+    assert 0 < k and 0 <= l <= k
+    if k == 1 and l == 0:
+        return [-1]
+    # Labels of the leaves at level c + 1, from right to left.
+    labels = [[r + 1 for r in get_column_rows(P, c)] for c in range(k)]
+    # Number of internal nodes at levels 0, ..., k-1, and of back-edges.
+    internal = [1]
+    for c in range(k):
+        internal.append(2*internal[c] - len(labels[c]))
+    # Locations of the internal nodes at level l (the back-edge targets).
+    locs = [-1] * (internal[l] if l < k else 0)
+    # Depth-first traversal in the order of pack_tree: a node is placed at
+    # the end of enc and the location is written into the slot of its parent.
+    enc = []
+    stack = [(0, 0, -1)]
+    while stack:
+        level, pos, slot = stack.pop()
+        if level == k and pos < internal[k]:
+            level = l
+        loc = len(enc)
+        if level == l and pos < len(locs):
+            if 0 <= locs[pos]:
+                enc[slot] = locs[pos]
+                continue
+            locs[pos] = loc
+        if 0 <= slot:
+            enc[slot] = loc
+        if 0 < level and internal[level] <= pos:
+            width = 2*internal[level-1]
+            enc.append(-labels[level-1][width - 1 - pos])
+            continue
+        enc.extend((None, None))
+        stack.append((level + 1, 2*pos + 1, loc + 1))
+        stack.append((level + 1, 2*pos, loc))
+    return enc
@@ -0,0 +1,46 @@
+# Copyright 2019 MIT Probabilistic Computing Project.
+# Released under Apache 2.0; refer to LICENSE.txt
+
+"""Bulk sampling across workers, each with an independent bit stream."""
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .flip import BitSource
+
+EXECUTORS = {
+    'process'   : ProcessPoolExecutor,
+    'thread'    : ThreadPoolExecutor,
+}
+
+def get_chunk_sizes(n, workers):
+    """Return sizes of workers chunks that sum to n, the first ones larger."""
+    q, r = divmod(n, workers)
+    return [q + (i < r) for i in range(workers)]
+
+def sample_chunk(sampler, size, seedseq):
+    bitsource = BitSource(numpy.random.default_rng(seedseq))
+    return numpy.asarray(sampler.sample_n(size, bitsource))
+
+def sample_parallel(sampler, n, workers, seed, executor='process'):
+    """Return numpy array of n samples drawn by workers in parallel.
+
+    The seed is split into one numpy.random.SeedSequence per worker, and
+    worker i draws the i-th chunk of the output from its own stream, so the
+    result depends only on (seed, workers) and not on the executor, which
+    is either 'process' or 'thread'.
+    """
+    assert numpy is not None, 'sample_parallel requires numpy.'
+    assert 0 < workers and 0 <= n
+    assert executor in EXECUTORS, 'Unknown executor: %s' % (executor,)
+    seedseqs = numpy.random.SeedSequence(seed).spawn(workers)
+    sizes = get_chunk_sizes(n, workers)
+    with EXECUTORS[executor](max_workers=workers) as pool:
+        chunks = list(pool.map(sample_chunk,
+            [sampler] * workers, sizes, seedseqs))
+    return numpy.concatenate(chunks)
@@ -0,0 +1,72 @@
+# Copyright 2019 MIT Probabilistic Computing Project.
+# Released under Apache 2.0; refer to LICENSE.txt
+
+"""Load samplers written in the binary format of writeio.
+
+On little-endian machines the arrays are memoryviews into a read-only
+memory map of the file, so no data is parsed or copied."""
+
+import mmap
+import sys
+
+from array import array
+
+from .writeio import BINARY_HEADER
+from .writeio import BINARY_KINDS
+from .writeio import BINARY_MAGIC
+from .writeio import BINARY_TYPECODES
+from .writeio import BINARY_VERSION
+
+def map_file(fname):
+    with open(fname, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def read_binary_array(buf, offset, count, width):
+    typecode = BINARY_TYPECODES[width]
+    nbytes = count * width
+    view = memoryview(buf)[offset:offset+nbytes]
+    assert len(view) == nbytes, 'Truncated binary sampler.'
+    if sys.byteorder == 'big':
+        arr = array(typecode, view.tobytes())
+        arr.byteswap()
+        view = memoryview(arr)
+    else:
+        view = view.cast(typecode)
+    return view, offset + nbytes + (-nbytes % 8)
+
+def read_binary(fname, kind):
+    """Return header fields, memory map, and offset of the first array."""
+    buf = map_file(fname)
+    magic, version, kind_id, width, _reserved, n, k, l, length = \
+        BINARY_HEADER.unpack_from(buf, 0)
+    assert magic == BINARY_MAGIC, 'Not a binary sampler: %s' % (fname,)
+    assert version == BINARY_VERSION, 'Unknown version: %d' % (version,)
+    assert kind_id == BINARY_KINDS[kind], 'Not a %s sampler' % (kind,)
+    return n, k, l, length, width, buf, BINARY_HEADER.size
+
+def get_rows(view, nrows, ncols):
+    """Return rows of the column-major nrows x ncols matrix in view."""
+    assert len(view) == nrows * ncols
+    return [view[r::nrows] for r in range(nrows)]
+
+def read_sample_ky_encoding_binary(fname):
+    n, k, _l, length, width, buf, offset = read_binary(fname, 'ky.enc')
+    enc, _offset = read_binary_array(buf, offset, length, width)
+    return enc, n, k
+
+def read_sample_ky_matrix_binary(fname):
+    n, k, l, _length, width, buf, offset = read_binary(fname, 'ky.mat')
+    P, _offset = read_binary_array(buf, offset, n*k, width)
+    return get_rows(P, n, k), k, l
+
+def read_sample_ky_matrix_cached_binary(fname):
+    _n, k, l, length, width, buf, offset = read_binary(fname, 'ky.matc')
+    offsets, offset = read_binary_array(buf, offset, k + 1, width)
+    labels, _offset = read_binary_array(buf, offset, length - (k + 1), width)
+    return k, l, offsets, labels
+
+def read_sample_fldr_binary(fname):
+    n, k, _l, length, width, buf, offset = read_binary(fname, 'fldr')
+    offsets, offset = read_binary_array(buf, offset, k + 1, width)
+    labels, _offset = read_binary_array(buf, offset, length - (k + 1), width)
+    return n, k, offsets, labels
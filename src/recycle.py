@@ -0,0 +1,98 @@
+# Copyright 2019 MIT Probabilistic Computing Project.
+# Released under Apache 2.0; refer to LICENSE.txt
+
+"""Interval sampler that recycles randomness across consecutive samples.
+
+The sampler keeps a uniform state u in {0, ..., N-1}. To sample from the
+weights Ms, which sum to M, it first appends random bits to u until N is
+at least M * 2**PRECISION. Writing N = q*M + r, the value x = u mod M of
+any u < q*M is uniform on {0, ..., M-1} and selects outcome i when
+C[i] <= x < C[i+1], where C holds the cumulative weights. Given outcome i,
+u' = (u // M) * Ms[i] + (x - C[i]) is uniform on {0, ..., q*Ms[i] - 1}
+and independent of all outputs, so it is kept as the state for the next
+sample instead of being discarded. If u >= q*M then u - q*M is uniform on
+{0, ..., r-1} and the sampler tries again. Outputs are exactly i.i.d.,
+and the bits consumed per sample approach the entropy of Ms / M.
+"""
+
+from bisect import bisect_right
+
+from .analysis import get_expected_bits_weights
+from .flip import get_bitsource
+from .utils import get_common_denominator
+from .utils import get_common_numerators
+
+# Bits of slack kept in the state beyond log2(M), so that the probability
+# of rejection per attempt is below 2**-PRECISION.
+PRECISION = 32
+
+class RecyclingSampler(object):
+    """Sampler of Ms / sum(Ms) that carries uniform state between samples."""
+    __slots__ = ('Ms', 'M', 'cumulative', 'threshold', 'u', 'N',
+        'consumed', 'count', 'expected_bits')
+
+    def __init__(self, Ms, precision=PRECISION):
+        assert all(0 <= a for a in Ms)
+        self.Ms = list(Ms)
+        self.M = sum(Ms)
+        assert 0 < self.M
+        self.cumulative = [0]
+        for a in Ms:
+            self.cumulative.append(self.cumulative[-1] + a)
+        self.threshold = self.M << precision
+        self.u = 0
+        self.N = 1
+        self.consumed = 0
+        self.count = 0
+        self.expected_bits = get_expected_bits_weights(self.Ms)
+
+    @classmethod
+    def from_distribution(cls, p_target, precision=PRECISION):
+        """Return sampler for p_target, a list of rational probabilities."""
+        Z = get_common_denominator(p_target)
+        return cls(get_common_numerators(Z, p_target), precision=precision)
+
+    def refill(self, bitsource):
+        """Append random bits to the state until N reaches the threshold."""
+        N, T = self.N, self.threshold
+        if T <= N:
+            return
+        j = T.bit_length() - N.bit_length()
+        if (N << j) < T:
+            j += 1
+        self.u = (self.u << j) | bitsource.randbits(j)
+        self.N = N << j
+        self.consumed += j
+
+    def sample(self, bitsource=None):
+        """Return a single sample in {1, ..., n}."""
+        bitsource = get_bitsource(bitsource)
+        M = self.M
+        while True:
+            self.refill(bitsource)
+            u, N = self.u, self.N
+            q = N // M
+            if u < q*M:
+                break
+            self.u = u - q*M
+            self.N = N - q*M
+        w, x = divmod(u, M)
+        i = bisect_right(self.cumulative, x) - 1
+        self.u = w * self.Ms[i] + (x - self.cumulative[i])
+        self.N = q * self.Ms[i]
+        self.count += 1
+        return i + 1
+
+    def sample_n(self, size, bitsource=None):
+        """Return list of size samples."""
+        bitsource = get_bitsource(bitsource)
+        return [self.sample(bitsource) for _i in range(size)]
+
+    def get_bits_per_sample(self):
+        """Return the average number of bits consumed per sample so far."""
+        return self.consumed / self.count if self.count else 0.
+
+    def get_bits_saved(self):
+        """Return bits saved per sample so far, relative to the expected
+        bits of a Knuth-Yao sampler that starts each sample afresh."""
+        return self.expected_bits - self.get_bits_per_sample()
@@ -1,13 +1,21 @@
 # Copyright 2019 MIT Probabilistic Computing Project.
 # Released under Apache 2.0; refer to LICENSE.txt
 
-from .flip import flip
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
-def sample_ky_encoding(enc):
+from .flip import get_bitsource
+from .matrix import PackedMatrix
+from .matrix import select_bit
+
+def sample_ky_encoding(enc, bitsource=None):
     if len(enc) == 1:
         assert enc[0] == -1
         return 1
 
+    flip = get_bitsource(bitsource).flip
     c = 0
     while True:
         b = flip()
@@ -15,7 +23,45 @@ def sample_ky_encoding(enc):
         if enc[c] < 0:
             return -enc[c]
 
-def sample_ky_matrix(P, k, l):
+def sample_ky_encoding_batch(enc, size, bitsource=None):
+    """Return numpy array of size samples, walking all of them in lockstep."""
+    assert numpy is not None, 'sample_ky_encoding_batch requires numpy.'
+    bitsource = get_bitsource(bitsource)
+    enc = numpy.asarray(enc, dtype=numpy.intp)
+    samples = numpy.ones(size, dtype=numpy.int64)
+    if len(enc) == 1:
+        assert enc[0] == -1
+        return samples
+
+    # Locations and output indexes of the walkers that are still active.
+    c = numpy.zeros(size, dtype=numpy.intp)
+    active = numpy.arange(size)
+    while len(active) > 0:
+        b = numpy.frombuffer(bitsource.bits(len(active)), dtype=numpy.uint8)
+        c = enc.take(c + b)
+        x = enc.take(c)
+        leaf = x < 0
+        samples[active[leaf]] = -x[leaf]
+        keep = ~leaf
+        c = c[keep]
+        active = active[keep]
+    return samples
+
+def sample_ky_jump(table, w, bitsource=None):
+    bitsource = get_bitsource(bitsource)
+    peekbits = bitsource.peekbits
+    advance = bitsource.advance
+    r = 0
+    while True:
+        t, j = table[r + peekbits(w)]
+        advance(j)
+        if t < 0:
+            return -t
+        r = t
+
+def sample_ky_matrix(P, k, l, bitsource=None):
+    if isinstance(P, PackedMatrix):
+        return sample_ky_matrix_packed(P, k, l, bitsource)
     if len(P) == 1:
         assert P[0][0] == 1
         return 1
@@ -23,6 +69,7 @@ def sample_ky_matrix(P, k, l):
     N = len(P)
     assert len(P[0]) == k
     assert 0 <= l <= k
+    flip = get_bitsource(bitsource).flip
     d = 0
     c = 0
     while True:
@@ -38,11 +85,34 @@ def sample_ky_matrix(P, k, l):
         else:
             c = c + 1
 
-def sample_ky_matrix_cached(k, l, h, T):
+def sample_ky_matrix_packed(P, k, l, bitsource=None):
+    if len(P) == 1:
+        assert P.columns == [1]
+        return 1
+    assert len(P.columns) == k
+    assert 0 <= l <= k
+    flip = get_bitsource(bitsource).flip
+    h = P.hamming
+    d = 0
+    c = 0
+    while True:
+        b = flip()
+        d = 2*d + (1 - b)
+        if d < h[c]:
+            return select_bit(P.columns[c], d) + 1
+        d = d - h[c]
+        if c == k - 1:
+            assert l < k-1
+            c = l
+        else:
+            c = c + 1
+
+def sample_ky_matrix_cached(k, l, h, T, bitsource=None):
     if len(T) == 1:
         return 1
     assert len(T[0]) == k
     assert 0 <= l <= k
+    flip = get_bitsource(bitsource).flip
     d = 0
     c = 0
     while True:
@@ -56,3 +126,45 @@ def sample_ky_matrix_cached(k, l, h, T):
             c = l
         else:
             c = c + 1
+
+def sample_ky_matrix_cached_csr(k, l, offsets, labels, bitsource=None):
+    if (k, l) == (1, 0):
+        return labels[0] + 1
+    assert len(offsets) == k + 1
+    assert 0 <= l <= k
+    flip = get_bitsource(bitsource).flip
+    d = 0
+    c = 0
+    while True:
+        b = flip()
+        d = 2*d + (1 - b)
+        h = offsets[c+1] - offsets[c]
+        if d < h:
+            return labels[offsets[c] + d] + 1
+        d = d - h
+        if c == k - 1:
+            assert l < k-1
+            c = l
+        else:
+            c = c + 1
+
+def sample_fldr(n, k, offsets, labels, bitsource=None):
+    if n == 1:
+        return 1
+    assert len(offsets) == k + 1
+    flip = get_bitsource(bitsource).flip
+    d = 0
+    c = 0
+    while True:
+        b = flip()
+        d = 2*d + (1 - b)
+        h = offsets[c+1] - offsets[c]
+        if d < h:
+            r = labels[offsets[c] + d]
+            if r < n:
+                return r + 1
+            d = 0
+            c = 0
+        else:
+            d = d - h
+            c = c + 1
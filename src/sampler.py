@@ -0,0 +1,77 @@
+# Copyright 2019 MIT Probabilistic Computing Project.
+# Released under Apache 2.0; refer to LICENSE.txt
+
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .construct import construct_sample_ky_encoding
+from .flip import get_bitsource
+from .sample import sample_ky_encoding_batch
+
+# Signed array typecodes, from narrowest to widest.
+TYPECODES = ('b', 'h', 'i', 'l', 'q')
+
+def get_typecode(lo, hi):
+    """Return the narrowest signed array typecode that holds lo and hi."""
+    for typecode in TYPECODES:
+        bound = 1 << (8*array(typecode).itemsize - 1)
+        if -bound <= lo and hi < bound:
+            return typecode
+    assert False, 'Values do not fit in a machine integer: %d, %d' % (lo, hi)
+
+class Sampler(object):
+    """Knuth-Yao sampler over a packed encoding stored in an array."""
+    __slots__ = ('enc', 'n', 'k')
+
+    def __init__(self, enc, n, k):
+        assert 0 < len(enc)
+        assert len(enc) > 1 or enc[0] == -1
+        assert -n <= min(enc) and max(enc) < len(enc)
+        self.enc = array(get_typecode(min(enc), max(enc)), enc)
+        self.n = n
+        self.k = k
+
+    @classmethod
+    def from_buffer(cls, enc, n, k):
+        """Return sampler that uses enc (e.g., a memoryview) without copying."""
+        assert enc.format in TYPECODES
+        assert 0 < len(enc)
+        sampler = cls.__new__(cls)
+        sampler.enc = enc
+        sampler.n = n
+        sampler.k = k
+        return sampler
+
+    @classmethod
+    def from_distribution(cls, p_target):
+        enc, n, k = construct_sample_ky_encoding(p_target)
+        return cls(enc, n, k)
+
+    def sample(self, bitsource=None):
+        """Return a single sample in {1, ..., n}."""
+        enc = self.enc
+        if len(enc) == 1:
+            return 1
+        flip = get_bitsource(bitsource).flip
+        c = 0
+        while True:
+            c = enc[c + flip()]
+            if enc[c] < 0:
+                return -enc[c]
+
+    def sample_n(self, size, bitsource=None):
+        """Return size samples (a numpy array if numpy is available)."""
+        if numpy is not None:
+            return sample_ky_encoding_batch(self.enc, size, bitsource)
+        bitsource = get_bitsource(bitsource)
+        return [self.sample(bitsource) for _i in range(size)]
+
+    def __reduce__(self):
+        enc = self.enc
+        if not isinstance(enc, array):
+            enc = array(enc.format, enc)
+        return (Sampler, (enc, self.n, self.k))
@@ -0,0 +1,166 @@
+# Copyright 2019 MIT Probabilistic Computing Project.
+# Released under Apache 2.0; refer to LICENSE.txt
+
+"""Search for the least precision k whose optimal approximation of a target
+distribution is within a maximum error."""
+
+from math import ceil
+from math import log2
+
+from concurrent.futures import ProcessPoolExecutor
+
+from .delta import make_delta_error
+from .divergences import KERNELS
+from .divergences import compute_divergence_kernel
+from .opt import fix_shortfall
+from .opt import optimize_unorm
+from .opt import prune_initial_Ms
+from .utils import argmin
+from .utils import get_Zkl
+from .utils import normalize_vector
+
+# Divergences that are infinite unless the approximation has full support.
+STRICT_KERNELS = ('kl', 'nchi2')
+
+# Divergences whose terms kernel(p, q) are not minimized at q = p and may
+# be negative, e.g., p*log(p/q) decreases in q.
+UNCENTERED_KERNELS = ('kl', 'reverse_kl')
+
+# Relative slack for comparing lower bounds to errors computed differently.
+BOUND_RTOL = 1e-9
+
+def get_candidate_Zs(k, n, dyadic, strict):
+    """Return the sums of weights Z available with precision k."""
+    Zs = [pow(2, k)] if dyadic else [get_Zkl(k, l) for l in range(1, k+1)]
+    return [Z for Z in Zs if n <= Z] if strict else Zs
+
+def get_error_lower_bound(Z, p_target, kernel):
+    """Return lower bound on the error of any Z-type approximation.
+
+    Each term is minimized separately over the integer numerators, dropping
+    the constraint that they sum to Z. Except for the UNCENTERED_KERNELS,
+    kernel(p, .) is convex with minimum 0 at p, so the minimizer is either
+    floor(Z*p) or floor(Z*p) + 1. The relaxed terms of the UNCENTERED_KERNELS
+    sum to at most 0, so their bound is 0.
+    """
+    if kernel in [KERNELS[name] for name in UNCENTERED_KERNELS]:
+        return 0
+    bound = 0
+    for p in p_target:
+        if p == 0:
+            continue
+        M = int(Z*p)
+        lo = kernel(p, M/Z)
+        hi = kernel(p, (M+1)/Z) if M < Z else float('inf')
+        bound += min(lo, hi)
+    return bound
+
+def optimize_unorm_warm(Z, p_target, Ms, kernel):
+    """Return optimal numerators summing to Z, starting from Ms."""
+    idx = [i for i, p in enumerate(p_target) if p > 0]
+    p_nonzero = [p_target[i] for i in idx]
+    deltas = make_delta_error(Z, p_nonzero, kernel)
+    Ms_nonzero = [min(Ms[i], Z) for i in idx]
+    Ms_fix = fix_shortfall(Z, p_nonzero, Ms_nonzero, kernel, deltas)
+    # Pairwise exchanges reach the optimum of a separable convex objective,
+    # from any starting point, after finitely many improving moves.
+    Ms_opt_trunc = prune_initial_Ms(Z, p_nonzero, Ms_fix, kernel, deltas,
+        maxiter=Z + len(p_nonzero))
+    Ms_opt = [0] * len(p_target)
+    for j, i in enumerate(idx):
+        Ms_opt[i] = Ms_opt_trunc[j]
+    return tuple(Ms_opt)
+
+def solve_Z(Z, p_target, kernel_name, Ms=None):
+    """Return (error, Ms) of optimal Z-type approximation of p_target."""
+    kernel = KERNELS[kernel_name]
+    if Ms is None:
+        Ms_opt = optimize_unorm(Z, p_target, kernel)
+    else:
+        Ms_scaled = [M * Z // sum(Ms) for M in Ms]
+        Ms_opt = optimize_unorm_warm(Z, p_target, Ms_scaled, kernel)
+    p_approx = normalize_vector(Z, Ms_opt)
+    error = compute_divergence_kernel(p_target, p_approx, kernel)
+    return (error, Ms_opt)
+
+def solve_Z_star(args):
+    return solve_Z(*args)
+
+def solve_precision(p_target, kernel_name, maxerror, Zs, executor):
+    """Return (error, Z, Ms) of best approximation over Zs, or None.
+
+    Candidates whose lower bound exceeds maxerror or the best error found
+    so far are skipped, so None means no candidate is within maxerror.
+    """
+    kernel = KERNELS[kernel_name]
+    bounds = [get_error_lower_bound(Z, p_target, kernel) for Z in Zs]
+    candidates = [(Z, b*(1 - BOUND_RTOL)) for Z, b in zip(Zs, bounds)]
+    candidates = [(Z, b) for Z, b in candidates if b <= maxerror]
+    if not candidates:
+        return None
+    Zs = [Z for Z, _b in candidates]
+    if executor is not None:
+        args = [(Z, p_target, kernel_name) for Z in Zs]
+        results = list(executor.map(solve_Z_star, args))
+    else:
+        results = []
+        best = float('inf')
+        Ms = None
+        for Z, b in candidates:
+            if best < b:
+                results.append((float('inf'), None))
+                continue
+            error, Ms = solve_Z(Z, p_target, kernel_name, Ms)
+            best = min(best, error)
+            results.append((error, Ms))
+    i = argmin([error for error, _Ms in results])
+    error, Ms = results[i]
+    return (error, Zs[i], Ms) if error <= maxerror else None
+
+def find_min_precision(p_target, kernel, maxerror, dyadic, processes=None):
+    """Return optimal approximation at the least sufficient precision.
+
+    Inputs:
+    - p_target  : list of target probabilities
+    - kernel    : name of f-divergence to use, see KERNELS from divergences.py
+    - maxerror  : maximum permitted approximation error
+    - dyadic    : True if sum of weights must be a power of two.
+    - processes : number of worker processes for solving the candidate Z
+                  values of each precision (None to solve them in sequence).
+
+    Returns:
+    - p_approx : the optimal approximation
+    - error    : the achieved error
+    - Z        : the sum of weights
+
+    The least error over the candidates for precision k is non-increasing
+    in k, since each candidate Z for k gives candidate 2*Z for k + 1; the
+    least k is therefore found by exponential and then binary search.
+    """
+    n = len(p_target)
+    strict = kernel in STRICT_KERNELS
+    k_start = 1 if not strict else max(1, ceil(log2(n)))
+    executor = ProcessPoolExecutor(processes) if processes else None
+    solutions = {}
+    def solve(k):
+        if k not in solutions:
+            Zs = get_candidate_Zs(k, n, dyadic, strict)
+            solutions[k] = solve_precision(
+                p_target, kernel, maxerror, Zs, executor)
+        return solutions[k]
+    try:
+        # Find precisions lo < hi where lo fails and hi succeeds.
+        lo, hi, step = k_start - 1, k_start, 1
+        while solve(hi) is None:
+            lo, hi, step = hi, hi + step, 2*step
+        while lo + 1 < hi:
+            mid = (lo + hi) // 2
+            if solve(mid) is None:
+                lo = mid
+            else:
+                hi = mid
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    error, Z, Ms = solutions[hi]
+    return (normalize_vector(Z, Ms), error, Z)
@@ -3,16 +3,17 @@
 
 from math import log2
 
+from .matrix import get_column_rows
+from .matrix import get_ncols
+
 def make_leaf_table(P):
-    N = len(P)
-    k = len(P[0])
+    k = get_ncols(P)
     table = {}
     current = 2
     for level in range(k):
-        for row in range(N):
-            if P[row][level] == 1:
-                table[current] = row + 1
-                current -= 1
+        for row in get_column_rows(P, level):
+            table[current] = row + 1
+            current -= 1
         current = 2*current + 2
     return table
 
@@ -9,6 +9,8 @@ from functools import reduce
 from math import gcd
 from math import log2
 
+from .numtheory import multiplicative_order
+
 PATH = os.path.dirname(os.path.abspath(__file__))
 ORDERM2 = os.path.join(PATH, 'orderm2')
 
@@ -69,12 +71,21 @@ def randint(k, bitstream):
     bits = [next(bitstream) for i in range(k)]
     return bits_to_int(bits)
 
-def orderm2(M):
-    """Return the multiplicative of 2 modulo odd integer M."""
+def orderm2_bc(M):
+    """Return the multiplicative of 2 modulo odd integer M (using bc)."""
     output = subprocess.check_output([ORDERM2, '%d' % (M,)])
     result = output.split(b'\n')[-2]
     return int(result)
 
+def orderm2(M):
+    """Return the multiplicative of 2 modulo odd integer M."""
+    assert M % 2 == 1
+    try:
+        return multiplicative_order(2, M)
+    except ArithmeticError:
+        # Factoring failed in-process; defer to the bc script.
+        return orderm2_bc(M)
+
 def get_binary_expansion_length(M):
     """Return the length of prefix and suffix of binary expansion of 1/M."""
     if M % 2 == 1:
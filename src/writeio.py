@@ -1,6 +1,11 @@
 # Copyright 2019 MIT Probabilistic Computing Project.
 # Released under Apache 2.0; refer to LICENSE.txt
 
+import struct
+import sys
+
+from array import array
+
 def write_array(array, f):
     n = len(array)
     f.write('%d ' % (n,))
@@ -20,6 +25,12 @@ def write_sample_ky_encoding(enc, n, k, fname):
         f.write('%d %d\n' % (n, k))
         write_array(enc, f)
 
+def write_sample_ky_jump(table, n, w, fname):
+    with open(fname, 'w') as f:
+        f.write('%d %d\n' % (n, w))
+        write_array([t for t, _j in table], f)
+        write_array([j for _t, j in table], f)
+
 def write_sample_ky_matrix(P, k, l, fname):
     with open(fname, 'w') as f:
         f.write('%d %d\n' % (k, l))
@@ -30,3 +41,51 @@ def write_sample_ky_matrix_cached(k, l, h, T, fname):
         f.write('%d %d\n' % (k, l))
         write_array(h, f)
         write_matrix(T, f)
+
+def write_sample_fldr(n, k, offsets, labels, fname):
+    with open(fname, 'w') as f:
+        f.write('%d %d\n' % (n, k))
+        write_array(offsets, f)
+        write_array(labels, f)
+
+# Binary format: a 64-byte little-endian header followed by little-endian
+# integer arrays, each padded to a multiple of 8 bytes. Matrices are
+# stored column by column, the layout of the C samplers, and the hamming
+# matrix of ky.matc as its offsets and labels (see matrix.make_hamming_csr).
+
+BINARY_MAGIC = b'OPTASBIN'
+BINARY_VERSION = 3
+BINARY_HEADER = struct.Struct('<8sIIIIqqqq8x')
+BINARY_KINDS = {'ky.enc': 1, 'ky.mat': 2, 'ky.matc': 3, 'fldr': 4}
+BINARY_TYPECODES = {1: 'b', 2: 'h', 4: 'i', 8: 'q'}
+
+def write_binary_array(values, width, f):
+    arr = array(BINARY_TYPECODES[width], values)
+    assert arr.itemsize == width
+    if sys.byteorder == 'big':
+        arr.byteswap()
+    f.write(arr.tobytes())
+    f.write(b'\0' * (-len(arr)*width % 8))
+
+def write_binary(kind, n, k, l, arrays, width, fname):
+    with open(fname, 'wb') as f:
+        length = sum(len(a) for a in arrays)
+        f.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION,
+            BINARY_KINDS[kind], width, 0, n, k, l, length))
+        for values in arrays:
+            write_binary_array(values, width, f)
+
+def write_sample_ky_encoding_binary(enc, n, k, fname, width=4):
+    write_binary('ky.enc', n, k, -1, [enc], width, fname)
+
+def write_sample_ky_matrix_binary(P, k, l, fname, width=1):
+    flat = [x for column in zip(*P) for x in column]
+    write_binary('ky.mat', len(P), k, l, [flat], width, fname)
+
+def write_sample_ky_matrix_cached_binary(k, l, offsets, labels, fname,
+        width=4):
+    n = max(labels, default=-1) + 1
+    write_binary('ky.matc', n, k, l, [offsets, labels], width, fname)
+
+def write_sample_fldr_binary(n, k, offsets, labels, fname, width=4):
+    write_binary('fldr', n, k, -1, [offsets, labels], width, fname)
@@ -0,0 +1,84 @@
+# Copyright 2019 MIT Probabilistic Computing Project.
+# Released under Apache 2.0; refer to LICENSE.txt
+
+import random
+
+from fractions import Fraction
+
+import pytest
+
+from optas.analysis import get_bits_prob
+from optas.analysis import get_encoding_matrix
+from optas.analysis import get_expected_bits
+from optas.analysis import get_expected_bits_weights
+from optas.analysis import profile
+from optas.construct import construct_sample_ky_matrix
+from optas.flip import BitSource
+from optas.matrix import make_hamming_csr
+from optas.matrix import make_hamming_vector
+from optas.sampler import Sampler
+from optas.utils import get_common_denominator
+from optas.utils import get_common_numerators
+
+from optas.tests.utils import get_random_dist
+
+@pytest.mark.parametrize('seed', range(10))
+def test_profile_matches_construction(seed):
+    random.seed(seed)
+    p_target = get_random_dist(random.randint(2, 8))
+    P, k, l = construct_sample_ky_matrix(p_target)
+    sampler = Sampler.from_distribution(p_target)
+    assert get_encoding_matrix(sampler.enc, sampler.n, sampler.k) == (P, l)
+    prof = profile(sampler)
+    assert (prof.n, prof.k, prof.l) == (len(p_target), k, l)
+    assert prof.probabilities == p_target
+    assert prof.size_enc == len(sampler.enc)
+    assert prof.size_mat == len(P) * k
+    offsets, labels = make_hamming_csr(P)
+    assert prof.size_matc == len(offsets) + len(labels)
+    assert 0 <= prof.entropy_gap < 2
+    # The distribution of flips sums to one and has the expected mean.
+    T = 10*k
+    probs = [get_bits_prob(prof, t) for t in range(T)]
+    tail = 1 - sum(probs)
+    assert 0 <= tail < Fraction(1, 2**(T//2))
+    mean = sum(t*p for t, p in enumerate(probs))
+    assert 0 <= prof.expected_bits - mean <= tail * 4*T
+
+def test_profile_dyadic():
+    p_target = [Fraction(1, 2), Fraction(1, 4), Fraction(1, 4)]
+    prof = profile(Sampler.from_distribution(p_target))
+    assert (prof.k, prof.l) == (2, 2)
+    assert prof.bits_pmf == [Fraction(1, 2), Fraction(1, 2)]
+    assert prof.backedge_prob == 0
+    assert prof.expected_bits == Fraction(3, 2) == prof.entropy
+    assert get_bits_prob(prof, 3) == 0
+
+def test_profile_trivial():
+    prof = profile(Sampler.from_distribution([Fraction(1)]))
+    assert prof.expected_bits == 0
+    assert get_bits_prob(prof, 0) == 1
+    assert get_bits_prob(prof, 1) == 0
+
+def test_profile_expected_bits_empirical():
+    p_target = [Fraction(1, 3), Fraction(2, 3)]
+    sampler = Sampler.from_distribution(p_target)
+    prof = profile(sampler)
+    assert prof.expected_bits == 2
+    bitsource = BitSource(random.Random(1))
+    N = 20000
+    for _i in range(N):
+        sampler.sample(bitsource)
+    assert abs(bitsource.consumed / N - 2) < .05
+
+@pytest.mark.parametrize('seed', range(5))
+def test_get_expected_bits_weights(seed):
+    random.seed(seed)
+    p_target = get_random_dist(random.randint(2, 8))
+    P, k, l = construct_sample_ky_matrix(p_target)
+    Z = get_common_denominator(p_target)
+    Ms = get_common_numerators(Z, p_target) + [0]
+    expected_bits = float(get_expected_bits(make_hamming_vector(P), k, l))
+    assert abs(get_expected_bits_weights(Ms) - expected_bits) < 1e-12
+    assert get_expected_bits_weights([0, 3, 0]) == 0
+    assert get_expected_bits_weights([1, 1, 2]) == 1.5
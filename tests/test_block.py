@@ -0,0 +1,113 @@
+# Copyright 2019 MIT Probabilistic Computing Project.
+# Released under Apache 2.0; refer to LICENSE.txt
+
+import random
+
+from fractions import Fraction
+from math import log2
+
+import pytest
+
+from optas.analysis import profile
+from optas.block import MAXSIZE
+from optas.block import BlockSampler
+from optas.block import decode_block
+from optas.block import get_counts_size
+from optas.block import get_numerator_counts
+from optas.block import get_product_counts
+from optas.block import get_product_distribution
+from optas.block import make_block
+from optas.flip import BitSource
+from optas.packing import make_ddg_encoding
+from optas.sampler import Sampler
+from optas.utils import get_common_denominator
+
+from optas.tests.utils import get_chisquare_pval
+
+p_target = [Fraction(9, 10), Fraction(1, 10)]
+
+def test_get_product_distribution():
+    p = [Fraction(1, 2), Fraction(1, 3), Fraction(1, 6)]
+    p_block = get_product_distribution(p, 3)
+    assert len(p_block) == 27
+    assert sum(p_block) == 1
+    for x in range(1, 28):
+        draws = decode_block(x, 3, 3)
+        assert p_block[x-1] == p[draws[0]-1] * p[draws[1]-1] * p[draws[2]-1]
+
+def test_decode_block():
+    assert decode_block(1, 3, 2) == [1, 1]
+    assert decode_block(2, 3, 2) == [1, 2]
+    assert decode_block(4, 3, 2) == [2, 1]
+    assert decode_block(9, 3, 2) == [3, 3]
+    assert decode_block(5, 5, 1) == [5]
+
+def test_block_sampler_fixed_m():
+    sampler = BlockSampler.from_distribution(p_target, m=3)
+    assert sampler.m == 3
+    assert sampler.sampler.n == 8
+    assert profile(sampler.sampler).probabilities \
+        == get_product_distribution(p_target, 3)
+    bitsource = BitSource(random.Random(1))
+    assert len(sampler.sample_block(bitsource)) == 3
+    samples = sampler.sample_n(10000, bitsource)
+    assert len(samples) == 10000
+    assert 0.05 < get_chisquare_pval([0.9, 0.1], samples)
+
+@pytest.mark.parametrize('Z', [None, 2**20])
+def test_block_sampler_auto_m(Z):
+    maxsize = 2**12
+    sampler = BlockSampler.from_distribution(p_target, maxsize=maxsize, Z=Z)
+    assert 1 < sampler.m
+    assert len(sampler.sampler.enc) <= maxsize
+    entropy = -sum(float(p)*log2(p) for p in p_target)
+    bits_block = float(profile(sampler.sampler).expected_bits) / sampler.m
+    sampler_single = Sampler.from_distribution(p_target)
+    bits_single = float(profile(sampler_single).expected_bits)
+    assert bits_block < bits_single
+    if Z is None:
+        assert entropy <= bits_block < entropy + 2/sampler.m
+    bitsource = BitSource(random.Random(2))
+    samples = sampler.sample_n(10000, bitsource)
+    assert 0.05 < get_chisquare_pval([0.9, 0.1], samples)
+
+def test_block_sampler_single():
+    sampler = BlockSampler.from_distribution([Fraction(1)])
+    assert sampler.m == 1
+    assert sampler.sample_n(5) == [1] * 5
+
+def test_block_sampler_z_per_draw():
+    # Each block of m draws is approximated with Z**m units.
+    Z = 2**4
+    sampler = BlockSampler.from_distribution(p_target, m=3, Z=Z)
+    probabilities = profile(sampler.sampler).probabilities
+    assert all((x * Z**3).denominator == 1 for x in probabilities)
+    assert probabilities != get_product_distribution(p_target, 3)
+    sampler = BlockSampler.from_distribution(p_target, maxsize=2**12, Z=Z)
+    assert 1 < sampler.m
+    samples = sampler.sample_n(10000, BitSource(random.Random(3)))
+    assert 0.05 < get_chisquare_pval([0.9, 0.1], samples)
+    with pytest.raises(ValueError):
+        BlockSampler.from_distribution([Fraction(1, 3)] * 3, Z=2)
+
+def test_block_sampler_stops():
+    # Dyadic: a single draw already uses H(p) flips.
+    p = [Fraction(1, 2), Fraction(1, 4), Fraction(1, 4)]
+    assert BlockSampler.from_distribution(p).m == 1
+    # Low entropy: the tree of p^4 over 10**8 has 312508 levels, which
+    # exceeds the size without being built.
+    p = [Fraction(99, 100), Fraction(1, 100)]
+    sampler = BlockSampler.from_distribution(p)
+    assert sampler.m == 3
+    assert len(sampler.sampler.enc) <= MAXSIZE
+
+@pytest.mark.parametrize('m', [1, 2, 3])
+def test_get_counts_size(m):
+    for p in [p_target, [Fraction(1, 2), Fraction(1, 3), Fraction(1, 6)],
+            [Fraction(1, 28), Fraction(13, 28), Fraction(1, 2)]]:
+        P, k, l = make_block(p, m)
+        counts = get_product_counts(p, m)
+        assert sum(counts.values()) == len(p)**m
+        Z = get_common_denominator(counts)
+        Ms = get_numerator_counts(counts, Z)
+        assert len(make_ddg_encoding(P, k, l)) == get_counts_size(Ms, Z)
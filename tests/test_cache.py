@@ -0,0 +1,124 @@
+# Copyright 2019 MIT Probabilistic Computing Project.
+# Released under Apache 2.0; refer to LICENSE.txt
+
+import os
+import time
+
+from array import array
+from fractions import Fraction
+
+from optas.cache import TMPAGE
+from optas.cache import SamplerCache
+from optas.cache import get_cache_key
+from optas.construct import construct_sample_ky_encoding
+from optas.divergences import KERNELS
+from optas.opt import get_optimal_probabilities
+from optas.utils import get_Zkl
+
+P_TARGET = [Fraction(1, 10), Fraction(3, 10), Fraction(6, 10)]
+
+def test_get_cache_key():
+    key = get_cache_key(P_TARGET, 'hellinger', Z=64)
+    assert get_cache_key([.5, .25, .25], 'tv', Z=8) \
+        == get_cache_key([Fraction(1, 2), Fraction(1, 4), Fraction(1, 4)],
+            'tv', Z=8)
+    assert key == get_cache_key(list(P_TARGET), 'hellinger', Z=64)
+    assert key == get_cache_key([Fraction(2, 20), Fraction(3, 10),
+        Fraction(6, 10)], 'hellinger', Z=64)
+    assert key != get_cache_key(P_TARGET, 'tv', Z=64)
+    assert key != get_cache_key(P_TARGET, 'hellinger', Z=63)
+    assert key != get_cache_key(P_TARGET, 'hellinger', k=6, l=6)
+    assert key != get_cache_key(P_TARGET[::-1], 'hellinger', Z=64)
+
+def test_memory_lru():
+    cache = SamplerCache(memsize=2)
+    s1 = cache.get_sampler(P_TARGET, 'tv', Z=16)
+    s2 = cache.get_sampler(P_TARGET, 'tv', Z=32)
+    assert cache.get_sampler(P_TARGET, 'tv', Z=16) is s1
+    cache.get_sampler(P_TARGET, 'tv', Z=64)
+    assert cache.get(get_cache_key(P_TARGET, 'tv', Z=32)) is None
+    assert cache.get(get_cache_key(P_TARGET, 'tv', Z=16)) is s1
+    assert s2 is not s1
+
+def test_disk_roundtrip(tmp_path):
+    directory = str(tmp_path / 'cache')
+    cache = SamplerCache(directory)
+    sampler = cache.get_sampler(P_TARGET, 'hellinger', k=6, l=2)
+    p_approx = get_optimal_probabilities(get_Zkl(6, 2), P_TARGET,
+        KERNELS['hellinger'])
+    enc, n, k = construct_sample_ky_encoding(p_approx)
+    assert list(sampler.enc) == enc
+    assert os.listdir(directory) == [
+        get_cache_key(P_TARGET, 'hellinger', k=6, l=2) + '.bin']
+    # A new cache over the same directory loads the encoding from disk.
+    cache_new = SamplerCache(directory)
+    key = get_cache_key(P_TARGET, 'hellinger', k=6, l=2)
+    sampler_new = cache_new.get(key)
+    assert list(sampler_new.enc) == enc
+    assert (sampler_new.n, sampler_new.k) == (n, k)
+    assert cache_new.get_sampler(P_TARGET, 'hellinger', k=6, l=2) \
+        is sampler_new
+    # The sampler is copied into memory, and the file is not left mapped.
+    assert isinstance(sampler_new.enc, array)
+    if os.path.exists('/proc/self/maps'):
+        with open('/proc/self/maps') as f:
+            assert key not in f.read()
+
+def test_disk_corrupt(tmp_path):
+    directory = str(tmp_path)
+    cache = SamplerCache(directory)
+    key = get_cache_key(P_TARGET, 'tv', Z=16)
+    with open(os.path.join(directory, key + '.bin'), 'wb') as f:
+        f.write(b'garbage')
+    assert cache.get(key) is None
+    sampler = cache.get_sampler(P_TARGET, 'tv', Z=16)
+    assert SamplerCache(directory).get(key).enc.tolist() \
+        == list(sampler.enc)
+
+def test_disk_truncated(tmp_path):
+    directory = str(tmp_path)
+    cache = SamplerCache(directory)
+    sampler = cache.get_sampler(P_TARGET, 'tv', Z=16)
+    key = get_cache_key(P_TARGET, 'tv', Z=16)
+    path = os.path.join(directory, key + '.bin')
+    # Cut into the encoding, drop all of it, and cut into the header.
+    size = os.path.getsize(path)
+    for length in [size - 11, size - 16, 40]:
+        with open(path, 'r+b') as f:
+            f.truncate(length)
+        assert SamplerCache(directory).get(key) is None
+    assert cache.get(key) is sampler
+    assert SamplerCache(directory).get_sampler(P_TARGET, 'tv', Z=16).enc \
+        .tolist() == list(sampler.enc)
+
+def test_disk_eviction(tmp_path):
+    directory = str(tmp_path)
+    cache = SamplerCache(directory, memsize=1)
+    paths = []
+    for i, Z in enumerate([2**10, 2**11, 2**12, 2**13]):
+        cache.get_sampler(P_TARGET, 'tv', Z=Z)
+        key = get_cache_key(P_TARGET, 'tv', Z=Z)
+        paths.append(os.path.join(directory, key + '.bin'))
+        os.utime(paths[-1], (i, i))
+    # Reading an entry marks it as recently used.
+    cache.get(get_cache_key(P_TARGET, 'tv', Z=2**10))
+    cache.disksize = os.path.getsize(paths[0]) + os.path.getsize(paths[3])
+    cache.evict()
+    assert sorted(os.listdir(directory)) \
+        == sorted(os.path.basename(p) for p in [paths[0], paths[3]])
+
+def test_disk_stale_tmp(tmp_path):
+    directory = str(tmp_path)
+    stale = os.path.join(directory, 'stale.tmp')
+    fresh = os.path.join(directory, 'fresh.tmp')
+    for path in [stale, fresh]:
+        with open(path, 'wb') as f:
+            f.write(b'partial')
+    old = time.time() - 2*TMPAGE
+    os.utime(stale, (old, old))
+    cache = SamplerCache(directory)
+    assert sorted(os.listdir(directory)) == ['fresh.tmp']
+    os.utime(fresh, (old, old))
+    cache.get_sampler(P_TARGET, 'tv', Z=16)
+    assert os.listdir(directory) \
+        == [get_cache_key(P_TARGET, 'tv', Z=16) + '.bin']
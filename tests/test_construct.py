@@ -0,0 +1,114 @@
+# Copyright 2019 MIT Probabilistic Computing Project.
+# Released under Apache 2.0; refer to LICENSE.txt
+
+from fractions import Fraction
+
+import pytest
+
+from optas.analysis import profile_matrix
+from optas.construct import construct_sample_fldr
+from optas.construct import construct_sample_ky_encoding
+from optas.construct import construct_sample_ky_matrix
+from optas.construct import construct_sample_ky_matrix_cached_csr
+from optas.construct import CACHE_MISS
+from optas.construct import CACHE_SIZE
+from optas.construct import construct_sampler
+from optas.construct import get_estimates
+from optas.construct import get_lookup_time
+from optas.construct import make_fldr_matrix
+from optas.matrix import make_hamming_vector
+from optas.utils import get_common_denominator
+from optas.utils import get_common_numerators
+
+def construct_sample_fldr_target(p_target):
+    Z = get_common_denominator(p_target)
+    return construct_sample_fldr(get_common_numerators(Z, p_target))
+
+CONSTRUCTORS = {
+    'ky.enc'    : construct_sample_ky_encoding,
+    'ky.mat'    : lambda p_target:
+        construct_sample_ky_matrix(p_target, packed=True),
+    'ky.matc'   : construct_sample_ky_matrix_cached_csr,
+    'fldr'      : construct_sample_fldr_target,
+}
+
+p_targets = [
+    [Fraction(1)],
+    [Fraction(1, 10), Fraction(3, 10), Fraction(4, 10), Fraction(2, 10)],
+    [Fraction(1, 2), Fraction(1, 4), Fraction(1, 4)],
+    [Fraction(w, 5050) for w in range(1, 101)],
+]
+
+def test_get_estimates():
+    p_target = p_targets[1]
+    P, k, l = construct_sample_ky_matrix(p_target, packed=True)
+    profile = profile_matrix(P.to_lists(), k, l)
+    Z = get_common_denominator(p_target)
+    Ms = get_common_numerators(Z, p_target)
+    P_fldr, k_fldr = make_fldr_matrix(Ms)
+    estimates = get_estimates(len(P), k, l, make_hamming_vector(P), Z,
+        make_hamming_vector(P_fldr))
+    assert estimates['ky.enc'].memory == profile.size_enc
+    assert estimates['ky.enc'].time == 3*float(profile.expected_bits)
+    # One packed word per column, plus the cached hamming vector.
+    assert estimates['ky.mat'].memory == len(P.columns) + len(P.hamming)
+    _k, _l, offsets, labels = construct_sample_ky_matrix_cached_csr(p_target)
+    assert estimates['ky.matc'].memory == len(offsets) + len(labels)
+    _n, _k, offsets, labels = construct_sample_fldr(Ms)
+    assert (Z, k_fldr) == (10, 4)
+    assert estimates['fldr'].memory == len(offsets) + len(labels)
+    # Expected flips per attempt of the dyadic tree over 16, and 16/10
+    # attempts per sample.
+    bits_attempt = sum((c + 1) * h / 2**(c + 1)
+        for c, h in enumerate(make_hamming_vector(P_fldr)))
+    assert estimates['fldr'].time == (3*bits_attempt + 2) * 16/10
+
+def test_get_lookup_time():
+    assert get_lookup_time(0) == get_lookup_time(CACHE_SIZE) == 1
+    assert get_lookup_time(2*CACHE_SIZE) == 1 + CACHE_MISS/2
+    assert get_lookup_time(10**9) < 1 + CACHE_MISS
+
+@pytest.mark.parametrize('p_target', p_targets)
+@pytest.mark.parametrize('objective', ['throughput', 'memory'])
+def test_construct_sampler(p_target, objective):
+    engine, sampler, estimates = \
+        construct_sampler(p_target, objective=objective, report=True)
+    assert sampler == CONSTRUCTORS[engine](p_target)
+    index = 1 if objective == 'throughput' else 0
+    assert all(estimates[engine][index] <= e[index]
+        for e in estimates.values())
+    assert construct_sampler(p_target, objective) == (engine, sampler)
+
+def get_target(Z, n):
+    weights = list(range(1, n)) + [Z - n*(n - 1)//2]
+    return [Fraction(w, Z) for w in weights]
+
+def test_construct_sampler_choice_throughput():
+    # Small tables: the encoding does two lookups per level in cache.
+    assert construct_sampler(p_targets[1], 'throughput')[0] == 'ky.enc'
+    # The DDG tree of an odd Z is large, so lookups into the encoding miss
+    # the cache, whereas the offsets of ky.matc fit in it.
+    assert construct_sampler(get_target(2251, 20), 'throughput')[0] \
+        == 'ky.matc'
+    # Denser tree: the labels of ky.matc miss the cache as well, whereas
+    # ky.mat scans one cached word at the leaf.
+    assert construct_sampler(get_target(2267, 60), 'throughput')[0] \
+        == 'ky.mat'
+    # Z just below 2**12: FLDR rarely rejects and its tables are small.
+    assert construct_sampler(get_target(4093, 20), 'throughput')[0] \
+        == 'fldr'
+
+def test_construct_sampler_choice_memory():
+    assert construct_sampler(p_targets[0], 'memory')[0] == 'ky.enc'
+    assert construct_sampler(p_targets[3], 'memory')[0] == 'ky.mat'
+    # Sparse tree over many outcomes: one label per leaf is less than the
+    # packed columns (and FLDR stores the same tree, with rejection).
+    q = Fraction(1, 2**100)
+    p_target = [1 - 199*q] + [q]*199
+    assert construct_sampler(p_target, 'memory')[0] == 'ky.matc'
+    # Odd denominator: the DDG tree of Knuth-Yao has many levels, whereas
+    # FLDR stores log2(Z) of them.
+    p_target = [Fraction(w, 20100) for w in range(1, 201)]
+    assert construct_sampler(p_target, 'memory')[0] == 'fldr'
+    with pytest.raises(AssertionError):
+        construct_sampler(p_target, 'latency')
@@ -0,0 +1,162 @@
+# Copyright 2019 MIT Probabilistic Computing Project.
+# Released under Apache 2.0; refer to LICENSE.txt
+
+import random
+
+from array import array
+from collections import Counter
+from fractions import Fraction
+
+import pytest
+
+import optas.csample
+
+from optas.construct import construct_sample_fldr
+from optas.construct import construct_sample_ky_encoding
+from optas.construct import construct_sample_ky_matrix
+from optas.construct import construct_sample_ky_matrix_cached
+from optas.construct import construct_sample_ky_matrix_cached_csr
+from optas.csample import sample_fldr_fill
+from optas.csample import sample_ky_encoding_fill
+from optas.csample import sample_ky_matrix_cached_csr_fill
+from optas.csample import sample_ky_matrix_cached_fill
+from optas.csample import sample_ky_matrix_fill
+
+from optas.tests.utils import get_chisquare_pval
+
+p_target = [Fraction(1, 8), Fraction(2, 8), Fraction(5, 8)]
+
+def check_fill(fill, args):
+    out = array('i', [0] * 8000)
+    fill(*args, out)
+    assert set(out) == {1, 2, 3}
+    assert 0.05 < get_chisquare_pval([1/8, 2/8, 5/8], list(out))
+
+@pytest.mark.parametrize('extension', [True, False])
+def test_fill(monkeypatch, extension):
+    if extension and not optas.csample.has_extension():
+        pytest.skip('optas._sample is not compiled')
+    if not extension:
+        monkeypatch.setattr(optas.csample, '_sample', None)
+    else:
+        optas.csample.seed(1)
+    random.seed(1)
+    enc, _n, _k = construct_sample_ky_encoding(p_target)
+    check_fill(sample_ky_encoding_fill, [enc])
+    P, k, l = construct_sample_ky_matrix(p_target)
+    check_fill(sample_ky_matrix_fill, [P, k, l])
+    k, l, h, T = construct_sample_ky_matrix_cached(p_target)
+    check_fill(sample_ky_matrix_cached_fill, [k, l, h, T])
+    k, l, offsets, labels = construct_sample_ky_matrix_cached_csr(p_target)
+    check_fill(sample_ky_matrix_cached_csr_fill, [3, k, l, offsets, labels])
+    n, k, offsets, labels = construct_sample_fldr([3, 6, 15])
+    check_fill(sample_fldr_fill, [n, k, offsets, labels])
+
+def test_fill_seed_numpy():
+    if not optas.csample.has_extension():
+        pytest.skip('optas._sample is not compiled')
+    numpy = pytest.importorskip('numpy')
+    enc, _n, _k = construct_sample_ky_encoding(p_target)
+    enc = numpy.asarray(enc, dtype=numpy.int32)
+    out0 = numpy.zeros(1000, dtype=numpy.int32)
+    out1 = numpy.zeros(1000, dtype=numpy.int32)
+    optas.csample.seed(10)
+    sample_ky_encoding_fill(enc, out0)
+    optas.csample.seed(10)
+    sample_ky_encoding_fill(enc, out1)
+    assert numpy.all(out0 == out1)
+    assert Counter(out0)[3] > Counter(out0)[1]
+    with pytest.raises(TypeError):
+        sample_ky_encoding_fill(enc, numpy.zeros(10, dtype=numpy.int64))
+
+def test_fill_encoding_invalid():
+    if not optas.csample.has_extension():
+        pytest.skip('optas._sample is not compiled')
+    enc, _n, _k = construct_sample_ky_encoding(p_target)
+    out = array('i', [0] * 10)
+    for bad in [[], [2], enc[:-1], enc[:-1] + [len(enc)], [1, 2, -1],
+            [1, 2, 0]]:
+        with pytest.raises(ValueError):
+            sample_ky_encoding_fill(array('i', bad), out)
+    sample_ky_encoding_fill(array('i', [-1]), out)
+    assert list(out) == [1] * 10
+    # Leaf labels are not bounded by the length of the encoding.
+    sample_ky_encoding_fill(array('i', [2, 3, -7, -9]), out)
+    assert set(out) == {7, 9}
+
+def test_fill_fldr_invalid():
+    if not optas.csample.has_extension():
+        pytest.skip('optas._sample is not compiled')
+    n, k, offsets, labels = construct_sample_fldr([3, 6, 15])
+    out = array('i', [0] * 10)
+    reject = labels.index(n)
+    for bad_offsets, bad_labels in [
+            (offsets, labels[:reject] + [n + 1] + labels[reject+1:]),
+            (offsets, [-1] + labels[1:]),
+            (offsets[:-1] + [offsets[-1] - 1], labels[:-1]),
+            ([0, 2], [n, n]),
+        ]:
+        with pytest.raises(ValueError):
+            sample_fldr_fill(n, k, bad_offsets, bad_labels, out)
+
+def test_fill_matrix_invalid():
+    if not optas.csample.has_extension():
+        pytest.skip('optas._sample is not compiled')
+    P, k, l = construct_sample_ky_matrix(p_target)
+    P = bytes(optas.csample.flatten_columns(P))
+    out = array('i', [0] * 10)
+    for bad_l in [-1, k + 1, 10**8]:
+        with pytest.raises(ValueError):
+            optas.csample._sample.sample_ky_matrix(P, 3, k, bad_l, out)
+    for bad_P, bad_k in [(bytes(3), 1), (bytes(3*k), k), (b'\2' + P[1:], k)]:
+        with pytest.raises(ValueError):
+            optas.csample._sample.sample_ky_matrix(bad_P, 3, bad_k, 0, out)
+    k, l, offsets, labels = construct_sample_ky_matrix_cached_csr(p_target)
+    for bad_l in [-1, k + 1, 10**8]:
+        with pytest.raises(ValueError):
+            sample_ky_matrix_cached_csr_fill(3, k, bad_l, offsets, labels, out)
+    for bad_n, bad_labels in [(3, [5] + labels[1:]), (3, [-7] + labels[1:]),
+            (2, labels)]:
+        with pytest.raises(ValueError):
+            sample_ky_matrix_cached_csr_fill(
+                bad_n, k, l, offsets, bad_labels, out)
+    with pytest.raises(ValueError):
+        sample_ky_matrix_cached_csr_fill(3, 1, 0, [0, 0], [], out)
+    with pytest.raises(ValueError):
+        sample_ky_matrix_cached_csr_fill(3, k, l, [0] * (k + 1), [], out)
+    sample_ky_matrix_cached_csr_fill(3, 1, 0, [0, 1], [2], out)
+    assert list(out) == [3] * 10
+    # A tree with a loop has no terminating form (l = k).
+    p = [Fraction(1, 3), Fraction(2, 3)]
+    k, l, offsets, labels = construct_sample_ky_matrix_cached_csr(p)
+    assert l < k
+    with pytest.raises(ValueError):
+        sample_ky_matrix_cached_csr_fill(2, k, k, offsets, labels, out)
+
+def test_fill_matrix_agrees_encoding():
+    if not optas.csample.has_extension():
+        pytest.skip('optas._sample is not compiled')
+    rng = random.Random(2)
+    weights = [rng.randint(1, 100) for _i in range(37)]
+    p = [Fraction(w, sum(weights)) for w in weights]
+    enc, _n, _k = construct_sample_ky_encoding(p)
+    P, k, l = construct_sample_ky_matrix(p)
+    k, l, h, T = construct_sample_ky_matrix_cached(p)
+    k, l, offsets, labels = construct_sample_ky_matrix_cached_csr(p)
+    outs = [array('i', [0] * 2000) for _i in range(4)]
+    optas.csample.seed(3)
+    sample_ky_encoding_fill(enc, outs[0])
+    optas.csample.seed(3)
+    sample_ky_matrix_fill(P, k, l, outs[1])
+    optas.csample.seed(3)
+    sample_ky_matrix_cached_fill(k, l, h, T, outs[2])
+    optas.csample.seed(3)
+    sample_ky_matrix_cached_csr_fill(37, k, l, offsets, labels, outs[3])
+    assert outs[0] == outs[1] == outs[2] == outs[3]
+    assert len(set(outs[0])) > 30
+    with pytest.raises(ValueError):
+        sample_ky_matrix_cached_csr_fill(
+            37, k, l, offsets[:-1], labels, outs[3])
+    with pytest.raises(ValueError):
+        sample_ky_matrix_cached_csr_fill(
+            37, k, l, offsets, labels[:-1], outs[3])
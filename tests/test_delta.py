@@ -0,0 +1,71 @@
+# Copyright 2019 MIT Probabilistic Computing Project.
+# Released under Apache 2.0; refer to LICENSE.txt
+
+from fractions import Fraction
+
+import pytest
+
+from optas.delta import DELTAS
+from optas.delta import EXACT_DELTAS
+from optas.delta import get_target
+from optas.delta import make_delta_error
+from optas.divergences import KERNELS
+from optas.opt import get_delta_error
+
+from optas.tests.utils import allclose
+from optas.tests.utils import get_random_dist
+
+def kernel_exact(kernel, p, q):
+    # Exact value of the rational kernels.
+    if kernel is KERNELS['tv']:
+        return abs(p - q) / 2
+    if kernel is KERNELS['pchi2']:
+        return (p - q)**2 / p
+    if kernel is KERNELS['nchi2']:
+        return (p - q)**2 / q
+    if kernel is KERNELS['td']:
+        return (p - q)**2 / (p + q)
+    assert False
+
+@pytest.mark.parametrize('Z', [7, 64, 256])
+def test_delta_matches_kernel(Z):
+    p_target = get_random_dist(10)
+    for name, kernel in KERNELS.items():
+        try:
+            delta_error, _delta_sign = make_delta_error(Z, p_target, kernel)
+            for i, p in enumerate(p_target):
+                for M in range(Z + 1):
+                    for delta in [-1, 1]:
+                        expected = get_delta_error(Z, p, M, delta, kernel)
+                        actual = delta_error(i, M, delta)
+                        assert allclose(actual, expected, rtol=1e-7), \
+                            (name, i, M, delta)
+        except NotImplementedError:
+            continue
+
+@pytest.mark.parametrize('kernel', EXACT_DELTAS)
+def test_exact_delta(kernel):
+    Z = 50
+    for p in [Fraction(1, 3), Fraction(7, 50), Fraction(49, 97)]:
+        t = get_target(p)
+        for M in range(1, Z):
+            num, den = EXACT_DELTAS[kernel](Z, t, M, +1)
+            q0, q1 = Fraction(M, Z), Fraction(M+1, Z)
+            assert Fraction(num, den) \
+                == kernel_exact(kernel, p, q1) - kernel_exact(kernel, p, q0)
+            # Decrements are antisymmetric to increments.
+            num_dec, den_dec = EXACT_DELTAS[kernel](Z, t, M+1, -1)
+            assert Fraction(num_dec, den_dec) == -Fraction(num, den)
+            assert DELTAS[kernel](Z, t, M+1, -1) == -DELTAS[kernel](Z, t, M, +1)
+
+def test_delta_sign_exact():
+    # The increment at M and decrement at M+1 of the same target cancel.
+    Z = 3**20
+    p_target = [Fraction(1, 3), Fraction(1, 3), Fraction(1, 3)]
+    M = 3**19
+    for kernel in EXACT_DELTAS:
+        _delta_error, delta_sign = make_delta_error(Z, p_target, kernel)
+        assert delta_sign(0, M+1, -1, 1, M, +1) == 0
+        assert delta_sign(0, M, -1, 1, M, +1) == 1
+    _delta_error, delta_sign = make_delta_error(Z, p_target, KERNELS['kl'])
+    assert delta_sign(0, M+1, -1, 1, M, +1) is None
@@ -4,13 +4,18 @@
 import pytest
 
 from optas.divergences import GENERATORS
+from optas.divergences import GENERATORS_ARRAY
 from optas.divergences import KERNELS
+from optas.divergences import KERNELS_ARRAY
 from optas.divergences import LABELS
 from optas.divergences import compute_divergence_generator
+from optas.divergences import compute_divergence_generator_array
 from optas.divergences import compute_divergence_kernel
+from optas.divergences import compute_divergence_kernel_array
 
 from optas.tests.utils import allclose
 from optas.tests.utils import get_random_dist
+from optas.tests.utils import get_random_dist_zeros
 
 def disabled_test_f_divergences_graphical():
     import matplotlib.pyplot as plt
@@ -39,3 +44,48 @@ def test_kernel_generator_agree(x):
             assert allclose(float(div_kernel), float(div_generator))
         except NotImplementedError:
             continue
+
+@pytest.mark.parametrize('x', range(10))
+def test_array_scalar_agree(x):
+    pytest.importorskip('numpy')
+    p = get_random_dist(30)
+    q = get_random_dist_zeros(30)
+    for k in KERNELS:
+        try:
+            div_scalar = compute_divergence_kernel(p, q, KERNELS[k])
+        except NotImplementedError:
+            with pytest.raises(NotImplementedError):
+                compute_divergence_kernel_array(p, q, KERNELS_ARRAY[k])
+            continue
+        div_array = compute_divergence_kernel_array(p, q, KERNELS_ARRAY[k])
+        assert allclose(div_array, float(div_scalar))
+    for g in GENERATORS:
+        div_scalar = compute_divergence_generator(p, q, GENERATORS[g])
+        div_array = compute_divergence_generator_array(p, q,
+            GENERATORS_ARRAY[g])
+        assert allclose(div_array, float(div_scalar))
+
+def test_array_stable():
+    pytest.importorskip('numpy')
+    mpmath = pytest.importorskip('mpmath')
+    # Tiny and nearly equal values lose precision in the direct formulas.
+    kernels = {
+        'tv'         : lambda a, b: abs(a-b)/2,
+        'hellinger'  : lambda a, b: (mpmath.sqrt(a) - mpmath.sqrt(b))**2,
+        'pchi2'      : lambda a, b: (a-b)**2/a,
+        'nchi2'      : lambda a, b: (a-b)**2/b,
+        'td'         : lambda a, b: (a-b)**2/(a+b),
+        'kl'         : lambda a, b: a*mpmath.log(a/b, 2),
+        'reverse_kl' : lambda a, b: b*mpmath.log(b/a, 2),
+    }
+    pairs = [(1e-200, 3e-200), (0.5, 0.5 + 1e-10), (1e-300, 1e-10)]
+    with mpmath.workdps(50):
+        for a, b in pairs:
+            for k, kernel in kernels.items():
+                expected = float(kernel(mpmath.mpf(a), mpmath.mpf(b)))
+                div = compute_divergence_kernel_array(
+                    [a], [b], KERNELS_ARRAY[k])
+                assert allclose(div, expected, rtol=1e-9, atol=0)
+                div = compute_divergence_generator_array(
+                    [a], [b], GENERATORS_ARRAY[k])
+                assert allclose(div, expected, rtol=1e-5, atol=0)
@@ -0,0 +1,91 @@
+# Copyright 2019 MIT Probabilistic Computing Project.
+# Released under Apache 2.0; refer to LICENSE.txt
+
+import os
+import random
+
+from fractions import Fraction
+
+import pytest
+
+from optas.flip import BitSource
+from optas.sample import sample_ky_encoding
+from optas.sample import sample_ky_matrix
+from optas.sampler import Sampler
+
+@pytest.mark.parametrize('bufsize', [32, 64, 4096])
+def test_bitsource_random(bufsize):
+    # Stream agrees with successive 32-bit words, independently of bufsize.
+    bitsource = BitSource(random.Random(10), bufsize=bufsize)
+    rng = random.Random(10)
+    words = [rng.getrandbits(32) for _i in range(256)]
+    bits = [bitsource.flip() for _i in range(32*256)]
+    assert bits == [int(b) for w in words for b in format(w, '032b')]
+    assert bitsource.consumed == 32*256
+
+def test_bitsource_bits_randbits():
+    bitsource0 = BitSource(random.Random(1), bufsize=100)
+    bitsource1 = BitSource(random.Random(1), bufsize=100)
+    bits = [bitsource0.flip() for _i in range(1000)]
+    assert bytes(bits[:7]) == bitsource1.bits(7)
+    assert int(''.join(map(str, bits[7:30])), 2) == bitsource1.randbits(23)
+    assert bytes(bits[30:1000]) == bitsource1.bits(970)
+    assert bitsource0.consumed == bitsource1.consumed == 1000
+
+@pytest.mark.parametrize('rng', [
+    None,
+    random.Random(1),
+    os.urandom,
+    'numpy',
+])
+def test_bitsource_backends(rng):
+    if rng == 'numpy':
+        numpy = pytest.importorskip('numpy')
+        rng = numpy.random.default_rng(1)
+    bitsource = BitSource(rng, bufsize=8*17)
+    bits = [bitsource.flip() for _i in range(10000)]
+    assert set(bits) == {0, 1}
+    assert 4500 < sum(bits) < 5500
+    assert bitsource.consumed == 10000
+
+def test_bitsource_independent_streams():
+    bitsource0 = BitSource(random.Random(1))
+    bitsource1 = BitSource(random.Random(1))
+    bits0 = [bitsource0.flip() for _i in range(100)]
+    random.seed(5)
+    bits1 = [bitsource1.flip() for _i in range(100)]
+    assert bits0 == bits1
+
+def test_bitsource_peekbits_advance():
+    bitsource0 = BitSource(random.Random(2), bufsize=32)
+    bitsource1 = BitSource(random.Random(2), bufsize=32)
+    for w in [1, 5, 8, 31, 40, 100]:
+        x = bitsource0.peekbits(w)
+        assert x == bitsource0.peekbits(w)
+        bitsource0.advance(w // 2)
+        assert x >> (w - w//2) == bitsource1.randbits(w // 2)
+        assert bitsource0.consumed == bitsource1.consumed
+
+def test_bitsource_reset():
+    bitsource = BitSource(random.Random(3), bufsize=32)
+    rng = random.Random(3)
+    assert bitsource.randbits(5) == rng.getrandbits(32) >> 27
+    bitsource.reset()
+    assert bitsource.consumed == 5
+    assert bitsource.randbits(32) == rng.getrandbits(32)
+    assert bitsource.consumed == 37
+
+def test_shared_bitsource_seed():
+    # Seeding the random module makes the default stream reproducible.
+    p = [Fraction(1, 3), Fraction(1, 6), Fraction(1, 2)]
+    sampler = Sampler.from_distribution(p)
+    P = [[0, 1], [0, 0], [1, 0]]
+    def draw():
+        return ([sampler.sample() for _i in range(50)]
+            + list(sampler.sample_n(50))
+            + [sample_ky_matrix(P, 2, 0) for _i in range(50)]
+            + [sample_ky_encoding(sampler.enc) for _i in range(50)])
+    random.seed(4)
+    samples = draw()
+    random.seed(4)
+    assert draw() == samples
@@ -0,0 +1,28 @@
+# Copyright 2019 MIT Probabilistic Computing Project.
+# Released under Apache 2.0; refer to LICENSE.txt
+
+import random
+
+from optas.heap import IndexedHeap
+from optas.utils import argmin2
+
+def test_indexed_heap_updates():
+    rng = random.Random(1)
+    keys = [rng.randint(0, 20) for _i in range(100)]
+    heap = IndexedHeap(keys)
+    assert len(heap) == 100
+    for _i in range(1000):
+        j = rng.randrange(len(keys))
+        keys[j] = rng.choice([rng.randint(0, 20), float('inf')])
+        heap.update(j, keys[j])
+        assert heap.keys == keys
+        assert heap.top() == argmin2(keys)[0]
+        j0, j1 = heap.top2()
+        assert j0 != j1
+        assert sorted([keys[j0], keys[j1]]) == sorted(keys)[:2]
+
+def test_indexed_heap_small():
+    assert IndexedHeap([]).top2() == (-1, -1)
+    assert IndexedHeap([3]).top2() == (0, -1)
+    assert IndexedHeap([3, 1]).top2() == (1, 0)
+    assert IndexedHeap([2, 2, 2]).top() == 2
@@ -0,0 +1,36 @@
+# Copyright 2019 MIT Probabilistic Computing Project.
+# Released under Apache 2.0; refer to LICENSE.txt
+
+import random
+
+import pytest
+
+from optas.construct import construct_sample_ky_encoding
+from optas.flip import BitSource
+from optas.jump import make_jump_table
+from optas.sample import sample_ky_encoding
+from optas.sample import sample_ky_jump
+
+from optas.tests.utils import get_random_dist
+
+@pytest.mark.parametrize('n', [1, 2, 5, 13])
+@pytest.mark.parametrize('w', [1, 3, 8])
+def test_jump_table_same_bits(n, w):
+    random.seed(n)
+    p_target = get_random_dist(n)
+    enc, _n, _k = construct_sample_ky_encoding(p_target)
+    table = make_jump_table(enc, w)
+    assert len(table) % 2**w == 0
+    bitsource0 = BitSource(random.Random(w))
+    bitsource1 = BitSource(random.Random(w))
+    for _i in range(2000):
+        x0 = sample_ky_encoding(enc, bitsource0)
+        x1 = sample_ky_jump(table, w, bitsource1)
+        assert x0 == x1
+        assert bitsource0.consumed == bitsource1.consumed
+
+def test_jump_table_dyadic():
+    # (1/2, 1/4, 1/4) resolves within a single 2-bit lookup.
+    enc = [2, 6, 4, 5, -3, -2, -1]
+    table = make_jump_table(enc, 2)
+    assert table == [(-3, 2), (-2, 2), (-1, 1), (-1, 1)]
@@ -0,0 +1,59 @@
+# Copyright 2019 MIT Probabilistic Computing Project.
+# Released under Apache 2.0; refer to LICENSE.txt
+
+import random
+
+from fractions import Fraction
+
+import pytest
+
+from optas.construct import construct_sample_ky_matrix
+from optas.flip import BitSource
+from optas.lazy import LazySampler
+from optas.lazy import expand_level
+from optas.sample import sample_ky_matrix
+from optas.utils import frac_to_bits
+from optas.utils import get_Zkl
+
+from optas.tests.utils import get_chisquare_pval
+
+def test_expand_level():
+    Ms, k, l = [3, 5, 1, 6, 9], 6, 2
+    Z = get_Zkl(k, l)
+    remainders = list(Ms)
+    columns = [expand_level(remainders, Z) for _c in range(3*k - 2*l)]
+    for r, M in enumerate(Ms):
+        bits = frac_to_bits(M, k, l)
+        digits = bits + 2*bits[l:]
+        assert [int(r in rows) for rows in columns] == digits
+
+@pytest.mark.parametrize('budget', [1, 8, 2**20])
+def test_lazy_sampler_matches_matrix(budget):
+    rng = random.Random(budget)
+    weights = [rng.randint(0, 50) for _i in range(11)]
+    p_target = [Fraction(w, sum(weights)) for w in weights]
+    P, k, l = construct_sample_ky_matrix(p_target)
+    sampler = LazySampler.from_distribution(p_target, budget=budget)
+    bitsource0 = BitSource(random.Random(1))
+    bitsource1 = BitSource(random.Random(1))
+    samples0 = [sample_ky_matrix(P, k, l, bitsource0) for _i in range(2000)]
+    samples1 = sampler.sample_n(2000, bitsource1)
+    assert samples0 == samples1
+    assert bitsource0.consumed == bitsource1.consumed
+    assert sampler.size <= budget
+
+def test_lazy_sampler_huge_denominator():
+    q = Fraction(1, 3**2000 + 7)
+    p_target = [Fraction(1, 3) - q, Fraction(1, 6) + q, Fraction(1, 2)]
+    sampler = LazySampler.from_distribution(p_target, budget=8)
+    bitsource = BitSource(random.Random(2))
+    samples = sampler.sample_n(6000, bitsource)
+    assert 0.05 < get_chisquare_pval([1/3, 1/6, 1/2], samples)
+    assert sampler.full
+    assert sampler.size <= 8
+
+def test_lazy_sampler_single():
+    sampler = LazySampler([0, 7, 0], 7)
+    bitsource = BitSource(random.Random(3))
+    assert sampler.sample_n(10, bitsource) == [2] * 10
+    assert bitsource.consumed == 0
@@ -1,12 +1,26 @@
 # Copyright 2019 MIT Probabilistic Computing Project.
 # Released under Apache 2.0; refer to LICENSE.txt
 
+import random
+
+import pytest
+
+import optas.matrix
+
+from optas.matrix import PackedMatrix
 from optas.matrix import make_ddg_matrix
+from optas.matrix import make_ddg_matrix_packed
+from optas.matrix import make_hamming_csr
 from optas.matrix import make_hamming_matrix
 from optas.matrix import make_hamming_vector
 from optas.matrix import make_matrix
+from optas.matrix import get_bits
+from optas.matrix import make_packed_matrix
+from optas.matrix import select_bit
+from optas.tree import make_leaf_table
 
 from optas.utils import frac_to_bits
+from optas.utils import get_Zkl
 
 def test_make_matrix():
     Ms, k, l = [6, 6, 6, 6], 5, 3
@@ -51,3 +65,62 @@ def test_make_hamming_vector_matrix():
         [-1, -1, -1,  -1],
         [-1, -1, -1,  -1],
     ]
+
+def get_random_numerators(rng, n, k, l):
+    Z = get_Zkl(k, l)
+    cuts = sorted(rng.randrange(Z + 1) for _i in range(n - 1))
+    return [b - a for a, b in zip([0] + cuts, cuts + [Z])]
+
+@pytest.mark.parametrize('use_numpy', [True, False])
+@pytest.mark.parametrize('k, l', [(5, 3), (8, 8), (12, 0), (64, 7), (80, 30)])
+def test_make_packed_matrix(monkeypatch, use_numpy, k, l):
+    if use_numpy:
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(optas.matrix, 'numpy', None)
+    rng = random.Random(k)
+    for n in [1, 2, 9, 100]:
+        Ms = get_random_numerators(rng, n, k, l)
+        if max(Ms) == get_Zkl(k, l):
+            continue
+        P = make_matrix(Ms, k, l)
+        Pp = make_packed_matrix(Ms, k, l)
+        assert len(Pp) == n
+        assert Pp.to_lists() == P
+        assert Pp == PackedMatrix.from_lists(P)
+        assert all(Pp.get(r, c) == P[r][c] for r in range(n) for c in range(k))
+        assert make_hamming_vector(Pp) == make_hamming_vector(P)
+        assert make_hamming_matrix(Pp) == make_hamming_matrix(P)
+        assert make_leaf_table(Pp) == make_leaf_table(P)
+        assert make_hamming_csr(Pp) == make_hamming_csr(P)
+
+def test_select_bit():
+    rng = random.Random(1)
+    for nbits in [1, 7, 64, 65, 200, 5000]:
+        for _i in range(10):
+            x = rng.getrandbits(nbits)
+            bits = get_bits(x)
+            assert [select_bit(x, d) for d in range(len(bits))] == bits
+
+def test_make_ddg_matrix_packed():
+    for Ms, k, l in [([6, 6, 6, 6], 5, 3), ([0, 15], 4, 0), ([3, 12], 4, 0)]:
+        P, kp, lp = make_ddg_matrix(Ms, k, l)
+        Pp, kpp, lpp = make_ddg_matrix_packed(Ms, k, l)
+        assert (kp, lp) == (kpp, lpp)
+        assert Pp.to_lists() == P
+
+def test_make_hamming_csr():
+    P = [
+        [0, 1, 0, 0],
+        [0, 0, 0, 1],
+        [1, 0, 1, 0],
+        [0, 0, 0, 1],
+    ]
+    offsets, labels = make_hamming_csr(P)
+    assert offsets == [0, 1, 2, 3, 5]
+    assert labels == [2, 0, 2, 1, 3]
+    h = make_hamming_vector(P)
+    T = make_hamming_matrix(P)
+    for c in range(4):
+        assert offsets[c+1] - offsets[c] == h[c]
+        assert labels[offsets[c]:offsets[c+1]] == [T[d][c] for d in range(h[c])]
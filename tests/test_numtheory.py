@@ -0,0 +1,56 @@
+# Copyright 2019 MIT Probabilistic Computing Project.
+# Released under Apache 2.0; refer to LICENSE.txt
+
+from functools import reduce
+
+import pytest
+
+from optas.numtheory import factorize
+from optas.numtheory import is_prime
+from optas.numtheory import multiplicative_order
+from optas.utils import get_binary_expansion_length
+
+def orderm2_brute(M):
+    # Helper function computing the order of 2 by direct search.
+    e, x = 1, 2 % M
+    while x != 1 % M:
+        x = 2*x % M
+        e += 1
+    return e
+
+def test_is_prime():
+    sieve = [True] * 2000
+    sieve[0] = sieve[1] = False
+    for i in range(2, 2000):
+        if sieve[i]:
+            for j in range(2*i, 2000, i):
+                sieve[j] = False
+    assert [is_prime(i) for i in range(2000)] == sieve
+    assert is_prime(2**61 - 1)
+    assert is_prime(2**127 - 1)
+    assert not is_prime((2**61 - 1) * (2**31 - 1))
+
+@pytest.mark.parametrize('n', [
+    1, 97, 2**10 * 3**7, 1000000007 * 998244353, (2**31-1)**2 * 127,
+    2**64 + 1,
+])
+def test_factorize(n):
+    factors = factorize(n)
+    assert all(is_prime(p) for p in factors)
+    assert reduce(lambda a, b: a*b, [p**e for p, e in factors.items()], 1) == n
+
+def test_multiplicative_order_brute():
+    for M in range(1, 2000, 2):
+        assert multiplicative_order(2, M) == orderm2_brute(M)
+
+def test_multiplicative_order_large_prime():
+    # The order of 2 modulo a Mersenne prime 2**p - 1 is p.
+    assert multiplicative_order(2, 2**127 - 1) == 127
+    assert get_binary_expansion_length(2**127 - 1) == (127, 0)
+    assert get_binary_expansion_length(2**5 * (2**89 - 1)) == (94, 5)
+    # The order of 2 modulo a prime p divides p - 1.
+    p = 1000000007
+    e = multiplicative_order(2, p)
+    assert (p - 1) % e == 0
+    assert pow(2, e, p) == 1
+    assert all(pow(2, e//q, p) != 1 for q in factorize(e))
@@ -7,7 +7,12 @@ import pytest
 
 from optas.divergences import KERNELS
 from optas.divergences import compute_divergence_kernel
+from optas.opt import find_optimal_indexes
+from optas.opt import get_delta_error
+from optas.opt import get_initial_Ms
 from optas.opt import get_optimal_probabilities
+from optas.opt import optimize_unorm
+from optas.opt import optimize_unorm_strict
 
 from optas.tests.utils import get_random_dist
 from optas.tests.utils import get_random_dist_zeros
@@ -34,9 +39,13 @@ def check_solutions_match(Z, n, p_target, assignmemts, kernel):
     assert sum(p_target) == 1
     try:
         M_enum = get_enumeration_opt(Z, n, p_target, assignmemts, kernel)
-        M_opt = get_optimal_probabilities(Z, p_target, kernel)
     except NotImplementedError:
         return True
+    if compute_divergence_kernel(p_target, M_enum, kernel) == float('inf'):
+        with pytest.raises(ValueError):
+            get_optimal_probabilities(Z, p_target, kernel)
+        return True
+    M_opt = get_optimal_probabilities(Z, p_target, kernel)
     assert sum(M_enum) == 1
     assert sum(M_opt) == 1
     e_enum = compute_divergence_kernel(p_target, M_enum, kernel)
@@ -91,3 +100,53 @@ def test_opt_insufficient_precision():
             # All sorts of errors arise when the list of errors
             # all all inf, since the solution values become negative.
             assert kern in ['nchi2', 'kl', 'jf']
+
+@pytest.mark.parametrize('kern', ['kl', 'nchi2'])
+def test_opt_insufficient_precision_infinite_error(kern):
+    # Every Z-type approximation zeros a positive target, so the error of
+    # these kernels is infinite and the optimizer must not return one.
+    p_target = get_random_dist(31)
+    with pytest.raises(ValueError):
+        optimize_unorm(16, p_target, KERNELS[kern])
+    with pytest.raises(ValueError):
+        get_optimal_probabilities(16, p_target, KERNELS[kern])
+
+def optimize_unorm_scan(Z, p_target, kernel):
+    """Reference optimizer that scans all the errors on each iteration."""
+    Ms = list(get_initial_Ms(Z, p_target, kernel))
+    errs_dec = [get_delta_error(Z, p, M, -1, kernel)
+        for M, p in zip(Ms, p_target)]
+    errs_inc = [get_delta_error(Z, p, M, +1, kernel)
+        for M, p in zip(Ms, p_target)]
+    j_dec, j_inc = find_optimal_indexes(errs_dec, errs_inc)
+    while errs_dec[j_dec] + errs_inc[j_inc] < 0:
+        Ms[j_dec] -= 1
+        Ms[j_inc] += 1
+        errs_dec[j_dec] = get_delta_error(
+            Z, p_target[j_dec], Ms[j_dec], -1, kernel)
+        errs_inc[j_inc] = get_delta_error(
+            Z, p_target[j_inc], Ms[j_inc], +1, kernel)
+        j_dec, j_inc = find_optimal_indexes(errs_dec, errs_inc)
+    delta = 1 if sum(Ms) < Z else -1
+    while sum(Ms) != Z:
+        errs = [get_delta_error(Z, p, M, delta, kernel)
+            for M, p in zip(Ms, p_target)]
+        Ms[argmin(errs)] += delta
+    return tuple(Ms)
+
+@pytest.mark.parametrize('Z', [256, 1000, 2**16])
+def test_optimize_unorm_heap_matches_scan(Z):
+    p_target = get_random_dist(200)
+    for kern in KERNELS:
+        kernel = KERNELS[kern]
+        try:
+            Ms_scan = optimize_unorm_scan(Z, p_target, kernel)
+        except NotImplementedError:
+            continue
+        Ms_heap = optimize_unorm_strict(Z, p_target, kernel)
+        assert sum(Ms_heap) == Z
+        e_scan = compute_divergence_kernel(p_target,
+            normalize_vector(Z, Ms_scan), kernel)
+        e_heap = compute_divergence_kernel(p_target,
+            normalize_vector(Z, Ms_heap), kernel)
+        assert Ms_scan == Ms_heap or allclose(e_scan, e_heap)
@@ -1,9 +1,25 @@
 # Copyright 2019 MIT Probabilistic Computing Project.
 # Released under Apache 2.0; refer to LICENSE.txt
 
+import random
+
+from fractions import Fraction
+
+import pytest
+
+from optas.construct import construct_sample_ky_matrix
+from optas.packing import make_ddg_encoding
 from optas.packing import pack_tree
 from optas.tree import make_ddg_tree
 
+from optas.tests.utils import get_random_dist
+
+def pack_ddg_tree(P, k, l):
+    root = make_ddg_tree(P, k, l)
+    enc = {}
+    pack_tree(enc, root, 0)
+    return [enc[i] for i in range(len(enc))]
+
 def test_one_back_edge():
     k, l = 4, 0
     P = [
@@ -23,3 +39,33 @@ def test_one_back_edge():
 
     leaves_twelve = sum(1 for b in encoding.values() if b == -2)
     assert leaves_twelve == 2
+
+@pytest.mark.parametrize('seed', range(20))
+def test_make_ddg_encoding_random(seed):
+    random.seed(seed)
+    p_target = get_random_dist(random.randint(1, 20))
+    P, k, l = construct_sample_ky_matrix(p_target)
+    assert make_ddg_encoding(P, k, l) == pack_ddg_tree(P, k, l)
+
+@pytest.mark.parametrize('p_target', [
+    [Fraction(1, 1)],
+    [Fraction(0, 1), Fraction(1, 1)],
+    [Fraction(1, 2), Fraction(1, 2)],
+    [Fraction(1, 4), Fraction(1, 4), Fraction(1, 2)],
+    [Fraction(1, 3), Fraction(2, 3)],
+    [Fraction(3, 15), Fraction(12, 15)],
+    [Fraction(1, 12), Fraction(5, 12), Fraction(6, 12)],
+])
+def test_make_ddg_encoding_special(p_target):
+    P, k, l = construct_sample_ky_matrix(p_target)
+    assert make_ddg_encoding(P, k, l) == pack_ddg_tree(P, k, l)
+
+def test_make_ddg_encoding_deep():
+    # The order of 2 modulo the prime 4093 is 4092, deeper than the
+    # recursion limit of make_ddg_tree and pack_tree.
+    p_target = [Fraction(1, 4093), Fraction(4092, 4093)]
+    P, k, l = construct_sample_ky_matrix(p_target)
+    assert (k, l) == (4092, 0)
+    enc = make_ddg_encoding(P, k, l)
+    assert len(enc) == 2*k + k
+    assert sorted(set(b for b in enc if b < 0)) == [-2, -1]
@@ -0,0 +1,44 @@
+# Copyright 2019 MIT Probabilistic Computing Project.
+# Released under Apache 2.0; refer to LICENSE.txt
+
+from fractions import Fraction
+
+import pytest
+
+from optas.parallel import get_chunk_sizes
+from optas.parallel import sample_parallel
+from optas.sampler import Sampler
+
+from optas.tests.utils import get_chisquare_pval
+
+numpy = pytest.importorskip('numpy')
+
+P_TARGET = [Fraction(1, 10), Fraction(2, 10), Fraction(3, 10), Fraction(4, 10)]
+
+def test_get_chunk_sizes():
+    assert get_chunk_sizes(10, 3) == [4, 3, 3]
+    assert get_chunk_sizes(2, 4) == [1, 1, 0, 0]
+    assert get_chunk_sizes(0, 2) == [0, 0]
+
+def test_sample_parallel_reproducible():
+    sampler = Sampler.from_distribution(P_TARGET)
+    a = sample_parallel(sampler, 1001, 3, seed=7, executor='thread')
+    b = sample_parallel(sampler, 1001, 3, seed=7, executor='thread')
+    c = sample_parallel(sampler, 1001, 3, seed=7, executor='process')
+    d = sample_parallel(sampler, 1001, 3, seed=8, executor='thread')
+    assert len(a) == 1001
+    assert numpy.all(a == b)
+    assert numpy.all(a == c)
+    assert not numpy.all(a == d)
+
+def test_sample_parallel_distribution():
+    sampler = Sampler.from_distribution(P_TARGET)
+    samples = sample_parallel(sampler, 10000, 4, seed=1, executor='thread')
+    assert set(samples) == {1, 2, 3, 4}
+    assert 0.05 < get_chisquare_pval(P_TARGET, list(samples))
+
+def test_sample_parallel_streams_differ():
+    # Each worker has its own stream, so equal chunks differ.
+    sampler = Sampler.from_distribution(P_TARGET)
+    samples = sample_parallel(sampler, 2000, 2, seed=3, executor='thread')
+    assert not numpy.all(samples[:1000] == samples[1000:])
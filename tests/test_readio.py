@@ -0,0 +1,107 @@
+# Copyright 2019 MIT Probabilistic Computing Project.
+# Released under Apache 2.0; refer to LICENSE.txt
+
+import random
+
+from fractions import Fraction
+
+import pytest
+
+from optas.construct import construct_sample_fldr
+from optas.construct import construct_sample_ky_encoding
+from optas.construct import construct_sample_ky_matrix
+from optas.construct import construct_sample_ky_matrix_cached_csr
+from optas.flip import BitSource
+from optas.readio import read_binary
+from optas.readio import read_binary_array
+from optas.readio import read_sample_fldr_binary
+from optas.readio import read_sample_ky_encoding_binary
+from optas.readio import read_sample_ky_matrix_binary
+from optas.readio import read_sample_ky_matrix_cached_binary
+from optas.sample import sample_fldr
+from optas.sample import sample_ky_matrix
+from optas.sample import sample_ky_matrix_cached_csr
+from optas.sampler import Sampler
+from optas.writeio import write_sample_fldr_binary
+from optas.writeio import write_sample_ky_encoding_binary
+from optas.writeio import write_sample_ky_matrix_binary
+from optas.writeio import write_sample_ky_matrix_cached_binary
+
+p_target = [Fraction(1, 10), Fraction(3, 10), Fraction(4, 10), Fraction(2, 10)]
+
+@pytest.mark.parametrize('width', [1, 2, 4, 8])
+def test_binary_ky_encoding(tmp_path, width):
+    fname = str(tmp_path / 'sampler.bin')
+    enc, n, k = construct_sample_ky_encoding(p_target)
+    write_sample_ky_encoding_binary(enc, n, k, fname, width=width)
+    enc_read, n_read, k_read = read_sample_ky_encoding_binary(fname)
+    assert isinstance(enc_read, memoryview)
+    assert enc_read.itemsize == width
+    assert list(enc_read) == enc
+    assert (n_read, k_read) == (n, k)
+
+    sampler = Sampler.from_buffer(enc_read, n_read, k_read)
+    sampler_copy = Sampler(enc, n, k)
+    bitsource0 = BitSource(random.Random(1))
+    bitsource1 = BitSource(random.Random(1))
+    for _i in range(100):
+        assert sampler.sample(bitsource0) == sampler_copy.sample(bitsource1)
+
+def test_binary_ky_matrix(tmp_path):
+    fname = str(tmp_path / 'sampler.bin')
+    P, k, l = construct_sample_ky_matrix(p_target)
+    write_sample_ky_matrix_binary(P, k, l, fname, width=1)
+    P_read, k_read, l_read = read_sample_ky_matrix_binary(fname)
+    assert [list(row) for row in P_read] == P
+    # The matrix is stored column by column, as the C sampler reads it.
+    _n, _k, _l, _length, width, buf, offset = read_binary(fname, 'ky.mat')
+    flat, _offset = read_binary_array(buf, offset, len(P)*k, width)
+    assert list(flat) == [x for column in zip(*P) for x in column]
+    assert (k_read, l_read) == (k, l)
+    bitsource0 = BitSource(random.Random(1))
+    bitsource1 = BitSource(random.Random(1))
+    for _i in range(100):
+        assert sample_ky_matrix(P, k, l, bitsource0) \
+            == sample_ky_matrix(P_read, k_read, l_read, bitsource1)
+
+def test_binary_ky_matrix_cached(tmp_path):
+    fname = str(tmp_path / 'sampler.bin')
+    k, l, offsets, labels = construct_sample_ky_matrix_cached_csr(p_target)
+    write_sample_ky_matrix_cached_binary(k, l, offsets, labels, fname)
+    k_read, l_read, offsets_read, labels_read = \
+        read_sample_ky_matrix_cached_binary(fname)
+    assert (k_read, l_read) == (k, l)
+    assert list(offsets_read) == offsets
+    assert list(labels_read) == labels
+    # The file holds O(sum(h)) entries, as in memory.
+    n, _k, _l, length, _width, _buf, _offset = read_binary(fname, 'ky.matc')
+    assert (n, length) == (len(p_target), len(offsets) + len(labels))
+    bitsource0 = BitSource(random.Random(1))
+    bitsource1 = BitSource(random.Random(1))
+    for _i in range(100):
+        assert sample_ky_matrix_cached_csr(k, l, offsets, labels, bitsource0) \
+            == sample_ky_matrix_cached_csr(
+                k_read, l_read, offsets_read, labels_read, bitsource1)
+
+def test_binary_fldr(tmp_path):
+    fname = str(tmp_path / 'sampler.bin')
+    n, k, offsets, labels = construct_sample_fldr([1, 3, 4, 3])
+    write_sample_fldr_binary(n, k, offsets, labels, fname)
+    n_read, k_read, offsets_read, labels_read = read_sample_fldr_binary(fname)
+    assert (n_read, k_read) == (n, k)
+    assert list(offsets_read) == offsets
+    assert list(labels_read) == labels
+    bitsource0 = BitSource(random.Random(1))
+    bitsource1 = BitSource(random.Random(1))
+    for _i in range(100):
+        sample0 = sample_fldr(n, k, offsets, labels, bitsource0)
+        sample1 = sample_fldr(
+            n_read, k_read, offsets_read, labels_read, bitsource1)
+        assert sample0 == sample1
+
+def test_binary_wrong_kind(tmp_path):
+    fname = str(tmp_path / 'sampler.bin')
+    enc, n, k = construct_sample_ky_encoding(p_target)
+    write_sample_ky_encoding_binary(enc, n, k, fname)
+    with pytest.raises(AssertionError):
+        read_sample_ky_matrix_binary(fname)
@@ -0,0 +1,75 @@
+# Copyright 2019 MIT Probabilistic Computing Project.
+# Released under Apache 2.0; refer to LICENSE.txt
+
+import random
+
+from fractions import Fraction
+from math import log2
+
+import pytest
+
+from optas.flip import BitSource
+from optas.recycle import RecyclingSampler
+
+from optas.tests.utils import get_chisquare_pval
+
+@pytest.mark.parametrize('precision', [0, 4, 32])
+def test_recycling_sampler(precision):
+    Ms = [3, 0, 5, 2]
+    sampler = RecyclingSampler(Ms, precision=precision)
+    bitsource = BitSource(random.Random(precision))
+    samples = sampler.sample_n(10000, bitsource)
+    assert set(samples) == {1, 3, 4}
+    assert 0.05 < get_chisquare_pval([0.3, 0.5, 0.2], samples)
+    assert sampler.consumed == bitsource.consumed
+    assert sampler.count == 10000
+
+@pytest.mark.parametrize('N', [10*37, 10*37 + 9])
+def test_recycling_sampler_step(N):
+    # From uniform u in {0, ..., N-1}, one step without rejection selects
+    # outcome i for exactly q*Ms[i] values of u and leaves the new state
+    # uniform on {0, ..., q*Ms[i] - 1}, so the next sample is independent.
+    Ms = [3, 0, 5, 2]
+    q = N // 10
+    sampler = RecyclingSampler(Ms, precision=0)
+    states = {i: [] for i in range(1, 5)}
+    for u in range(q*10):
+        sampler.u, sampler.N = u, N
+        i = sampler.sample(BitSource(random.Random(0)))
+        assert sampler.consumed == 0
+        assert sampler.N == q*Ms[i-1]
+        states[i].append(sampler.u)
+    for i, M in enumerate(Ms, 1):
+        assert sorted(states[i]) == list(range(q*M))
+
+def test_recycling_sampler_bits():
+    p_target = [Fraction(1, 3), Fraction(1, 3), Fraction(1, 3)]
+    sampler = RecyclingSampler.from_distribution(p_target)
+    assert sampler.get_bits_per_sample() == 0
+    bitsource = BitSource(random.Random(1))
+    sampler.sample_n(20000, bitsource)
+    # A Knuth-Yao sampler for 1/3 uses 8/3 bits per sample.
+    assert log2(3) <= sampler.get_bits_per_sample() < log2(3) + 0.01
+    assert 8/3 - log2(3) - 0.01 < sampler.get_bits_saved()
+    saved = sampler.get_bits_saved()
+    assert sampler.get_bits_saved() == saved
+    sampler.sample_n(100, bitsource)
+    assert sampler.get_bits_saved() != saved
+
+def test_recycling_sampler_bits_large():
+    # The reference bits are computed without the DDG tree, whose depth for
+    # the prime 1000003 is the multiplicative order of 2 modulo it.
+    n = 1000003
+    sampler = RecyclingSampler([1] * n)
+    assert log2(n) <= sampler.expected_bits < log2(n) + 2
+    bitsource = BitSource(random.Random(3))
+    sampler.sample_n(100, bitsource)
+    saved = sampler.expected_bits - sampler.get_bits_per_sample()
+    for _i in range(3):
+        assert sampler.get_bits_saved() == saved
+
+def test_recycling_sampler_single():
+    sampler = RecyclingSampler([0, 4])
+    bitsource = BitSource(random.Random(2))
+    assert sampler.sample_n(100, bitsource) == [2] * 100
+    assert sampler.consumed <= 40
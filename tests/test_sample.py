@@ -7,21 +7,34 @@ from collections import Counter
 
 import pytest
 
+from optas.construct import construct_sample_fldr
+from optas.matrix import PackedMatrix
 from optas.matrix import make_ddg_matrix
+from optas.matrix import make_hamming_csr
 from optas.matrix import make_hamming_matrix
 from optas.matrix import make_hamming_vector
 from optas.packing import pack_tree
 from optas.tree import make_ddg_tree
 
+from optas.sample import sample_fldr
 from optas.sample import sample_ky_encoding
+from optas.sample import sample_ky_encoding_batch
 from optas.sample import sample_ky_matrix
 from optas.sample import sample_ky_matrix_cached
+from optas.sample import sample_ky_matrix_cached_csr
 
-import optas.flip
+from optas.flip import BitSource
 
 from optas.tests.utils import get_bitstrings
 from optas.tests.utils import get_chisquare_pval
 
+class FixedBits(object):
+    # Helper backend for BitSource that always returns the same word.
+    def __init__(self, word):
+        self.word = word
+    def getrandbits(self, k):
+        return self.word
+
 @pytest.mark.parametrize('seed', [10, 20, 100123])
 def test_deterministic(seed):
     random.seed(seed)
@@ -62,18 +75,25 @@ def test_sample_ky_matrix_cached():
     h = make_hamming_vector(P)
     T = make_hamming_matrix(P)
 
+    Pp = PackedMatrix.from_lists(P)
+    offsets, labels = make_hamming_csr(P)
+
     samples = []
-    optas.flip.k = 4
     for i in range(2**4):
-        optas.flip.word = i
-        optas.flip.pos = optas.flip.k
-        result0 = sample_ky_matrix(P, kp, lp)
+        bitsource = BitSource(FixedBits(i), bufsize=4)
+        result0 = sample_ky_matrix(P, kp, lp, bitsource)
+
+        bitsource = BitSource(FixedBits(i), bufsize=4)
+        result1 = sample_ky_matrix_cached(kp, lp, h, T, bitsource)
 
-        optas.flip.word = i
-        optas.flip.pos = optas.flip.k
-        result1 = sample_ky_matrix_cached(kp, lp, h, T)
+        bitsource = BitSource(FixedBits(i), bufsize=4)
+        result2 = sample_ky_matrix(Pp, kp, lp, bitsource)
 
-        assert result0 == result1
+        bitsource = BitSource(FixedBits(i), bufsize=4)
+        result3 = sample_ky_matrix_cached_csr(
+            kp, lp, offsets, labels, bitsource)
+
+        assert result0 == result1 == result2 == result3
         samples.append(result0)
 
     counter = Counter(samples)
@@ -83,3 +103,97 @@ def test_sample_ky_matrix_cached():
     assert counter[4] == 7
     assert counter[5] == 2
     assert counter[6] == 1
+
+@pytest.mark.parametrize('seed', [10, 20, 100123])
+def test_sample_ky_encoding_batch(seed):
+    numpy = pytest.importorskip('numpy')
+    Ms, k, l = [3, 12], 4, 0
+    P, kp, lp = make_ddg_matrix(Ms, k, l)
+    root = make_ddg_tree(P, kp, lp)
+    encoding = {}
+    pack_tree(encoding, root, 0)
+    enc = [encoding[i] for i in range(len(encoding))]
+
+    N_sample = 10000
+    bitsource = BitSource(numpy.random.default_rng(seed))
+    samples = sample_ky_encoding_batch(enc, N_sample, bitsource)
+    assert len(samples) == N_sample
+    assert set(samples) == {1, 2}
+    pval = get_chisquare_pval([3/15, 12/15], list(samples))
+    assert 0.05 < pval
+
+    bitsource = BitSource(numpy.random.default_rng(seed))
+    assert numpy.all(
+        samples == sample_ky_encoding_batch(enc, N_sample, bitsource))
+    assert numpy.all(sample_ky_encoding_batch([-1], 10) == 1)
+
+def test_sample_bitsource_entropy():
+    # Dyadic distribution (1/2, 1/4, 1/4) consumes exactly 1 or 2 bits.
+    Ms, k, l = [2, 1, 1], 2, 2
+    P, kp, lp = make_ddg_matrix(Ms, k, l)
+    root = make_ddg_tree(P, kp, lp)
+    encoding = {}
+    pack_tree(encoding, root, 0)
+    bitsource = BitSource(random.Random(1))
+    for _i in range(1000):
+        before = bitsource.consumed
+        x = sample_ky_encoding(encoding, bitsource)
+        assert bitsource.consumed - before == (1 if x == 1 else 2)
+
+def test_sample_ky_matrix_packed():
+    Ms, k, l = [3, 5, 1, 6], 4, 0
+    P, kp, lp = make_ddg_matrix(Ms, k, l)
+    Pp = PackedMatrix.from_lists(P)
+    bitsource0 = BitSource(random.Random(4))
+    bitsource1 = BitSource(random.Random(4))
+    samples0 = [sample_ky_matrix(P, kp, lp, bitsource0) for _i in range(500)]
+    samples1 = [sample_ky_matrix(Pp, kp, lp, bitsource1) for _i in range(500)]
+    assert samples0 == samples1
+    assert sample_ky_matrix(PackedMatrix([1], 1), 1, 0) == 1
+
+def test_sample_ky_matrix_cached_csr():
+    Ms, k, l = [3, 5, 1, 6], 4, 0
+    P, kp, lp = make_ddg_matrix(Ms, k, l)
+    h = make_hamming_vector(P)
+    T = make_hamming_matrix(P)
+    offsets, labels = make_hamming_csr(P)
+    bitsource0 = BitSource(random.Random(5))
+    bitsource1 = BitSource(random.Random(5))
+    samples0 = [sample_ky_matrix_cached(kp, lp, h, T, bitsource0)
+        for _i in range(500)]
+    samples1 = [sample_ky_matrix_cached_csr(kp, lp, offsets, labels, bitsource1)
+        for _i in range(500)]
+    assert samples0 == samples1
+    assert sample_ky_matrix_cached_csr(1, 0, [0, 1], [2]) == 3
+
+def test_sample_fldr_table():
+    Ms = [3, 0, 5, 9, 1]
+    n, k, offsets, labels = construct_sample_fldr(Ms)
+    assert (n, k) == (5, 5)
+    counts = Counter(labels)
+    for r, M in enumerate(Ms + [32 - 18]):
+        assert counts[r] == bin(M).count('1')
+    assert offsets[-1] == len(labels)
+
+def test_sample_fldr_dyadic():
+    # Without the reject outcome, FLDR walks the same tree as Knuth-Yao.
+    Ms, k, l = [2, 5, 1, 8], 4, 4
+    P, kp, lp = make_ddg_matrix(Ms, k, l)
+    n, kf, offsets, labels = construct_sample_fldr(Ms)
+    assert (kf, n) == (kp, 4)
+    bitsource0 = BitSource(random.Random(6))
+    bitsource1 = BitSource(random.Random(6))
+    for _i in range(500):
+        assert sample_ky_matrix(P, kp, lp, bitsource0) \
+            == sample_fldr(n, kf, offsets, labels, bitsource1)
+
+@pytest.mark.parametrize('seed', [10, 20])
+def test_sample_fldr(seed):
+    Ms = [3, 1, 7, 2, 4]
+    n, k, offsets, labels = construct_sample_fldr(Ms)
+    bitsource = BitSource(random.Random(seed))
+    samples = [sample_fldr(n, k, offsets, labels, bitsource)
+        for _i in range(8500)]
+    pval = get_chisquare_pval([M/17 for M in Ms], samples)
+    assert 0.05 < pval
+    assert sample_fldr(*construct_sample_fldr([5]), bitsource) == 1
@@ -0,0 +1,58 @@
+# Copyright 2019 MIT Probabilistic Computing Project.
+# Released under Apache 2.0; refer to LICENSE.txt
+
+import pickle
+import random
+
+from fractions import Fraction
+
+import pytest
+
+from optas.construct import construct_sample_ky_encoding
+from optas.flip import BitSource
+from optas.sample import sample_ky_encoding
+from optas.sampler import Sampler
+from optas.sampler import get_typecode
+
+from optas.tests.utils import get_random_dist
+
+def test_get_typecode():
+    assert get_typecode(-4, 100) == 'b'
+    assert get_typecode(-129, 100) == 'h'
+    assert get_typecode(-4, 2**15) == 'i'
+    assert get_typecode(-2**40, 2**15) in ['l', 'q']
+    with pytest.raises(AssertionError):
+        get_typecode(0, 2**64)
+
+@pytest.mark.parametrize('n', [1, 3, 20])
+def test_sampler_agrees(n):
+    random.seed(n)
+    p_target = get_random_dist(n)
+    enc, n, k = construct_sample_ky_encoding(p_target)
+    sampler = Sampler.from_distribution(p_target)
+    assert list(sampler.enc) == enc
+    assert (sampler.n, sampler.k) == (n, k)
+    assert sampler.enc.itemsize <= 2
+    bitsource0 = BitSource(random.Random(n))
+    bitsource1 = BitSource(random.Random(n))
+    for _i in range(1000):
+        x0 = sample_ky_encoding(enc, bitsource0)
+        x1 = sampler.sample(bitsource1)
+        assert x0 == x1
+    samples = sampler.sample_n(100, bitsource1)
+    assert len(samples) == 100
+    assert all(1 <= x <= n for x in samples)
+
+def test_sampler_pickle():
+    p_target = [Fraction(1, 10), Fraction(3, 10), Fraction(6, 10)]
+    sampler = Sampler.from_distribution(p_target)
+    sampler_copy = pickle.loads(pickle.dumps(sampler))
+    assert sampler_copy.enc == sampler.enc
+    assert sampler_copy.enc.typecode == sampler.enc.typecode
+    assert (sampler_copy.n, sampler_copy.k) == (sampler.n, sampler.k)
+    assert not hasattr(sampler, '__dict__')
+
+def test_sampler_single():
+    sampler = Sampler.from_distribution([Fraction(1)])
+    assert sampler.sample() == 1
+    assert list(sampler.sample_n(5)) == [1]*5
@@ -0,0 +1,98 @@
+# Copyright 2019 MIT Probabilistic Computing Project.
+# Released under Apache 2.0; refer to LICENSE.txt
+
+import random
+
+from fractions import Fraction
+from math import ceil
+from math import log2
+
+import pytest
+
+from optas.divergences import KERNELS
+from optas.divergences import compute_divergence_kernel
+from optas.opt import get_optimal_probabilities
+from optas.opt import optimize_unorm
+from optas.search import find_min_precision
+from optas.search import get_candidate_Zs
+from optas.search import get_error_lower_bound
+from optas.search import optimize_unorm_warm
+from optas.utils import argmin
+from optas.utils import normalize_vector
+
+from optas.tests.utils import allclose
+from optas.tests.utils import get_random_dist
+
+def find_min_precision_linear(p_target, kernel, maxerror, dyadic):
+    """Reference search raising k one step at a time."""
+    strict = kernel in ['kl', 'nchi2']
+    n = len(p_target)
+    k = 1 if not strict else ceil(log2(n))
+    while True:
+        Zs = get_candidate_Zs(k, n, dyadic, strict)
+        p_approx_list = [
+            get_optimal_probabilities(Z, p_target, KERNELS[kernel])
+            for Z in Zs
+        ]
+        errors = [
+            compute_divergence_kernel(p_target, p_approx, KERNELS[kernel])
+            for p_approx in p_approx_list
+        ]
+        i = argmin(errors)
+        if errors[i] <= maxerror:
+            return (p_approx_list[i], errors[i], Zs[i])
+        k += 1
+
+@pytest.mark.parametrize('kernel', ['tv', 'hellinger', 'pchi2', 'kl'])
+@pytest.mark.parametrize('dyadic', [True, False])
+def test_find_min_precision(kernel, dyadic):
+    random.seed(10)
+    p_target = get_random_dist(6)
+    for maxerror in [2**-4, 2**-10, 2**-16]:
+        p_approx, error, Z = find_min_precision(
+            p_target, kernel, maxerror, dyadic)
+        p_ref, error_ref, Z_ref = find_min_precision_linear(
+            p_target, kernel, maxerror, dyadic)
+        assert error <= maxerror
+        assert Z.bit_length() == Z_ref.bit_length()
+        assert allclose(error, error_ref)
+        assert sum(p_approx) == 1
+
+def test_find_min_precision_processes():
+    random.seed(3)
+    p_target = get_random_dist(5)
+    result = find_min_precision(p_target, 'hellinger', 2**-12, False)
+    result_pool = find_min_precision(p_target, 'hellinger', 2**-12, False,
+        processes=2)
+    assert result[1:] == result_pool[1:]
+
+def test_lower_bound():
+    random.seed(4)
+    p_target = get_random_dist(8) + [Fraction(0)]
+    for kernel in ['tv', 'hellinger', 'pchi2', 'kl', 'reverse_kl', 'td']:
+        for Z in [16, 31, 100, 1000]:
+            p_approx = get_optimal_probabilities(Z, p_target, KERNELS[kernel])
+            error = compute_divergence_kernel(p_target, p_approx,
+                KERNELS[kernel])
+            bound = get_error_lower_bound(Z, p_target, KERNELS[kernel])
+            assert bound <= error or allclose(bound, error)
+            assert 0 <= bound
+            if kernel in ['kl', 'reverse_kl']:
+                assert bound == 0
+
+def test_optimize_unorm_warm():
+    random.seed(5)
+    p_target = get_random_dist(20) + [Fraction(0)]
+    for kernel in ['tv', 'hellinger', 'pchi2', 'js']:
+        kernel = KERNELS[kernel]
+        for Z, Z_prev in [(1000, 999), (1024, 512), (96, 1000)]:
+            Ms_prev = optimize_unorm(Z_prev, p_target, kernel)
+            Ms_start = [M * Z // Z_prev for M in Ms_prev]
+            Ms_warm = optimize_unorm_warm(Z, p_target, Ms_start, kernel)
+            Ms_cold = optimize_unorm(Z, p_target, kernel)
+            assert sum(Ms_warm) == Z
+            e_warm = compute_divergence_kernel(p_target,
+                normalize_vector(Z, Ms_warm), kernel)
+            e_cold = compute_divergence_kernel(p_target,
+                normalize_vector(Z, Ms_cold), kernel)
+            assert allclose(e_warm, e_cold)